@@ -0,0 +1,253 @@
+"""How many of each sandwich the kitchen can make right now.
+
+The recipes table is a sparse sandwich x resource requirement matrix and
+resources.amount is the stock vector; a sandwich's max makeable units is
+min(stock[r] // need[r]) over the resources its recipe uses. Sandwiches
+without a recipe are not limited (None).
+
+The matrix is loaded with two queries and kept per process. Writes mark
+rows dirty once their transaction commits:
+
+* a resource changing (ORM write, or inventory.reserve/release) re-reads
+  that stock value and recomputes only the sandwiches that use it;
+* a recipe changing re-reads that sandwich's requirement row.
+
+Dirty rows are refreshed with one IN query each on the next read; the menu
+routes do that (refresh()) before computing their validators. versions.MENU
+is only bumped when a refresh makes an item sell out or come back, so counts
+that merely go down or up are picked up by cached menu responses within
+conf.http_revalidate_seconds. A full reload every
+conf.menu_availability_refresh_seconds picks up writes made by other worker
+processes.
+"""
+import threading
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from ..dependencies import commit_hooks
+from ..dependencies.config import conf
+from ..dependencies.replicas import primary_session
+from ..models.recipes import Recipe
+from ..models.resources import Resource
+from . import versions
+
+if TYPE_CHECKING:  # the async driver is only needed when the async routes are served
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+_PENDING_KEY = "availability_dirty"
+
+
+class AvailabilityMatrix:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._needs: Dict[int, Dict[int, int]] = {}  # sandwich -> {resource: amount per unit}
+        self._users: Dict[int, Set[int]] = defaultdict(set)  # resource -> sandwiches using it
+        self._stock: Dict[int, int] = {}
+        self._max: Dict[int, int] = {}
+        self.loaded_at: Optional[float] = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._needs.clear()
+            self._users.clear()
+            self._stock.clear()
+            self._max.clear()
+            self.loaded_at = None
+
+    def _compute(self, sandwich_id: int) -> bool:
+        """Recompute one row; True if the sandwich sold out or came back."""
+        was_sold_out = self._max.get(sandwich_id) == 0
+        needs = self._needs.get(sandwich_id)
+        if not needs:
+            self._max.pop(sandwich_id, None)
+        else:
+            self._max[sandwich_id] = max(
+                0, min(self._stock.get(resource_id, 0) // amount for resource_id, amount in needs.items())
+            )
+        return (self._max.get(sandwich_id) == 0) != was_sold_out
+
+    def sold_out(self) -> Set[int]:
+        with self._lock:
+            return {sandwich_id for sandwich_id, count in self._max.items() if count == 0}
+
+    def set_recipe(self, sandwich_id: int, needs: Dict[int, int]) -> bool:
+        with self._lock:
+            for resource_id in self._needs.pop(sandwich_id, {}):
+                self._users[resource_id].discard(sandwich_id)
+            needs = {r: amount for r, amount in needs.items() if amount and amount > 0}
+            if needs:
+                self._needs[sandwich_id] = needs
+                for resource_id in needs:
+                    self._users[resource_id].add(sandwich_id)
+            return self._compute(sandwich_id)
+
+    def set_stock(self, resource_id: int, amount: Optional[int]) -> bool:
+        with self._lock:
+            if amount is None:
+                self._stock.pop(resource_id, None)
+            else:
+                self._stock[resource_id] = amount
+            flipped = False
+            for sandwich_id in self._users.get(resource_id, ()):
+                flipped = self._compute(sandwich_id) or flipped
+            return flipped
+
+    def load(self, recipe_rows: Iterable, stock_rows: Iterable) -> bool:
+        """Replace the whole matrix; True if any sandwich sold out or came back."""
+        needs: Dict[int, Dict[int, int]] = defaultdict(dict)
+        for sandwich_id, resource_id, amount in recipe_rows:
+            needs[sandwich_id][resource_id] = needs[sandwich_id].get(resource_id, 0) + (amount or 0)
+        with self._lock:
+            sold_out = self.sold_out()
+            self.clear()
+            self._stock.update(stock_rows)
+            for sandwich_id, row in needs.items():
+                self.set_recipe(sandwich_id, row)
+            self.loaded_at = time.monotonic()
+            return self.sold_out() != sold_out
+
+    def max_available(self, sandwich_id: int) -> Optional[int]:
+        return self._max.get(sandwich_id)
+
+
+_matrix = AvailabilityMatrix()
+_dirty_lock = threading.Lock()
+_dirty_resources: Set[int] = set()
+_dirty_sandwiches: Set[int] = set()
+
+
+def _reload_due(loaded_at: Optional[float]) -> bool:
+    return loaded_at is None or time.monotonic() - loaded_at >= conf.menu_availability_refresh_seconds
+
+
+def _pending() -> bool:
+    return _reload_due(_matrix.loaded_at) or bool(_dirty_resources or _dirty_sandwiches)
+
+
+def _refresh(db: Session) -> bool:
+    """Bring the matrix up to date; True if any sandwich sold out or came back."""
+    loaded_at = _matrix.loaded_at
+    if _reload_due(loaded_at):
+        with _dirty_lock:
+            _dirty_resources.clear()
+            _dirty_sandwiches.clear()
+        flipped = _matrix.load(
+            db.query(Recipe.sandwich_id, Recipe.resource_id, Recipe.amount).all(),
+            db.query(Resource.id, Resource.amount).all(),
+        )
+        return flipped and loaded_at is not None
+
+    with _dirty_lock:
+        resources = set(_dirty_resources)
+        sandwiches = set(_dirty_sandwiches)
+        _dirty_resources.clear()
+        _dirty_sandwiches.clear()
+
+    flipped = False
+    if sandwiches:
+        needs: Dict[int, Dict[int, int]] = {sandwich_id: {} for sandwich_id in sandwiches}
+        rows = (
+            db.query(Recipe.sandwich_id, Recipe.resource_id, Recipe.amount)
+            .filter(Recipe.sandwich_id.in_(sandwiches))
+            .all()
+        )
+        for sandwich_id, resource_id, amount in rows:
+            needs[sandwich_id][resource_id] = needs[sandwich_id].get(resource_id, 0) + (amount or 0)
+        for sandwich_id, row in needs.items():
+            flipped = _matrix.set_recipe(sandwich_id, row) or flipped
+    if resources:
+        stock = dict(db.query(Resource.id, Resource.amount).filter(Resource.id.in_(resources)).all())
+        for resource_id in resources:
+            flipped = _matrix.set_stock(resource_id, stock.get(resource_id)) or flipped
+    return flipped
+
+
+def refresh(db: Session) -> None:
+    """Apply committed stock and recipe writes; call before reading versions.MENU."""
+    if not _pending():
+        return
+    with primary_session(db) as primary:  # never load a lagging replica's stock
+        if _refresh(primary):
+            versions.bump(versions.MENU)
+
+
+async def refresh_async(db: "AsyncSession") -> None:
+    """refresh() for an AsyncSession; only a due refresh goes through run_sync."""
+    if _pending():
+        await db.run_sync(refresh)
+
+
+def max_available(db: Session, sandwich_ids: Iterable[int]) -> Dict[int, Optional[int]]:
+    """Max makeable units per sandwich id; None where no recipe limits it."""
+    refresh(db)
+    return {sandwich_id: _matrix.max_available(sandwich_id) for sandwich_id in sandwich_ids}
+
+
+async def max_available_async(db: "AsyncSession", sandwich_ids: Iterable[int]) -> Dict[int, Optional[int]]:
+    """max_available() for an AsyncSession."""
+    await refresh_async(db)
+    return {sandwich_id: _matrix.max_available(sandwich_id) for sandwich_id in sandwich_ids}
+
+
+def mark_resources_changed(db: Session, resource_ids: Iterable[int]) -> None:
+    """Refresh these resources after `db` commits (for Core UPDATEs)."""
+    resource_ids = set(resource_ids)
+    if resource_ids:
+        pending = db.info.setdefault(_PENDING_KEY, (set(), set()))
+        pending[0].update(resource_ids)
+
+
+def _mark_sandwiches_changed(db: Session, sandwich_ids: Iterable[int]) -> None:
+    sandwich_ids = {i for i in sandwich_ids if i is not None}
+    if sandwich_ids:
+        pending = db.info.setdefault(_PENDING_KEY, (set(), set()))
+        pending[1].update(sandwich_ids)
+
+
+def clear() -> None:
+    _matrix.clear()
+    with _dirty_lock:
+        _dirty_resources.clear()
+        _dirty_sandwiches.clear()
+
+
+@event.listens_for(Resource, "after_insert")
+@event.listens_for(Resource, "after_update")
+@event.listens_for(Resource, "after_delete")
+def _resource_written(mapper, connection, target):
+    session = inspect(target).session
+    if session is not None:
+        mark_resources_changed(session, [target.id])
+
+
+@event.listens_for(Recipe, "after_insert")
+@event.listens_for(Recipe, "after_update")
+@event.listens_for(Recipe, "after_delete")
+def _recipe_written(mapper, connection, target):
+    session = inspect(target).session
+    if session is None:
+        return
+    state = inspect(target)
+    previous = state.attrs.sandwich_id.history.deleted
+    _mark_sandwiches_changed(session, [target.sandwich_id, *previous])
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    if commit_hooks.held(session):
+        return
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and (pending[0] or pending[1]):
+        # versions.MENU is bumped by the refresh, if an item sold out or came back
+        with _dirty_lock:
+            _dirty_resources.update(pending[0])
+            _dirty_sandwiches.update(pending[1])
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session):
+    session.info.pop(_PENDING_KEY, None)
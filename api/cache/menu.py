@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable
+
+from sqlalchemy.orm import Session
+
+from ..dependencies.config import conf
+from ..models.sandwiches import Sandwich
+from .ttl import TTLCache
+
+
+@dataclass(frozen=True)
+class MenuItemSnapshot:
+    id: int
+    name: str
+    price: float
+    is_active: bool
+
+
+_cache = TTLCache(maxsize=conf.menu_cache_size, ttl=conf.menu_cache_ttl)
+
+
+def get_menu_items(db: Session, ids: Iterable[int]) -> Dict[int, MenuItemSnapshot]:
+    """Return snapshots for the given sandwich ids, reading through the cache.
+
+    Ids that are not cached are loaded with a single IN query. Ids that do not
+    exist are simply absent from the result.
+    """
+    wanted = set(ids)
+    if not wanted:
+        return {}
+
+    found = _cache.get_many(wanted)
+    missing = wanted - found.keys()
+    if missing:
+        rows = (
+            db.query(Sandwich.id, Sandwich.name, Sandwich.price, Sandwich.is_active)
+            .filter(Sandwich.id.in_(missing))
+            .all()
+        )
+        for row in rows:
+            snapshot = _snapshot(row)
+            _cache.set(row.id, snapshot)
+            found[row.id] = snapshot
+    return found
+
+
+def _snapshot(row) -> MenuItemSnapshot:
+    return MenuItemSnapshot(
+        id=row.id,
+        name=row.name,
+        price=float(row.price),
+        is_active=bool(row.is_active),
+    )
+
+
+def preload(db: Session) -> int:
+    """Cache the active menu (up to the cache size) in one query."""
+    rows = (
+        db.query(Sandwich.id, Sandwich.name, Sandwich.price, Sandwich.is_active)
+        .filter(Sandwich.is_active.is_(True))
+        .limit(conf.menu_cache_size)
+        .all()
+    )
+    for row in rows:
+        _cache.set(row.id, _snapshot(row))
+    return len(rows)
+
+
+def invalidate(*ids: int) -> None:
+    _cache.invalidate(*ids)
+
+
+def clear() -> None:
+    _cache.clear()
+
+
+def stats() -> dict:
+    return _cache.stats()
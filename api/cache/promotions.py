@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from ..dependencies.config import conf
+from ..models.promotion import Promotion
+from .ttl import TTLCache
+
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class PromotionSnapshot:
+    id: int
+    code: str
+    discount_type: str
+    discount_value: float
+    min_order_amount: Optional[float]
+    max_discount_amount: Optional[float]
+    usage_limit: Optional[int]
+    usage_count: Optional[int]
+    is_active: int
+    start_date: Optional[datetime]
+    expiration_date: Optional[datetime]
+
+
+_cache = TTLCache(maxsize=conf.promo_cache_size, ttl=conf.promo_cache_ttl)
+
+
+def get_by_code(db: Session, code: str) -> Optional[PromotionSnapshot]:
+    """Return a snapshot of the promotion with this code, or None.
+
+    Unknown codes are cached as None for conf.promo_cache_negative_ttl
+    seconds, so repeated invalid codes do not reach the database.
+    """
+    cached = _cache.get(code, _MISSING)
+    if cached is not _MISSING:
+        return cached
+
+    promo = db.query(Promotion).filter(Promotion.code == code).first()
+    if promo is None:
+        _cache.set(code, None, ttl=conf.promo_cache_negative_ttl)
+        return None
+
+    snapshot = _snapshot(promo)
+    _cache.set(code, snapshot)
+    return snapshot
+
+
+def _snapshot(promo: Promotion) -> PromotionSnapshot:
+    return PromotionSnapshot(
+        id=promo.id,
+        code=promo.code,
+        discount_type=promo.discount_type,
+        discount_value=promo.discount_value,
+        min_order_amount=promo.min_order_amount,
+        max_discount_amount=promo.max_discount_amount,
+        usage_limit=promo.usage_limit,
+        usage_count=promo.usage_count,
+        is_active=promo.is_active,
+        start_date=promo.start_date,
+        expiration_date=promo.expiration_date,
+    )
+
+
+def preload(db: Session) -> int:
+    """Cache the active promotions (up to the cache size) in one query."""
+    promos = (
+        db.query(Promotion)
+        .filter(Promotion.is_active == 1)
+        .limit(conf.promo_cache_size)
+        .all()
+    )
+    for promo in promos:
+        _cache.set(promo.code, _snapshot(promo))
+    return len(promos)
+
+
+def invalidate(*codes: str) -> None:
+    _cache.invalidate(*codes)
+
+
+def clear() -> None:
+    _cache.clear()
+
+
+def stats() -> dict:
+    return _cache.stats()
@@ -0,0 +1,124 @@
+"""Version counters behind the HTTP validators (ETag / Last-Modified).
+
+Each cached resource has a counter that is bumped when a write touching it
+commits, so a validator can be computed from memory alone:
+
+* MENU: any sandwich, plus an item selling out or coming back through the
+  availability matrix (menu responses carry max_available);
+* reviews_key(menu_item_id): that item's reviews and rating summary.
+
+Counters are per process. Validators also carry a random process token,
+so one worker never confirms another's copy, and a time window of
+conf.http_revalidate_seconds, so writes made by other workers are picked
+up within that window.
+"""
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, NamedTuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from ..dependencies import commit_hooks
+from ..dependencies.config import conf
+from ..models.review import Review
+from ..models.sandwiches import Sandwich
+
+MENU = "menu"
+
+_PENDING_KEY = "versions_touched"
+
+
+def reviews_key(menu_item_id: int) -> str:
+    return f"reviews:{menu_item_id}"
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: datetime
+
+
+_lock = threading.Lock()
+_versions: Dict[str, int] = {}
+_changed_at: Dict[str, float] = {}
+_token = secrets.token_hex(4)
+_started_at = time.time()
+
+
+def bump(*keys: str) -> None:
+    now = time.time()
+    with _lock:
+        for key in keys:
+            _versions[key] = _versions.get(key, 0) + 1
+            _changed_at[key] = now
+
+
+def touch(db: Session, keys: Iterable[str]) -> None:
+    """Bump these keys once `db` commits."""
+    db.info.setdefault(_PENDING_KEY, set()).update(keys)
+
+
+def validators(*keys: str) -> Validators:
+    now = time.time()
+    window = conf.http_revalidate_seconds
+    epoch = int(now // window) if window > 0 else 0
+    with _lock:
+        versions = ".".join(str(_versions.get(key, 0)) for key in keys)
+        changed_at = max((_changed_at.get(key, _started_at) for key in keys), default=_started_at)
+    changed_at = max(changed_at, epoch * window)
+    return Validators(
+        etag=f'"{_token}-{epoch:x}-{versions}"',
+        last_modified=datetime.fromtimestamp(int(changed_at), tz=timezone.utc),
+    )
+
+
+def clear() -> None:
+    global _token, _started_at
+    with _lock:
+        _versions.clear()
+        _changed_at.clear()
+        _token = secrets.token_hex(4)
+        _started_at = time.time()
+
+
+if hasattr(os, "register_at_fork"):
+    # forked workers count on their own from here, so must not share a token
+    os.register_at_fork(after_in_child=clear)
+
+
+@event.listens_for(Sandwich, "after_insert")
+@event.listens_for(Sandwich, "after_update")
+@event.listens_for(Sandwich, "after_delete")
+def _sandwich_written(mapper, connection, target):
+    session = inspect(target).session
+    if session is not None:
+        # the rating endpoint 404s once the item is gone
+        touch(session, [MENU, reviews_key(target.id)])
+
+
+@event.listens_for(Review, "after_insert")
+@event.listens_for(Review, "after_update")
+@event.listens_for(Review, "after_delete")
+def _review_written(mapper, connection, target):
+    state = inspect(target)
+    if state.session is None:
+        return
+    previous = state.attrs.menu_item_id.history.deleted
+    touch(state.session, [reviews_key(i) for i in (target.menu_item_id, *previous) if i is not None])
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    if commit_hooks.held(session):
+        return
+    keys = session.info.pop(_PENDING_KEY, None)
+    if keys:
+        bump(*keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session):
+    session.info.pop(_PENDING_KEY, None)
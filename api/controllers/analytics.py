@@ -0,0 +1,263 @@
+"""Sales rollups: written with each new order, read by the /analytics routes.
+
+The report queries only touch the sales_daily* tables, so their cost grows
+with the number of days (and items or codes) in the range, not with the
+number of orders.
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models.order_details import OrderDetail
+from ..models.orders import Order
+from ..models.sales_rollup import DailyItemSales, DailyPromotionSales, DailySales
+from ..models.sandwiches import Sandwich
+from ..models.upsert import increment_row
+from ..schemas.analytics import (
+    ItemDailySalesResponse,
+    ItemSalesResponse,
+    PromotionSalesResponse,
+    SalesSummaryResponse,
+)
+
+ORDER_TOTALS = ("subtotal", "tax_amount", "discount_amount", "total_price")
+
+
+def sale_from_order(order: Order) -> Dict[str, Any]:
+    """The fields record_orders() needs, from an Order with its details loaded."""
+    return {
+        "order_date": order.order_date,
+        "promotion_code": order.promotion_code,
+        **{name: getattr(order, name) for name in ORDER_TOTALS},
+        "lines": [
+            {"sandwich_id": d.sandwich_id, "quantity": d.quantity, "subtotal": d.subtotal}
+            for d in order.order_details
+        ],
+    }
+
+
+def record_orders(db: Session, sales: Iterable[Mapping[str, Any]]) -> None:
+    """Add new orders to the rollups inside the caller's transaction.
+
+    Orders are summed in memory first, so a batch costs one upsert per
+    touched (day), (day, item) and (day, code) row. Rows are written in key
+    order so concurrent transactions lock them in the same order.
+    """
+    days: Dict[date, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    items: Dict[tuple, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    promos: Dict[tuple, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    for sale in sales:
+        day = sale["order_date"].date()
+        totals = days[day]
+        totals["order_count"] += 1
+        totals["subtotal"] += sale["subtotal"]
+        totals["tax_amount"] += sale["tax_amount"]
+        totals["discount_amount"] += sale["discount_amount"] or 0.0
+        totals["revenue"] += sale["total_price"]
+
+        for line in sale["lines"]:
+            item = items[(day, line["sandwich_id"])]
+            item["units"] += line["quantity"]
+            item["order_lines"] += 1
+            item["revenue"] += line["subtotal"]
+
+        if sale["promotion_code"]:
+            promo = promos[(day, sale["promotion_code"])]
+            promo["order_count"] += 1
+            promo["discount_amount"] += sale["discount_amount"] or 0.0
+            promo["revenue"] += sale["total_price"]
+
+    connection = db.connection()
+    for day in sorted(days):
+        increment_row(connection, DailySales.__table__, {"day": day}, dict(days[day]))
+    for day, sandwich_id in sorted(items):
+        increment_row(
+            connection, DailyItemSales.__table__,
+            {"day": day, "sandwich_id": sandwich_id}, dict(items[(day, sandwich_id)]),
+        )
+    for day, code in sorted(promos):
+        increment_row(
+            connection, DailyPromotionSales.__table__,
+            {"day": day, "promotion_code": code}, dict(promos[(day, code)]),
+        )
+
+
+def _as_date(value) -> date:
+    # DATE() comes back as a date from MySQL and as an ISO string from SQLite
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def rebuild_sales_rollups(db: Session) -> int:
+    """Recompute every rollup table from orders and order_details.
+
+    Needed to backfill existing orders and after writes that bypass the
+    order controllers. Returns the number of days with orders.
+    """
+    day = func.date(Order.order_date)
+    daily = (
+        db.query(
+            day, func.count(Order.id), func.sum(Order.subtotal), func.sum(Order.tax_amount),
+            func.sum(Order.discount_amount), func.sum(Order.total_price),
+        )
+        .group_by(day)
+        .all()
+    )
+    item_rows = (
+        db.query(
+            day, OrderDetail.sandwich_id, func.sum(OrderDetail.quantity),
+            func.count(OrderDetail.id), func.sum(OrderDetail.subtotal),
+        )
+        .join(Order, Order.id == OrderDetail.order_id)
+        .group_by(day, OrderDetail.sandwich_id)
+        .all()
+    )
+    promo_rows = (
+        db.query(
+            day, Order.promotion_code, func.count(Order.id),
+            func.sum(Order.discount_amount), func.sum(Order.total_price),
+        )
+        .filter(Order.promotion_code.isnot(None))
+        .group_by(day, Order.promotion_code)
+        .all()
+    )
+
+    for model in (DailySales, DailyItemSales, DailyPromotionSales):
+        db.query(model).delete(synchronize_session=False)
+    db.add_all(
+        DailySales(
+            day=_as_date(d), order_count=count, subtotal=subtotal or 0.0, tax_amount=tax or 0.0,
+            discount_amount=discount or 0.0, revenue=revenue or 0.0,
+        )
+        for d, count, subtotal, tax, discount, revenue in daily
+    )
+    db.add_all(
+        DailyItemSales(
+            day=_as_date(d), sandwich_id=sandwich_id, units=units or 0,
+            order_lines=lines, revenue=revenue or 0.0,
+        )
+        for d, sandwich_id, units, lines, revenue in item_rows
+    )
+    db.add_all(
+        DailyPromotionSales(
+            day=_as_date(d), promotion_code=code, order_count=count,
+            discount_amount=discount or 0.0, revenue=revenue or 0.0,
+        )
+        for d, code, count, discount, revenue in promo_rows
+    )
+    db.commit()
+    return len(daily)
+
+
+def _check_range(date_from: Optional[date], date_to: Optional[date]) -> None:
+    if date_from is not None and date_to is not None and date_from > date_to:
+        raise HTTPException(status_code=400, detail="from must not be later than to.")
+
+
+def _in_range(query, column, date_from: Optional[date], date_to: Optional[date]):
+    _check_range(date_from, date_to)
+    if date_from is not None:
+        query = query.filter(column >= date_from)
+    if date_to is not None:
+        query = query.filter(column <= date_to)
+    return query
+
+
+def daily_sales(
+    db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None
+) -> List[DailySales]:
+    query = _in_range(db.query(DailySales), DailySales.day, date_from, date_to)
+    return query.order_by(DailySales.day).all()
+
+
+def sales_summary(
+    db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None
+) -> SalesSummaryResponse:
+    query = _in_range(
+        db.query(
+            func.count(DailySales.day), func.sum(DailySales.order_count), func.sum(DailySales.subtotal),
+            func.sum(DailySales.tax_amount), func.sum(DailySales.discount_amount), func.sum(DailySales.revenue),
+        ),
+        DailySales.day, date_from, date_to,
+    )
+    days, orders, subtotal, tax, discount, revenue = query.one()
+    orders = orders or 0
+    revenue = revenue or 0.0
+    return SalesSummaryResponse(
+        date_from=date_from,
+        date_to=date_to,
+        days=days,
+        order_count=orders,
+        subtotal=subtotal or 0.0,
+        tax_amount=tax or 0.0,
+        discount_amount=discount or 0.0,
+        revenue=revenue,
+        average_order_value=revenue / orders if orders else 0.0,
+    )
+
+
+def item_sales(
+    db: Session,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = 50,
+) -> List[ItemSalesResponse]:
+    revenue = func.sum(DailyItemSales.revenue)
+    query = _in_range(
+        db.query(
+            DailyItemSales.sandwich_id, func.sum(DailyItemSales.units),
+            func.sum(DailyItemSales.order_lines), revenue,
+        ),
+        DailyItemSales.day, date_from, date_to,
+    )
+    rows = (
+        query.group_by(DailyItemSales.sandwich_id)
+        .order_by(revenue.desc(), DailyItemSales.sandwich_id)
+        .limit(limit)
+        .all()
+    )
+    names = dict(
+        db.query(Sandwich.id, Sandwich.name).filter(Sandwich.id.in_([row[0] for row in rows])).all()
+    ) if rows else {}
+    return [
+        ItemSalesResponse(
+            menu_item_id=sandwich_id, name=names.get(sandwich_id),
+            units=units, order_lines=lines, revenue=total,
+        )
+        for sandwich_id, units, lines, total in rows
+    ]
+
+
+def item_daily_sales(
+    db: Session, menu_item_id: int, date_from: Optional[date] = None, date_to: Optional[date] = None
+) -> List[ItemDailySalesResponse]:
+    query = _in_range(
+        db.query(DailyItemSales).filter(DailyItemSales.sandwich_id == menu_item_id),
+        DailyItemSales.day, date_from, date_to,
+    )
+    return [
+        ItemDailySalesResponse(day=row.day, units=row.units, order_lines=row.order_lines, revenue=row.revenue)
+        for row in query.order_by(DailyItemSales.day)
+    ]
+
+
+def promotion_sales(
+    db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None
+) -> List[PromotionSalesResponse]:
+    discount = func.sum(DailyPromotionSales.discount_amount)
+    query = _in_range(
+        db.query(
+            DailyPromotionSales.promotion_code, func.sum(DailyPromotionSales.order_count),
+            discount, func.sum(DailyPromotionSales.revenue),
+        ),
+        DailyPromotionSales.day, date_from, date_to,
+    )
+    rows = query.group_by(DailyPromotionSales.promotion_code).order_by(discount.desc()).all()
+    return [
+        PromotionSalesResponse(promotion_code=code, order_count=count, discount_amount=total, revenue=revenue)
+        for code, count, total, revenue in rows
+    ]
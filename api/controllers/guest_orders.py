@@ -1,111 +1,85 @@
-from uuid import uuid4
 from datetime import datetime
-from typing import List, Dict
-import json
+from typing import TYPE_CHECKING, List
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
 
-from ..models.promotion import Promotion
+from . import analytics, inventory
 from .promotion import validate_and_calculate_discount
 from ..models.orders import Order
 from ..models.order_details import OrderDetail
 from ..models.sandwiches import Sandwich
+from ..cache import menu as menu_cache
+from .. import ids
+from ..events import order_events
+from ..dependencies import commit_hooks
+from ..metrics import app_metrics
 from ..schemas.guest_orders import (
     GuestOrderCreate,
     GuestOrder,
     GuestOrderItem,
 )
 
+if TYPE_CHECKING:  # the async driver is only needed when the async routes are served
+    from sqlalchemy.ext.asyncio import AsyncSession
 
-def _get_sandwiches_by_id(db: Session, ids: List[int]) -> Dict[int, Sandwich]:
-    if not ids:
-        return {}
 
-    sandwiches = db.query(Sandwich).filter(Sandwich.id.in_(ids)).all()
-    return {s.id: s for s in sandwiches}
+GUEST_FIELDS = ("guest_name", "contact_phone", "contact_email", "table_number", "notes")
 
 
-def _build_guest_order_response(db: Session, order: Order) -> GuestOrder:
-    details: List[OrderDetail] = (
-        db.query(OrderDetail)
-        .filter(OrderDetail.order_id == order.id)
-        .all()
+def _guest_order_loads():
+    # one round trip: order, its lines and each line's menu item name
+    return (
+        joinedload(Order.order_details)
+        .joinedload(OrderDetail.sandwich)
+        .load_only(Sandwich.id, Sandwich.name)
     )
 
+
+def _guest_order_query(db: Session):
+    return db.query(Order).options(_guest_order_loads())
+
+
+def _build_guest_order_response(order: Order) -> GuestOrder:
+    """Build the response from stored order and line data only."""
+    details: List[OrderDetail] = sorted(order.order_details, key=lambda d: d.id)
+
     if not details:
         raise HTTPException(
             status_code=404,
             detail=f"No order details found for order ID {order.id}",
         )
 
-    sandwich_ids = [d.sandwich_id for d in details]
-    sandwiches_by_id = _get_sandwiches_by_id(db, sandwich_ids)
-
     response_items: List[GuestOrderItem] = []
-    computed_subtotal = 0.0
-
     for detail in details:
-        sandwich = sandwiches_by_id.get(detail.sandwich_id)
-        if not sandwich:
+        if detail.sandwich is None:
             raise HTTPException(
                 status_code=500,
                 detail=f"Sandwich ID {detail.sandwich_id} referenced in order_details but not found.",
             )
 
-        unit_price = float(sandwich.price)
-        quantity = detail.quantity
-        line_total = unit_price * quantity
-        computed_subtotal += line_total
-
         response_items.append(
             GuestOrderItem(
                 id=detail.id,
-                menu_item_id=sandwich.id,
-                name=sandwich.name,
-                quantity=quantity,
-                unit_price=unit_price,
-                subtotal=line_total,
+                menu_item_id=detail.sandwich_id,
+                name=detail.sandwich.name,
+                quantity=detail.quantity,
+                unit_price=detail.unit_price,
+                subtotal=detail.subtotal,
                 special_requests=detail.special_requests,
             )
         )
 
-    subtotal = float(order.subtotal) if order.subtotal is not None else computed_subtotal
-    tax_amount = float(order.tax_amount) if order.tax_amount is not None else 0.0
-    discount_amount = float(order.discount_amount) if order.discount_amount is not None else 0.0
-    total_price = float(order.total_price) if order.total_price is not None else subtotal + tax_amount - discount_amount
-    order_code = f"ORD-{order.id:06d}"
-
-    guest_name = None
-    contact_phone = None
-    contact_email = None
-    table_number = None
-    notes = None
-
-    if order.special_instructions:
-        try:
-            meta = json.loads(order.special_instructions)
-            guest_name = meta.get("guest_name")
-            contact_phone = meta.get("contact_phone")
-            contact_email = meta.get("contact_email")
-            table_number = meta.get("table_number")
-            notes = meta.get("notes")
-        except (ValueError, TypeError):
-            notes = order.special_instructions
-
     return GuestOrder(
         id=order.id,
-        code=order_code,
+        code=f"ORD-{order.id:06d}",
         status=order.order_status or "PENDING",
-        subtotal=subtotal,
-        total_price=total_price,
+        subtotal=order.subtotal,
+        total_price=order.total_price,
         items=response_items,
-        guest_name=guest_name,
-        contact_phone=contact_phone,
-        contact_email=contact_email,
-        table_number=table_number,
-        notes=notes,
         promo_code=order.promotion_code,
+        **{field: getattr(order, field) for field in GUEST_FIELDS},
     )
 
 
@@ -121,7 +95,7 @@ def create(db: Session, request: GuestOrderCreate) -> GuestOrder:
             )
 
     sandwich_ids = [item.menu_item_id for item in request.items]
-    sandwiches_by_id = _get_sandwiches_by_id(db, sandwich_ids)
+    sandwiches_by_id = menu_cache.get_menu_items(db, sandwich_ids)
     missing_ids = set(sandwich_ids) - set(sandwiches_by_id.keys())
     if missing_ids:
         raise HTTPException(
@@ -134,7 +108,7 @@ def create(db: Session, request: GuestOrderCreate) -> GuestOrder:
 
     for item in request.items:
         sandwich = sandwiches_by_id[item.menu_item_id]
-        unit_price = float(sandwich.price)
+        unit_price = sandwich.price
         line_total = unit_price * item.quantity
         subtotal += line_total
 
@@ -148,30 +122,29 @@ def create(db: Session, request: GuestOrderCreate) -> GuestOrder:
         )
         order_details.append(detail)
 
+    inventory.reserve_resources(db, inventory.recipe_demand(
+        db, ((item.menu_item_id, item.quantity) for item in request.items)
+    ))
+
     tax_amount = 0.07
     discount_amount = 0.0
     promo_code_db = None
 
     if request.promo_code:
-        promo_result = validate_and_calculate_discount(
-            db=db,
-            promo_code=request.promo_code,
-            order_subtotal=subtotal,
-        )
+        try:
+            promo_result = validate_and_calculate_discount(
+                db=db,
+                promo_code=request.promo_code,
+                order_subtotal=subtotal,
+            )
+        except HTTPException:
+            db.rollback()  # hand back the stock reserved above
+            raise
         discount_amount = promo_result["discount_amount"]
         promo_code_db = promo_result["promo_code"]
     total_price = subtotal + tax_amount - discount_amount
 
-    meta = {
-        "guest_name": request.guest_name,
-        "contact_phone": request.contact_phone,
-        "contact_email": request.contact_email,
-        "table_number": request.table_number,
-        "notes": request.notes,
-        "promo_code": request.promo_code,
-    }
-
-    tracking_number = f"GUEST-{uuid4().hex[:8].upper()}"
+    tracking_number = ids.tracking_number("GUEST")
 
     order = Order(
         customer_id=0,
@@ -180,7 +153,12 @@ def create(db: Session, request: GuestOrderCreate) -> GuestOrder:
             if request.table_number is not None
             else "Guest order"
         ),
-        special_instructions=json.dumps(meta),
+        special_instructions=None,
+        guest_name=request.guest_name,
+        contact_phone=request.contact_phone,
+        contact_email=request.contact_email,
+        table_number=request.table_number,
+        notes=request.notes,
         tracking_number=tracking_number,
         order_status="PENDING",
         subtotal=subtotal,
@@ -198,21 +176,31 @@ def create(db: Session, request: GuestOrderCreate) -> GuestOrder:
         detail.order = order
 
     db.add(order)
+    analytics.record_orders(db, [analytics.sale_from_order(order)])
     db.commit()
-    db.refresh(order)
 
-    return _build_guest_order_response(db, order)
+    order = _get_guest_order(db, order.id)
+    order_events.publish_created(db, [order])
+    commit_hooks.run(db, app_metrics.record_orders_created, [order], True)
+    return _build_guest_order_response(order)
 
 
-def read_one(db: Session, order_id: int) -> GuestOrder:
-    order = db.query(Order).filter(Order.id == order_id).first()
+def _order_not_found(order_id: int) -> HTTPException:
+    return HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
+
+
+def _get_guest_order(db: Session, order_id: int) -> Order:
+    order = _guest_order_query(db).filter(Order.id == order_id).first()
     if not order:
-        raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
+        raise _order_not_found(order_id)
+    return order
 
-    return _build_guest_order_response(db, order)
 
+def read_one(db: Session, order_id: int) -> GuestOrder:
+    return _build_guest_order_response(_get_guest_order(db, order_id))
 
-def lookup_by_code(db: Session, code: str) -> GuestOrder:
+
+def _order_id_from_code(code: str) -> int:
     prefix = "ORD-"
     if not code.startswith(prefix):
         raise HTTPException(status_code=400, detail="Invalid order code format")
@@ -222,5 +210,22 @@ def lookup_by_code(db: Session, code: str) -> GuestOrder:
     if not numeric_part.isdigit():
         raise HTTPException(status_code=400, detail="Invalid order code format")
 
-    order_id = int(numeric_part)
-    return read_one(db, order_id)
+    return int(numeric_part)
+
+
+def lookup_by_code(db: Session, code: str) -> GuestOrder:
+    return read_one(db, _order_id_from_code(code))
+
+
+# Native async versions of the guest order reads, used by the async routes.
+
+async def read_one_async(db: "AsyncSession", order_id: int) -> GuestOrder:
+    result = await db.scalars(select(Order).options(_guest_order_loads()).where(Order.id == order_id))
+    order = result.unique().first()
+    if not order:
+        raise _order_not_found(order_id)
+    return _build_guest_order_response(order)
+
+
+async def lookup_by_code_async(db: "AsyncSession", code: str) -> GuestOrder:
+    return await read_one_async(db, _order_id_from_code(code))
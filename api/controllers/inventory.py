@@ -0,0 +1,94 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from ..cache import availability
+from ..models.recipes import Recipe
+from ..models.resources import Resource
+
+
+Recipes = Dict[int, Dict[int, int]]  # sandwich id -> {resource id: amount per unit}
+
+
+def load_recipes(db: Session, sandwich_ids: Iterable[int]) -> Recipes:
+    """The recipes of these sandwiches, in one query."""
+    sandwich_ids = set(sandwich_ids)
+    if not sandwich_ids:
+        return {}
+
+    recipes: Recipes = defaultdict(dict)
+    rows = (
+        db.query(Recipe.sandwich_id, Recipe.resource_id, Recipe.amount)
+        .filter(Recipe.sandwich_id.in_(list(sandwich_ids)))
+        .all()
+    )
+    for sandwich_id, resource_id, amount in rows:
+        if amount:
+            recipes[sandwich_id][resource_id] = recipes[sandwich_id].get(resource_id, 0) + amount
+    return dict(recipes)
+
+
+def demand_for(recipes: Recipes, lines: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+    """Total amount of each resource needed for (sandwich_id, quantity) lines."""
+    demand: Dict[int, int] = defaultdict(int)
+    for sandwich_id, quantity in lines:
+        for resource_id, amount in recipes.get(sandwich_id, {}).items():
+            demand[resource_id] += amount * quantity
+    return dict(demand)
+
+
+def recipe_demand(db: Session, lines: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+    """Total amount of each resource needed for (sandwich_id, quantity) lines."""
+    lines = list(lines)
+    return demand_for(load_recipes(db, (sandwich_id for sandwich_id, _ in lines)), lines)
+
+
+def _adjust(db: Session, resource_id: int, delta: int, require_stock: bool = False):
+    stmt = update(Resource).where(Resource.id == resource_id)
+    if require_stock:
+        stmt = stmt.where(Resource.amount >= -delta)
+    return db.execute(
+        stmt.values(amount=Resource.amount + delta).execution_options(synchronize_session=False)
+    )
+
+
+def release_resources(db: Session, demand: Dict[int, int]) -> None:
+    """Give back a reservation made earlier in the same transaction."""
+    if not demand:
+        return
+    for resource_id in sorted(demand):
+        _adjust(db, resource_id, demand[resource_id])
+    availability.mark_resources_changed(db, demand)
+
+
+def reserve_resources(db: Session, demand: Dict[int, int]) -> None:
+    """Take `demand` out of stock without committing.
+
+    One conditional UPDATE per resource re-checks the amount in the database,
+    so concurrent orders can never drive a resource negative. Resources are
+    updated in id order so concurrent transactions lock them in the same
+    order. If any resource is short, the ones already taken are put back and
+    a 409 names every resource that cannot cover the demand.
+    """
+    if not demand:
+        return
+    availability.mark_resources_changed(db, demand)
+    reserved: Dict[int, int] = {}
+    for resource_id in sorted(demand):
+        needed = demand[resource_id]
+        if _adjust(db, resource_id, -needed, require_stock=True).rowcount == 1:
+            reserved[resource_id] = needed
+            continue
+
+        release_resources(db, reserved)
+        stock = db.query(Resource.id, Resource.item, Resource.amount).filter(
+            Resource.id.in_(list(demand))
+        ).all()
+        short = sorted(item for rid, item, amount in stock if amount < demand[rid])
+        raise HTTPException(
+            status_code=409,
+            detail=f"Out of stock: {', '.join(short) or f'resource {resource_id}'}.",
+        )
@@ -0,0 +1,172 @@
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from fastapi import HTTPException, status
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..cache import availability
+from ..cache import menu as menu_cache
+from ..dependencies.config import conf
+from ..search import menu_index
+from ..models.sandwiches import Sandwich
+from ..schemas.menu_item import MenuItemCreate, MenuItemRead, MenuItemUpdate
+
+if TYPE_CHECKING:  # the async driver is only needed when the async routes are served
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# name of the precomputed body of the unfiltered listing (http_cache)
+MENU_LISTING = "menu-items"
+
+_menu_list = TypeAdapter(List[MenuItemRead])
+
+
+def _with_availability(db: Session, items: List[Sandwich], available_only: bool = False) -> List[Sandwich]:
+    # one matrix lookup for the whole list; read by MenuItemRead.max_available
+    counts = availability.max_available(db, [item.id for item in items])
+    return _apply_availability(items, counts, available_only)
+
+
+def _apply_availability(
+    items: List[Sandwich], counts: Dict[int, Optional[int]], available_only: bool
+) -> List[Sandwich]:
+    for item in items:
+        item.max_available = counts[item.id]
+    if available_only:
+        items = [item for item in items if item.max_available is None or item.max_available > 0]
+    return items
+
+
+def create_menu_item(db: Session, payload: MenuItemCreate) -> Sandwich:
+    item = Sandwich(**payload.dict())
+    db.add(item)
+    db.commit()
+    db.refresh(item)
+    menu_cache.invalidate(item.id)
+    menu_index.index_item(item)
+    return _with_availability(db, [item])[0]
+
+
+def _menu_filters(category: Optional[str], is_vegetarian: Optional[bool], include_inactive: bool) -> list:
+    filters = []
+    if not include_inactive:
+        filters.append(Sandwich.is_active.is_(True))
+    if category:
+        filters.append(Sandwich.food_category == category)
+    if is_vegetarian is not None:
+        filters.append(Sandwich.is_vegetarian.is_(is_vegetarian))
+    return filters
+
+
+def list_menu_items(
+    db: Session,
+    search: Optional[str] = None,
+    category: Optional[str] = None,
+    is_vegetarian: Optional[bool] = None,
+    include_inactive: bool = False,
+    available_only: bool = False,
+) -> List[Sandwich]:
+    query = db.query(Sandwich).filter(*_menu_filters(category, is_vegetarian, include_inactive))
+
+    if not search:
+        return _with_availability(db, query.all(), available_only)
+
+    # Ranked by relevance in the in-process index; SQL only applies filters.
+    # The filters run on one page of ranked ids at a time, before the cut to
+    # conf.menu_search_max_results, so filtered-out matches don't use it up.
+    limit = conf.menu_search_max_results
+    ranked_ids = menu_index.search(db, search)
+    rank = {item_id: position for position, item_id in enumerate(ranked_ids)}
+    items: List[Sandwich] = []
+    for start in range(0, len(ranked_ids), limit):
+        page = query.filter(Sandwich.id.in_(ranked_ids[start:start + limit])).all()
+        page.sort(key=lambda item: rank[item.id])
+        items.extend(_with_availability(db, page, available_only))
+        if len(items) >= limit:
+            break
+    return items[:limit]
+
+
+def serialize_menu_items(items) -> bytes:
+    """JSON body of a listing, as the route's response_model would render it."""
+    return _menu_list.dump_json(_menu_list.validate_python(items, from_attributes=True))
+
+
+def get_menu_item(db: Session, item_id: int) -> Sandwich:
+    item = db.get(Sandwich, item_id)
+    if not item:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Menu item not found",
+        )
+    return _with_availability(db, [item])[0]
+
+
+# Native async versions of the menu reads, used by the async routes. The
+# availability matrix and the search index are process-local; they only go
+# through run_sync when they are due for a refresh.
+
+async def _with_availability_async(
+    db: "AsyncSession", items: List[Sandwich], available_only: bool = False
+) -> List[Sandwich]:
+    counts = await availability.max_available_async(db, [item.id for item in items])
+    return _apply_availability(items, counts, available_only)
+
+
+async def list_menu_items_async(
+    db: "AsyncSession",
+    search: Optional[str] = None,
+    category: Optional[str] = None,
+    is_vegetarian: Optional[bool] = None,
+    include_inactive: bool = False,
+    available_only: bool = False,
+) -> List[Sandwich]:
+    stmt = select(Sandwich).where(*_menu_filters(category, is_vegetarian, include_inactive))
+
+    if not search:
+        return await _with_availability_async(db, list(await db.scalars(stmt)), available_only)
+
+    limit = conf.menu_search_max_results
+    ranked_ids = await menu_index.search_async(db, search)
+    rank = {item_id: position for position, item_id in enumerate(ranked_ids)}
+    items: List[Sandwich] = []
+    for start in range(0, len(ranked_ids), limit):
+        page = list(await db.scalars(stmt.where(Sandwich.id.in_(ranked_ids[start:start + limit]))))
+        page.sort(key=lambda item: rank[item.id])
+        items.extend(await _with_availability_async(db, page, available_only))
+        if len(items) >= limit:
+            break
+    return items[:limit]
+
+
+async def get_menu_item_async(db: "AsyncSession", item_id: int) -> Sandwich:
+    item = await db.get(Sandwich, item_id)
+    if not item:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Menu item not found",
+        )
+    return (await _with_availability_async(db, [item]))[0]
+
+
+def update_menu_item(db: Session, item_id: int, payload: MenuItemUpdate) -> Sandwich:
+    item = get_menu_item(db, item_id)
+
+    for field, value in payload.dict(exclude_unset=True).items():
+        setattr(item, field, value)
+
+    db.add(item)
+    db.commit()
+    db.refresh(item)
+    menu_cache.invalidate(item_id)
+    menu_index.index_item(item)
+    return _with_availability(db, [item])[0]
+
+
+def delete_menu_item(db: Session, item_id: int) -> None:
+    item = get_menu_item(db, item_id)
+
+    db.delete(item)
+    db.commit()
+    menu_cache.invalidate(item_id)
+    menu_index.remove_item(item_id)
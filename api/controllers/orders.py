@@ -1,31 +1,82 @@
+import csv
+import io
+import json
 from datetime import datetime
-from typing import List, Dict
+from typing import TYPE_CHECKING, Any, Iterator, List, Dict, Optional, Tuple
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, selectinload
 
 from ..models.orders import Order
 from ..models.order_details import OrderDetail
-from ..models.sandwiches import Sandwich
+from ..cache import menu as menu_cache
+from ..cache.menu import MenuItemSnapshot
+from .. import ids
+from ..dependencies import commit_hooks
+from ..dependencies.pagination import keyset_page, paginate
+from ..events import order_events
+from ..metrics import app_metrics
+from . import analytics, inventory
+from .promotion import validate_and_calculate_discount
 from ..schemas.orders import (
     OrderCreate,
     OrderResponse,
     OrderItemCreate,
+    OrderBatchResponse,
+    OrderBatchResult,
+    OrderStatus,
+    OrderStatusBulkResponse,
+    OrderStatusBulkUpdate,
+    OrderStatusResult,
 )
 
+if TYPE_CHECKING:  # the async driver is only needed when the async routes are served
+    from sqlalchemy.ext.asyncio import AsyncSession
+
 
 TAX_RATE = 0.07
 
+ORDER_KEYSET = (Order.order_date, Order.id)
 
-def _get_sandwiches_by_id(db: Session, ids: List[int]) -> Dict[int, Sandwich]:
-    if not ids:
-        return {}
+# target status -> statuses an order may move to it from
+ORDER_TRANSITIONS = {
+    OrderStatus.PREPARING: (OrderStatus.PLACED, OrderStatus.PENDING),
+    OrderStatus.READY: (OrderStatus.PREPARING,),
+    OrderStatus.DELIVERED: (OrderStatus.READY,),
+}
 
-    sandwiches = db.query(Sandwich).filter(Sandwich.id.in_(ids)).all()
-    return {s.id: s for s in sandwiches}
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+EXPORT_FORMATS = tuple(EXPORT_MEDIA_TYPES)
+EXPORT_COLUMNS = (
+    Order.id,
+    Order.tracking_number,
+    Order.customer_id,
+    Order.order_status,
+    Order.order_date,
+    Order.subtotal,
+    Order.tax_amount,
+    Order.discount_amount,
+    Order.total_price,
+    Order.promotion_code,
+    Order.guest_name,
+    Order.delivery_address,
+)
+EXPORT_BATCH_SIZE = 1000
 
 
-def create_order(db: Session, order_in: OrderCreate) -> Order:
+def _orders_with_items(db: Session):
+    # One extra SELECT ... WHERE order_id IN (...) per page instead of one
+    # lazy load per order when the response serializes order_items.
+    return db.query(Order).options(selectinload(Order.order_details))
+
+
+def _check_order_items(order_in: OrderCreate) -> None:
     if not order_in.order_items:
         raise HTTPException(status_code=400, detail="Order must contain at least one item.")
 
@@ -36,9 +87,11 @@ def create_order(db: Session, order_in: OrderCreate) -> Order:
                 detail=f"Invalid quantity {item.quantity} for menu item {item.menu_item_id}.",
             )
 
-    sandwich_ids = [item.menu_item_id for item in order_in.order_items]
-    sandwiches_by_id = _get_sandwiches_by_id(db, sandwich_ids)
 
+def _price_order_items(
+    order_in: OrderCreate, sandwiches_by_id: Dict[int, MenuItemSnapshot]
+) -> Tuple[float, List[Dict[str, Any]]]:
+    sandwich_ids = [item.menu_item_id for item in order_in.order_items]
     missing_ids = set(sandwich_ids) - set(sandwiches_by_id.keys())
     if missing_ids:
         raise HTTPException(
@@ -47,29 +100,58 @@ def create_order(db: Session, order_in: OrderCreate) -> Order:
         )
 
     subtotal = 0.0
-    order_details: List[OrderDetail] = []
+    lines: List[Dict[str, Any]] = []
 
     for item in order_in.order_items:
         sandwich = sandwiches_by_id[item.menu_item_id]
-        unit_price = float(sandwich.price)
+        unit_price = sandwich.price
         line_subtotal = unit_price * item.quantity
         subtotal += line_subtotal
 
-        detail = OrderDetail(
-            sandwich_id=item.menu_item_id,
-            amount=item.quantity,
-            quantity=item.quantity,
-            unit_price=unit_price,
-            subtotal=line_subtotal,
-            special_requests=item.special_requests,
+        lines.append(
+            {
+                "sandwich_id": item.menu_item_id,
+                "amount": item.quantity,
+                "quantity": item.quantity,
+                "unit_price": unit_price,
+                "subtotal": line_subtotal,
+                "special_requests": item.special_requests,
+            }
         )
-        order_details.append(detail)
 
-    discount_amount = 0.0  # you can later plug in promo logic here
+    return subtotal, lines
+
+
+def _line_quantities(lines: List[Dict[str, Any]]) -> Iterator[Tuple[int, int]]:
+    return ((line["sandwich_id"], line["quantity"]) for line in lines)
+
+
+def create_order(db: Session, order_in: OrderCreate) -> Order:
+    _check_order_items(order_in)
+
+    sandwich_ids = [item.menu_item_id for item in order_in.order_items]
+    sandwiches_by_id = menu_cache.get_menu_items(db, sandwich_ids)
+
+    subtotal, lines = _price_order_items(order_in, sandwiches_by_id)
+    order_details: List[OrderDetail] = [OrderDetail(**line) for line in lines]
+
+    # stock and the promotion are taken in this transaction and committed
+    # together with the order below
+    inventory.reserve_resources(db, inventory.recipe_demand(db, _line_quantities(lines)))
+    try:
+        promo_result = validate_and_calculate_discount(
+            db=db,
+            promo_code=order_in.promotion_code,
+            order_subtotal=subtotal,
+        )
+    except HTTPException:
+        db.rollback()
+        raise
+    discount_amount = promo_result["discount_amount"]
     tax_amount = round(subtotal * TAX_RATE, 2)
     total_price = subtotal + tax_amount - discount_amount
 
-    tracking_number = f"TRK-{int(datetime.utcnow().timestamp())}"
+    tracking_number = ids.tracking_number("TRK")
 
     order = Order(
         customer_id=order_in.customer_id,
@@ -85,34 +167,381 @@ def create_order(db: Session, order_in: OrderCreate) -> Order:
         estimated_delivery_time=None,
         actual_delivery_time=None,
         updated_at=None,
-        promotion_code=order_in.promotion_code,
+        promotion_code=promo_result["promo_code"],
     )
 
     for detail in order_details:
         detail.order = order
 
     db.add(order)
+    analytics.record_orders(db, [analytics.sale_from_order(order)])
     db.commit()
     db.refresh(order)
+    order_events.publish_created(db, [order])
+    commit_hooks.run(db, app_metrics.record_orders_created, [order])
     return order
 
 
+def _validation_error_message(exc: ValidationError) -> str:
+    parts = []
+    for error in exc.errors():
+        location = ".".join(str(loc) for loc in error["loc"])
+        parts.append(f"{location}: {error['msg']}" if location else error["msg"])
+    return "; ".join(parts)
+
+
+def create_orders_batch(db: Session, payloads: List[Dict[str, Any]]) -> OrderBatchResponse:
+    """Create many orders in one transaction.
+
+    Every payload is validated on its own, so a bad order only fails its own
+    slot in the result list. Referenced sandwiches and their recipes are
+    resolved with one IN query each, and the valid orders and their details
+    are written with multi-row inserts and one commit, together with any
+    stock reservations and promotion redemptions.
+    """
+    results: List[OrderBatchResult] = [
+        OrderBatchResult(index=index, success=False) for index in range(len(payloads))
+    ]
+
+    parsed: Dict[int, OrderCreate] = {}
+    for index, payload in enumerate(payloads):
+        try:
+            order_in = OrderCreate.model_validate(payload)
+            _check_order_items(order_in)
+        except ValidationError as exc:
+            results[index].error = _validation_error_message(exc)
+            continue
+        except HTTPException as exc:
+            results[index].error = exc.detail
+            continue
+        parsed[index] = order_in
+
+    sandwich_ids = {
+        item.menu_item_id
+        for order_in in parsed.values()
+        for item in order_in.order_items
+    }
+    sandwiches_by_id = menu_cache.get_menu_items(db, sandwich_ids)
+    recipes = inventory.load_recipes(db, sandwich_ids)
+
+    now = datetime.utcnow()
+    order_rows: List[Dict[str, Any]] = []
+    lines_by_tracking: Dict[str, List[Dict[str, Any]]] = {}
+    index_by_tracking: Dict[str, int] = {}
+
+    for index, order_in in parsed.items():
+        demand: Dict[int, int] = {}
+        try:
+            subtotal, lines = _price_order_items(order_in, sandwiches_by_id)
+            demand = inventory.demand_for(recipes, _line_quantities(lines))
+            inventory.reserve_resources(db, demand)
+        except HTTPException as exc:
+            results[index].error = exc.detail
+            continue
+        try:
+            promo_result = validate_and_calculate_discount(
+                db=db,
+                promo_code=order_in.promotion_code,
+                order_subtotal=subtotal,
+            )
+        except HTTPException as exc:
+            # the other orders in the batch commit, so hand this one's stock back
+            inventory.release_resources(db, demand)
+            results[index].error = exc.detail
+            continue
+
+        discount_amount = promo_result["discount_amount"]
+        tax_amount = round(subtotal * TAX_RATE, 2)
+        tracking_number = ids.tracking_number("TRK")
+
+        order_rows.append(
+            {
+                "customer_id": order_in.customer_id,
+                "delivery_address": order_in.delivery_address,
+                "special_instructions": order_in.special_instructions,
+                "tracking_number": tracking_number,
+                "order_status": "PLACED",
+                "subtotal": subtotal,
+                "tax_amount": tax_amount,
+                "discount_amount": discount_amount,
+                "total_price": subtotal + tax_amount - discount_amount,
+                "order_date": now,
+                "estimated_delivery_time": None,
+                "actual_delivery_time": None,
+                "updated_at": None,
+                "promotion_code": promo_result["promo_code"],
+            }
+        )
+        lines_by_tracking[tracking_number] = lines
+        index_by_tracking[tracking_number] = index
+
+    if order_rows:
+        try:
+            db.execute(insert(Order), order_rows)
+            id_by_tracking = dict(
+                db.query(Order.tracking_number, Order.id)
+                .filter(Order.tracking_number.in_(list(index_by_tracking)))
+                .all()
+            )
+
+            detail_rows = [
+                {**line, "order_id": id_by_tracking[tracking_number]}
+                for tracking_number, lines in lines_by_tracking.items()
+                for line in lines
+            ]
+            db.execute(insert(OrderDetail), detail_rows)
+            analytics.record_orders(db, (
+                {**row, "lines": lines_by_tracking[row["tracking_number"]]} for row in order_rows
+            ))
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            error = str(e.__dict__.get("orig", e))
+            raise HTTPException(status_code=400, detail=error)
+
+        orders = (
+            _orders_with_items(db)
+            .filter(Order.id.in_(list(id_by_tracking.values())))
+            .all()
+        )
+        order_events.publish_created(db, orders)
+        commit_hooks.run(db, app_metrics.record_orders_created, orders)
+        for order in orders:
+            result = results[index_by_tracking[order.tracking_number]]
+            result.success = True
+            result.order = OrderResponse.model_validate(order)
+
+    created = sum(1 for result in results if result.success)
+    return OrderBatchResponse(
+        created=created,
+        failed=len(results) - created,
+        results=results,
+    )
+
+
 def get_order(db: Session, order_id: int) -> Order:
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = _orders_with_items(db).filter(Order.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found.")
     return order
 
 
 def get_order_by_tracking(db: Session, tracking_number: str) -> Order:
-    order = db.query(Order).filter(Order.tracking_number == tracking_number).first()
+    order = _orders_with_items(db).filter(Order.tracking_number == tracking_number).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found.")
     return order
 
 
-def list_orders(db: Session, skip: int = 0, limit: int = 100) -> List[Order]:
-    return db.query(Order).offset(skip).limit(limit).all()
+def list_orders(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+) -> List[Order]:
+    return paginate(_orders_with_items(db), ORDER_KEYSET, skip=skip, limit=limit, cursor=cursor)
+
+def list_staff_orders(
+    db: Session, skip: int = 0, limit: int = 1000, cursor: Optional[str] = None
+) -> List[Order]:
+    return list_orders(db, skip=skip, limit=limit, cursor=cursor)
+
+
+# Native async versions of the order reads, used by the async routes so these
+# hot paths await the driver instead of going through AsyncSession.run_sync.
+
+def _select_orders_with_items():
+    return select(Order).options(selectinload(Order.order_details))
+
+
+async def get_order_async(db: "AsyncSession", order_id: int) -> Order:
+    order = await db.scalar(_select_orders_with_items().where(Order.id == order_id))
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found.")
+    return order
+
+
+async def get_order_by_tracking_async(db: "AsyncSession", tracking_number: str) -> Order:
+    order = await db.scalar(_select_orders_with_items().where(Order.tracking_number == tracking_number))
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found.")
+    return order
+
+
+async def list_orders_async(
+    db: "AsyncSession", skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+) -> List[Order]:
+    page = keyset_page(_select_orders_with_items(), ORDER_KEYSET, skip=skip, limit=limit, cursor=cursor)
+    return list(await db.scalars(page))
+
+
+async def list_staff_orders_async(
+    db: "AsyncSession", skip: int = 0, limit: int = 1000, cursor: Optional[str] = None
+) -> List[Order]:
+    return await list_orders_async(db, skip=skip, limit=limit, cursor=cursor)
+
+
+def update_order_statuses(db: Session, update_in: OrderStatusBulkUpdate) -> OrderStatusBulkResponse:
+    """Move many orders to one status with a single set-based UPDATE.
+
+    The UPDATE only matches orders whose current status may move to the
+    target, so an order changed concurrently by someone else is left alone.
+    The rows are read FOR UPDATE first (one SELECT) to report each order's
+    previous status and why it was skipped. Where FOR UPDATE is not
+    supported that read is not locked, so success is taken from the rows the
+    UPDATE actually matched (RETURNING, or a re-select where the backend
+    lacks it and the row count falls short).
+    """
+    target = update_in.order_status
+    allowed_from = ORDER_TRANSITIONS.get(target)
+    if allowed_from is None:
+        raise HTTPException(status_code=400, detail=f"Orders cannot be moved to {target.value}.")
+    if update_in.actual_delivery_time is not None and target != OrderStatus.DELIVERED:
+        raise HTTPException(
+            status_code=400, detail="actual_delivery_time can only be set when delivering orders."
+        )
+    allowed = [status.value for status in allowed_from]
+
+    order_ids = list(dict.fromkeys(update_in.order_ids))
+    current = {
+        order_id: (tracking_number, status)
+        for order_id, tracking_number, status in (
+            db.query(Order.id, Order.tracking_number, Order.order_status)
+            .filter(Order.id.in_(order_ids))
+            .with_for_update()
+        )
+    }
+    movable = [order_id for order_id in order_ids if order_id in current and current[order_id][1] in allowed]
+
+    now = datetime.utcnow()
+    values: Dict[str, Any] = {"order_status": target.value, "updated_at": now}
+    if target == OrderStatus.DELIVERED:
+        values["actual_delivery_time"] = update_in.actual_delivery_time or now
+    if update_in.estimated_delivery_time is not None:
+        values["estimated_delivery_time"] = update_in.estimated_delivery_time
+
+    updated_ids = set()
+    if movable:
+        stmt = (
+            update(Order)
+            .where(Order.id.in_(movable), Order.order_status.in_(allowed))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            if db.get_bind().dialect.update_returning:
+                updated_ids = set(db.scalars(stmt.returning(Order.id)))
+            else:
+                updated_ids = set(movable)
+                if db.execute(stmt).rowcount != len(movable):
+                    updated_ids = set(db.scalars(
+                        select(Order.id).where(
+                            Order.id.in_(movable), Order.order_status == target.value, Order.updated_at == now,
+                        )
+                    ))
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            error = str(e.__dict__.get("orig", e))
+            raise HTTPException(status_code=400, detail=error)
+
+    results: List[OrderStatusResult] = []
+    for order_id in order_ids:
+        if order_id not in current:
+            results.append(OrderStatusResult(order_id=order_id, success=False, error="Order not found."))
+            continue
+        previous = current[order_id][1]
+        result = OrderStatusResult(order_id=order_id, success=order_id in updated_ids, previous_status=previous)
+        if result.success:
+            result.order_status = target.value
+        elif order_id in movable:
+            result.error = "Order status changed while updating; reload it and retry."
+        else:
+            result.order_status = previous
+            result.error = (
+                f"Order is already {previous}." if previous == target.value
+                else f"Cannot move order from {previous} to {target.value}."
+            )
+        results.append(result)
+
+    order_events.publish_status_changed(db, [
+        order_events.status_change(
+            order_id, current[order_id][0], target.value, current[order_id][1],
+            now, values.get("actual_delivery_time"),
+        )
+        for order_id in movable
+        if order_id in updated_ids
+    ])
+
+    updated = len(updated_ids)
+    return OrderStatusBulkResponse(updated=updated, failed=len(results) - updated, results=results)
+
+
+def _export_rows(
+    db: Session, date_from: Optional[datetime], date_to: Optional[datetime]
+) -> Iterator[List[Tuple]]:
+    query = db.query(*EXPORT_COLUMNS)
+    if date_from is not None:
+        query = query.filter(Order.order_date >= date_from)
+    if date_to is not None:
+        query = query.filter(Order.order_date < date_to)
+    # stream_results asks the driver for a server-side cursor (SSCursor on
+    # MySQL), so rows arrive EXPORT_BATCH_SIZE at a time instead of all at once
+    result = (
+        query.order_by(Order.order_date, Order.id)
+        .execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+    )
+    batch: List[Tuple] = []
+    for row in result:
+        batch.append(tuple(row))
+        if len(batch) == EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _ndjson_chunks(db, date_from, date_to) -> Iterator[str]:
+    names = [column.key for column in EXPORT_COLUMNS]
+    for batch in _export_rows(db, date_from, date_to):
+        yield "".join(
+            json.dumps(dict(zip(names, row)), default=datetime.isoformat) + "\n"
+            for row in batch
+        )
+
+
+def _csv_chunks(db, date_from, date_to) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.key for column in EXPORT_COLUMNS])
+    for batch in _export_rows(db, date_from, date_to):
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in batch
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_orders(
+    db: Session,
+    export_format: str,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> Iterator[str]:
+    """Orders placed in [date_from, date_to) as an iterator of NDJSON or CSV text.
+
+    Rows are read and written in batches, so memory use does not grow with
+    the size of the range.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}",
+        )
+    if date_from is not None and date_to is not None and date_from >= date_to:
+        raise HTTPException(status_code=400, detail="from must be earlier than to.")
 
-def list_staff_orders(db: Session, skip: int = 0, limit: int = 1000) -> List[Order]:
-    return list_orders(db, skip=skip, limit=limit)
+    if export_format == "ndjson":
+        return _ndjson_chunks(db, date_from, date_to)
+    return _csv_chunks(db, date_from, date_to)
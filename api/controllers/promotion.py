@@ -1,11 +1,18 @@
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional, Union
 from fastapi import HTTPException
+from sqlalchemy import func, or_, select, update
 from sqlalchemy.orm import Session
 
+from ..cache import promotions as promotion_cache
+from ..cache.promotions import PromotionSnapshot
+from ..dependencies.pagination import keyset_page, paginate
 from ..models.promotion import Promotion
 from ..schemas.promotion import PromotionCreate, PromotionUpdate
 
+if TYPE_CHECKING:  # the async driver is only needed when the async routes are served
+    from sqlalchemy.ext.asyncio import AsyncSession
+
 
 def create_promotion(db: Session, promotion_in: PromotionCreate) -> Promotion:
     existing = (
@@ -40,17 +47,23 @@ def create_promotion(db: Session, promotion_in: PromotionCreate) -> Promotion:
     db.add(promo)
     db.commit()
     db.refresh(promo)
+    # drop any cached "code not found" entry
+    promotion_cache.invalidate(promo.code)
     return promo
 
 
+PROMOTION_KEYSET = (Promotion.created_at, Promotion.id)
+
+
 def list_promotions(
-    db: Session, skip: int = 0, limit: int = 100
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
 ) -> List[Promotion]:
-    return (db.query(Promotion)
-        .order_by(Promotion.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    return paginate(
+        db.query(Promotion).order_by(Promotion.created_at.desc()),
+        PROMOTION_KEYSET,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
     )
 
 def get_promotion(db: Session, promotion_id: int) -> Promotion:
@@ -63,6 +76,26 @@ def get_promotion(db: Session, promotion_id: int) -> Promotion:
         raise HTTPException(status_code=404, detail="Promotion not found.")
     return promo
 
+# Native async versions of the promotion reads, used by the async routes.
+
+async def list_promotions_async(
+    db: "AsyncSession", skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+) -> List[Promotion]:
+    page = keyset_page(
+        select(Promotion).order_by(Promotion.created_at.desc()),
+        PROMOTION_KEYSET,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+    )
+    return list(await db.scalars(page))
+
+async def get_promotion_async(db: "AsyncSession", promotion_id: int) -> Promotion:
+    promo = await db.scalar(select(Promotion).where(Promotion.id == promotion_id))
+    if not promo:
+        raise HTTPException(status_code=404, detail="Promotion not found.")
+    return promo
+
 def update_promotion(
     db: Session, promotion_id: int, promotion_in: PromotionUpdate
 ) -> Promotion:
@@ -80,14 +113,17 @@ def update_promotion(
 
     db.commit()
     db.refresh(promo)
+    promotion_cache.invalidate(promo.code)
     return promo
 
 def delete_promotion(db: Session, promotion_id: int) -> None:
     promo = get_promotion(db, promotion_id)
+    code = promo.code
     db.delete(promo)
     db.commit()
+    promotion_cache.invalidate(code)
 
-def _ensure_promotion_active(promo: Promotion) -> None:
+def _ensure_promotion_active(promo: Union[PromotionSnapshot, Promotion]) -> None:
     now = datetime.utcnow()
     start = promo.start_date
     exp = promo.expiration_date
@@ -125,12 +161,10 @@ def _ensure_promotion_active(promo: Promotion) -> None:
 
 def get_promotion_by_code(
     db: Session, code: str, active_only: bool = True
-) -> Promotion:
-    promo = (
-        db.query(Promotion)
-        .filter(Promotion.code == code)
-        .first()
-    )
+) -> PromotionSnapshot:
+    # Read through the promotion cache: the active-window and usage checks run
+    # against the cached snapshot and only redeem_promotion touches the DB.
+    promo = promotion_cache.get_by_code(db, code)
 
     if not promo:
         raise HTTPException(status_code=404, detail="Promotion code not found.")
@@ -140,7 +174,7 @@ def get_promotion_by_code(
 
     return promo
 
-def calculate_discount(promo: Promotion, order_subtotal: float) -> float:
+def calculate_discount(promo: PromotionSnapshot, order_subtotal: float) -> float:
     if order_subtotal < (promo.min_order_amount or 0.0):
         raise HTTPException(
             status_code=400,
@@ -160,18 +194,48 @@ def calculate_discount(promo: Promotion, order_subtotal: float) -> float:
 
     return round(discount, 2)
 
-def increment_usage(promo: Promotion) -> None:
-    if promo.usage_count is None:
-        promo.usage_count = 0
+def redeem_promotion(db: Session, code: str) -> None:
+    """Count one use of a promotion without committing.
+
+    A single conditional UPDATE re-checks the active flag, the date window and
+    the usage limit in the database, so concurrent checkouts can never push
+    usage_count past usage_limit. The caller commits it together with the
+    order, and a failed order rolls the redemption back with it. When the
+    UPDATE matches no row, the promotion is read again to report why.
+    """
+    now = datetime.utcnow()
+    usage_count = func.coalesce(Promotion.usage_count, 0)
+    result = db.execute(
+        update(Promotion)
+        .where(
+            Promotion.code == code,
+            Promotion.is_active == 1,
+            Promotion.start_date <= now,
+            Promotion.expiration_date >= now,
+            or_(Promotion.usage_limit.is_(None), usage_count < Promotion.usage_limit),
+        )
+        .values(usage_count=usage_count + 1)
+        .execution_options(synchronize_session=False)
+    )
 
-    if promo.usage_limit is not None and promo.usage_count >= promo.usage_limit:
+    if result.rowcount != 1:
+        # the cached snapshot was too optimistic; reload it on the next lookup
+        promotion_cache.invalidate(code)
+        promo = (
+            db.query(Promotion)
+            .filter(Promotion.code == code)
+            .populate_existing()
+            .first()
+        )
+        if not promo:
+            raise HTTPException(status_code=404, detail="Promotion code not found.")
+        _ensure_promotion_active(promo)
+        # changed back between the UPDATE and this read
         raise HTTPException(
             status_code=400,
-            detail="Promotion usage limit has been reached.",
+            detail="Promotion can no longer be redeemed.",
         )
 
-    promo.usage_count += 1
-
 def validate_and_calculate_discount(
     db: Session,
     promo_code: Optional[str],
@@ -189,12 +253,10 @@ def validate_and_calculate_discount(
     promo = get_promotion_by_code(db, promo_code, active_only=True)
 
     discount = calculate_discount(promo, order_subtotal)
-    final_subtotal = max(order_subtotal - discount, 0,0)
+    final_subtotal = max(order_subtotal - discount, 0.0)
     final_subtotal = round(final_subtotal, 2)
 
-    increment_usage(promo)
-    db.commit()
-    db.refresh(promo)
+    redeem_promotion(db, promo.code)
 
     return {
         "promo": promo,
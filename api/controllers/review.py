@@ -1,21 +1,43 @@
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
 
 from fastapi import HTTPException
-from sqlalchemy import func
+from sqlalchemy import case, func, select
 from sqlalchemy.orm import Session
 
+from ..models.menu_item_rating import MenuItemRating, STAR_BUCKETS, star_bucket_sql
 from ..models.review import Review
 from ..models.sandwiches import Sandwich
+from ..dependencies.pagination import keyset_page, paginate
 from ..schemas.review import ReviewResponse, RatingSummaryResponse
 
+if TYPE_CHECKING:  # the async driver is only needed when the async routes are served
+    from sqlalchemy.ext.asyncio import AsyncSession
 
-def list_reviews(db: Session, skip: int = 0, limit: int = 100) -> List[Review]:
-    return (
-        db.query(Review)
-        .order_by(Review.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+
+REVIEW_KEYSET = (Review.created_at, Review.id)
+
+MAX_SUMMARY_IDS = 500
+
+
+def parse_id_list(raw: str) -> List[int]:
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers.")
+    if len(ids) > MAX_SUMMARY_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SUMMARY_IDS} ids per request.")
+    return ids
+
+
+def list_reviews(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+) -> List[Review]:
+    return paginate(
+        db.query(Review).order_by(Review.created_at.desc()),
+        REVIEW_KEYSET,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
     )
 
 
@@ -24,32 +46,129 @@ def list_reviews_for_item(
     menu_item_id: int,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
 ) -> List[Review]:
+    return paginate(
+        db.query(Review).filter(Review.menu_item_id == menu_item_id).order_by(Review.created_at.desc()),
+        REVIEW_KEYSET,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+    )
+
+def _select_summaries(menu_item_ids: List[int]):
+    # One query: the outer join keeps menu items that have no reviews yet.
     return (
-        db.query(Review)
-        .filter(Review.menu_item_id == menu_item_id)
-        .order_by(Review.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+        select(Sandwich.id, MenuItemRating)
+        .outerjoin(MenuItemRating, MenuItemRating.menu_item_id == Sandwich.id)
+        .where(Sandwich.id.in_(menu_item_ids))
     )
 
-def get_rating_summary_for_item(db: Session, menu_item_id: int) -> RatingSummaryResponse:
-    # Make sure the menu item exists
-    exists = db.query(Sandwich).filter(Sandwich.id == menu_item_id).first()
-    if not exists:
+
+def _summaries_from_rows(rows, menu_item_ids: List[int]) -> List[RatingSummaryResponse]:
+    summaries = {}
+    for menu_item_id, rating in rows:
+        summaries[menu_item_id] = RatingSummaryResponse(
+            menu_item_id=menu_item_id,
+            average_rating=rating.average_rating if rating else 0.0,
+            review_count=rating.review_count if rating else 0,
+            histogram=rating.histogram() if rating else {star: 0 for star in STAR_BUCKETS},
+        )
+    return [summaries[i] for i in menu_item_ids if i in summaries]
+
+
+def _summaries(db: Session, menu_item_ids: List[int]) -> List[RatingSummaryResponse]:
+    return _summaries_from_rows(db.execute(_select_summaries(menu_item_ids)).all(), menu_item_ids)
+
+
+def _summary_or_404(summaries: List[RatingSummaryResponse], menu_item_id: int) -> RatingSummaryResponse:
+    if not summaries:
         raise HTTPException(status_code=404, detail=f"Menu item {menu_item_id} not found")
+    return summaries[0]
+
+
+def get_rating_summary_for_item(db: Session, menu_item_id: int) -> RatingSummaryResponse:
+    return _summary_or_404(_summaries(db, [menu_item_id]), menu_item_id)
+
 
-    avg_rating, count = (
-        db.query(func.avg(Review.rating), func.count(Review.id))
-        .filter(Review.menu_item_id == menu_item_id)
-        .one()
+def get_rating_summaries(db: Session, menu_item_ids: List[int]) -> List[RatingSummaryResponse]:
+    """Summaries for many menu items at once; unknown ids are left out."""
+    if not menu_item_ids:
+        return []
+    return _summaries(db, list(dict.fromkeys(menu_item_ids)))
+
+
+# Native async versions of the review reads, used by the async routes.
+
+async def list_reviews_async(
+    db: "AsyncSession", skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+) -> List[Review]:
+    page = keyset_page(
+        select(Review).order_by(Review.created_at.desc()),
+        REVIEW_KEYSET,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+    )
+    return list(await db.scalars(page))
+
+
+async def list_reviews_for_item_async(
+    db: "AsyncSession",
+    menu_item_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> List[Review]:
+    page = keyset_page(
+        select(Review).where(Review.menu_item_id == menu_item_id).order_by(Review.created_at.desc()),
+        REVIEW_KEYSET,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
     )
+    return list(await db.scalars(page))
+
+
+async def _summaries_async(db: "AsyncSession", menu_item_ids: List[int]) -> List[RatingSummaryResponse]:
+    return _summaries_from_rows((await db.execute(_select_summaries(menu_item_ids))).all(), menu_item_ids)
+
+
+async def get_rating_summary_for_item_async(db: "AsyncSession", menu_item_id: int) -> RatingSummaryResponse:
+    return _summary_or_404(await _summaries_async(db, [menu_item_id]), menu_item_id)
 
-    average = float(avg_rating) if avg_rating is not None else 0.0
 
-    return RatingSummaryResponse(
-        menu_item_id=menu_item_id,
-        average_rating=average,
-        review_count=count,
-    )
\ No newline at end of file
+async def get_rating_summaries_async(db: "AsyncSession", menu_item_ids: List[int]) -> List[RatingSummaryResponse]:
+    if not menu_item_ids:
+        return []
+    return await _summaries_async(db, list(dict.fromkeys(menu_item_ids)))
+
+
+def rebuild_rating_aggregates(db: Session) -> int:
+    """Recompute every menu_item_ratings row from the reviews table.
+
+    The aggregates are maintained by Review mapper events, so this is only
+    needed after bulk writes that bypass the ORM or to backfill existing data.
+    Returns the number of menu items with reviews.
+    """
+    bucket = star_bucket_sql(Review.rating)
+    columns = [
+        Review.menu_item_id,
+        func.sum(Review.rating),
+        func.count(Review.id),
+        *(func.sum(case((bucket == star, 1), else_=0)) for star in STAR_BUCKETS),
+    ]
+    rows = db.query(*columns).group_by(Review.menu_item_id).all()
+
+    db.query(MenuItemRating).delete(synchronize_session=False)
+    db.add_all(
+        MenuItemRating(
+            menu_item_id=menu_item_id,
+            rating_sum=float(rating_sum),
+            review_count=count,
+            **{f"stars_{star}": int(n or 0) for star, n in zip(STAR_BUCKETS, stars)},
+        )
+        for menu_item_id, rating_sum, count, *stars in rows
+    )
+    db.commit()
+    return len(rows)
@@ -0,0 +1,53 @@
+"""Side effects of a write, run once the write is durably committed.
+
+Caches and the order feed react to writes from Session after_commit
+listeners, or from controllers right after db.commit(). A session joined to
+a transaction it does not own (the idempotency store's handler session) is
+held: its commit() only flushes into that transaction, so the listeners
+leave their pending work in session.info and run() queues callbacks there
+too. committed() runs all of it once the owning transaction has committed;
+if the held session rolls back, the work is dropped with it.
+"""
+from typing import Any, Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_HELD_KEY = "commit_held"
+_CALLBACKS_KEY = "commit_callbacks"
+
+
+def hold(session: Session) -> None:
+    """Mark `session` as joined to a transaction that commits elsewhere."""
+    session.info[_HELD_KEY] = True
+
+
+def held(session: Session) -> bool:
+    return session.info.get(_HELD_KEY, False)
+
+
+def run(db: Session, fn: Callable[..., Any], *args: Any) -> None:
+    """Call fn(*args) now, after db.commit(), or once a held `db` is committed."""
+    if held(db):
+        db.info.setdefault(_CALLBACKS_KEY, []).append((fn, args))
+    else:
+        fn(*args)
+
+
+def committed(session: Session) -> None:
+    """The transaction a held `session` was joined to has committed."""
+    if session.info.pop(_HELD_KEY, False):
+        session.dispatch.after_commit(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_callbacks(session):
+    if held(session):
+        return
+    for fn, args in session.info.pop(_CALLBACKS_KEY, ()):
+        fn(*args)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_callbacks(session):
+    session.info.pop(_CALLBACKS_KEY, None)
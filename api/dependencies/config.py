@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -9,4 +10,47 @@ class conf:
     db_user = "root"
     db_password = os.getenv("DB_PASSWORD", "")
     app_host = "localhost"
-    app_port = 8000
\ No newline at end of file
+    app_port = 8000
+    async_db = os.getenv("ASYNC_DB", "0") == "1"
+    db_url = os.getenv("DB_URL") or None  # overrides the MySQL settings above
+    db_replica_urls = [url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()]
+    db_replica_retry_seconds = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+    db_read_your_writes_seconds = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+    db_pool_size = int(os.getenv("DB_POOL_SIZE", "10"))
+    db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    db_pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    db_pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    db_pool_pre_ping = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+    menu_cache_size = int(os.getenv("MENU_CACHE_SIZE", "1024"))
+    menu_cache_ttl = float(os.getenv("MENU_CACHE_TTL", "300"))
+    promo_cache_size = int(os.getenv("PROMO_CACHE_SIZE", "1024"))
+    promo_cache_ttl = float(os.getenv("PROMO_CACHE_TTL", "60"))
+    promo_cache_negative_ttl = float(os.getenv("PROMO_CACHE_NEGATIVE_TTL", "10"))
+    menu_search_rebuild_seconds = float(os.getenv("MENU_SEARCH_REBUILD_SECONDS", "300"))
+    menu_search_max_results = int(os.getenv("MENU_SEARCH_MAX_RESULTS", "200"))
+    menu_availability_refresh_seconds = float(os.getenv("MENU_AVAILABILITY_REFRESH_SECONDS", "30"))
+    idempotency_store = os.getenv("IDEMPOTENCY_STORE", "memory")  # memory | database
+    idempotency_ttl = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+    idempotency_lock_seconds = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+    idempotency_wait_seconds = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+    idempotency_memory_max_keys = int(os.getenv("IDEMPOTENCY_MEMORY_MAX_KEYS", "100000"))
+    order_stream_buffer = int(os.getenv("ORDER_STREAM_BUFFER", "10000"))
+    order_stream_queue_size = int(os.getenv("ORDER_STREAM_QUEUE_SIZE", "1000"))
+    order_stream_heartbeat_seconds = float(os.getenv("ORDER_STREAM_HEARTBEAT_SECONDS", "15"))
+    order_stream_retry_ms = int(os.getenv("ORDER_STREAM_RETRY_MS", "3000"))
+    order_stream_catch_up_limit = int(os.getenv("ORDER_STREAM_CATCH_UP_LIMIT", "5000"))
+    http_cache_max_age = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))
+    http_revalidate_seconds = float(os.getenv("HTTP_REVALIDATE_SECONDS", "30"))
+    schema_check = os.getenv("SCHEMA_CHECK", "warn")  # off | warn | strict
+    prewarm_caches = os.getenv("PREWARM_CACHES", "0") == "1"
+    sql_instrumentation = os.getenv("SQL_INSTRUMENTATION", "0") == "1"
+    sql_n_plus_one_threshold = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+    sql_log_query_count = int(os.getenv("SQL_LOG_QUERY_COUNT", "30"))
+    sql_log_db_ms = float(os.getenv("SQL_LOG_DB_MS", "200"))
+    # read by prometheus_client itself at import, so set it in the environment
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR") or None
+    worker_id = int(os.environ["WORKER_ID"]) if os.getenv("WORKER_ID") else None  # the host's number
+    worker_slots = int(os.getenv("WORKER_SLOTS", "16"))  # worker processes per host
+    # this process's slot, where no lock file can be taken (no fcntl); must differ per process
+    worker_slot = int(os.environ["WORKER_SLOT"]) if os.getenv("WORKER_SLOT") else None
+    worker_id_lock_dir = os.getenv("WORKER_ID_LOCK_DIR") or os.path.join(tempfile.gettempdir(), "sandwich-worker-ids")
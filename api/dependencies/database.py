@@ -1,20 +1,84 @@
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 from .config import conf
+from . import pool_stats, replicas as replica_routing
 from urllib.parse import quote_plus
 
-SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{conf.db_user}:{quote_plus(conf.db_password)}@{conf.db_host}:{conf.db_port}/{conf.db_name}?charset=utf8mb4"
+POOL_OPTIONS = {
+    "pool_size": conf.db_pool_size,
+    "max_overflow": conf.db_max_overflow,
+    "pool_timeout": conf.db_pool_timeout,
+    "pool_recycle": conf.db_pool_recycle,
+    "pool_pre_ping": conf.db_pool_pre_ping,
+}
+
+SQLALCHEMY_DATABASE_URL = conf.db_url or f"mysql+pymysql://{conf.db_user}:{quote_plus(conf.db_password)}@{conf.db_host}:{conf.db_port}/{conf.db_name}?charset=utf8mb4"
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=pool_stats.InstrumentedQueuePool,
+    **replica_routing.engine_options(SQLALCHEMY_DATABASE_URL),
+    **POOL_OPTIONS,
 )
+pool_stats.instrument("primary", engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# GET requests read from these when DB_REPLICA_URLS is set (see replicas.py)
+replicas = replica_routing.ReplicaSet.from_urls(conf.db_replica_urls, conf.db_replica_retry_seconds, **POOL_OPTIONS)
+
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
+def get_db(request: Request):
+    db = replica_routing.open_session(request, SessionLocal, replicas)
     try:
         yield db
     finally:
         db.close()
+
+
+# Opt-in async routes for the hot reads (conf.async_db). The engine is built on first use so the
+# async driver is only needed when the async routes are actually served.
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_url(url: str) -> str:
+    """`url` with its driver swapped for the async driver of the same backend."""
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)).render_as_string(
+        hide_password=False
+    )
+
+
+ASYNC_SQLALCHEMY_DATABASE_URL = async_url(SQLALCHEMY_DATABASE_URL)
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        _async_engine = create_async_engine(
+            ASYNC_SQLALCHEMY_DATABASE_URL,
+            poolclass=pool_stats.InstrumentedAsyncAdaptedQueuePool,
+            **POOL_OPTIONS,
+        )
+        pool_stats.instrument("async", _async_engine)
+    return _async_engine
+
+
+def get_async_sessionmaker():
+    global _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _AsyncSessionLocal = async_sessionmaker(autoflush=False, bind=get_async_engine())
+    return _AsyncSessionLocal
+
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
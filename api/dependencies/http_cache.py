@@ -0,0 +1,82 @@
+"""Conditional GET support for the public read endpoints.
+
+Routes call check() before doing any work. It stamps ETag, Last-Modified
+and Cache-Control on the response from the in-memory version counters in
+api.cache.versions, and returns a ready 304 when the client's copy is still
+current, so no database session is used for it (the menu routes only query
+first when committed stock or recipe writes are waiting, see
+availability.refresh).
+"""
+import threading
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from ..cache import versions
+from .config import conf
+
+_bodies_lock = threading.Lock()
+_bodies: Dict[str, Tuple[str, bytes]] = {}  # key -> (etag, serialized body)
+
+
+def _headers(validators: versions.Validators) -> Dict[str, str]:
+    return {
+        "ETag": validators.etag,
+        "Last-Modified": format_datetime(validators.last_modified, usegmt=True),
+        "Cache-Control": f"public, max-age={conf.http_cache_max_age}, must-revalidate",
+    }
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # weak comparison, as If-None-Match requires
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+
+def _not_modified(request: Request, validators: versions.Validators) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, validators.etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return validators.last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def check(request: Request, response: Response, *keys: str) -> Optional[Response]:
+    """Set validators for `keys` on `response`; a 304 if the client is current."""
+    validators = versions.validators(*keys)
+    headers = _headers(validators)
+    if _not_modified(request, validators):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def cached_body(name: str, response: Response) -> Optional[bytes]:
+    """Body stored by store_body() for the ETag check() just set, if any."""
+    with _bodies_lock:
+        etag, body = _bodies.get(name, (None, None))
+    return body if etag == response.headers.get("etag") else None
+
+
+def store_body(name: str, response: Response, body: bytes) -> bytes:
+    # the ETag was taken before the data was read, so the body is at least
+    # as new as the version it is stored under
+    with _bodies_lock:
+        _bodies[name] = (response.headers["etag"], body)
+    return body
+
+
+def json_response(body: bytes, response: Response) -> Response:
+    return Response(content=body, media_type="application/json", headers=dict(response.headers))
+
+
+def clear() -> None:
+    with _bodies_lock:
+        _bodies.clear()
@@ -0,0 +1,95 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Select, or_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# A keyset is the (sort column, id column) pair a cursor walk is ordered by,
+# newest first. The id breaks ties between rows with the same sort value.
+Keyset = Tuple[Any, Any]
+
+
+def encode_cursor(value: datetime, row_id: int) -> str:
+    raw = json.dumps([value.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(value), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
+
+
+def keyset_page(
+    query: Union[Query, Select],
+    keyset: Keyset,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Union[Query, Select]:
+    """Limit `query` to one page. Works on an ORM Query or a select().
+
+    Without a cursor this is classic OFFSET/LIMIT in the query's own order.
+    With one, the page is ordered newest first by `keyset` and starts right
+    after the row the cursor was taken from (a range scan on the keyset
+    index); an empty cursor starts the walk at the newest row.
+    """
+    if cursor is None:
+        return query.offset(skip).limit(limit)
+
+    if skip:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="skip cannot be combined with cursor.",
+        )
+
+    sort_column, id_column = keyset
+    query = query.order_by(None).order_by(sort_column.desc(), id_column.desc())
+    if cursor:
+        value, row_id = decode_cursor(cursor)
+        # The leading `<=` is redundant logically but gives the planner a range
+        # bound on the index; a bare OR makes SQLite scan the index from the top.
+        query = query.filter(
+            sort_column <= value,
+            or_(sort_column < value, id_column < row_id),
+        )
+    return query.limit(limit)
+
+
+def paginate(
+    query: Query,
+    keyset: Keyset,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> List[Any]:
+    """One page of `query`'s rows (see keyset_page)."""
+    return keyset_page(query, keyset, skip=skip, limit=limit, cursor=cursor).all()
+
+
+def next_cursor(rows: Sequence[Any], limit: int, keyset: Keyset, cursor: Optional[str]) -> Optional[str]:
+    # OFFSET pages are not in keyset order, so only a cursor page leads on
+    if cursor is None or len(rows) < limit:
+        return None
+    sort_column, id_column = keyset
+    last = rows[-1]
+    return encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+
+def set_next_cursor(
+    response: Response, rows: Sequence[Any], limit: int, keyset: Keyset, cursor: Optional[str]
+) -> None:
+    following = next_cursor(rows, limit, keyset, cursor)
+    if following is not None:
+        response.headers[NEXT_CURSOR_HEADER] = following
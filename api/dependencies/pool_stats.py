@@ -0,0 +1,132 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    """Counters for one engine's connection pool.
+
+    Checkouts, checkins, new connections and invalidations come from
+    SQLAlchemy pool events. Pool events fire only after a connection has been
+    handed out, so the time spent waiting for one is measured by the
+    instrumented pool classes below.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def incr(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_acquire(self, seconds: float, waited: bool, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if waited:
+                self.waits += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+
+class _TimedCheckoutMixin:
+    def __init__(self, creator, pool_size=5, max_overflow=10, **kw):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kw)
+        self.max_overflow = max_overflow
+        self.stats = PoolStats()
+
+    def _exhausted(self) -> bool:
+        if self.max_overflow < 0:
+            return False
+        return self.checkedin() == 0 and self.overflow() >= self.max_overflow
+
+    def connect(self):
+        waited = self._exhausted()
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record_acquire(time.perf_counter() - start, waited, timed_out=True)
+            raise
+        self.stats.record_acquire(time.perf_counter() - start, waited)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting into the same stats
+        new_pool = super().recreate()
+        new_pool.stats = self.stats
+        return new_pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_engines: Dict[str, Any] = {}
+
+
+def instrument(name: str, engine) -> None:
+    """Attach pool event listeners to `engine` and report it under `name`.
+
+    The engine must have been created with one of the instrumented pool
+    classes above (poolclass=...). Async engines may be passed directly.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not hasattr(sync_engine.pool, "stats"):
+        raise TypeError(f"Engine {name!r} does not use an instrumented pool class.")
+
+    def _listener(counter):
+        def _count(*args):
+            sync_engine.pool.stats.incr(counter)
+        return _count
+
+    event.listen(sync_engine, "connect", _listener("connects"))
+    event.listen(sync_engine, "checkout", _listener("checkouts"))
+    event.listen(sync_engine, "checkin", _listener("checkins"))
+    event.listen(sync_engine, "invalidate", _listener("invalidations"))
+    _engines[name] = sync_engine
+
+
+def pool_status(name: str) -> Dict[str, Any]:
+    pool = _engines[name].pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": pool.max_overflow,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # QueuePool counts overflow from -pool_size until the pool is full
+        "overflow": max(pool.overflow(), 0),
+        **pool.stats.snapshot(),
+    }
+
+
+def all_pool_status() -> Dict[str, Dict[str, Any]]:
+    return {name: pool_status(name) for name in _engines}
@@ -0,0 +1,209 @@
+"""Per-request SQL statement counts and database time.
+
+While enabled, cursor execute events on every Engine are attributed to the
+request being served (a context variable set by QueryStatsMiddleware, which
+the threadpool and the async driver's greenlets inherit). Each response gets
+
+    Server-Timing: db;dur=12.4;desc="7 queries", app;dur=31.0
+
+and when the request finishes:
+
+* a statement shape (the SQL with literals and IN lists collapsed) seen
+  conf.sql_n_plus_one_threshold times or more is logged as a likely N+1;
+* a request over conf.sql_log_query_count statements or conf.sql_log_db_ms
+  of database time is logged as slow;
+* the totals are added to per-route counters (GET /diagnostics/sql).
+
+enable()/disable() switch it at runtime, in this process only. While
+disabled no engine listeners are registered and the middleware only checks
+a flag before handing the request on. Statements run while a streaming body
+is sent are counted in the logs and route totals, but not in the header,
+which has gone out by then.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import conf
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIMING_HEADER = "Server-Timing"
+RECENT_FLAGGED = 50
+
+_START_KEY = "query_stats_start"
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*(?:\?|%s|:\w+)(?:\s*,\s*(?:\?|%s|:\w+))*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str) -> str:
+    """`statement` with literals and parameter lists collapsed to `?`."""
+    shape = _LITERALS.sub("?", statement)
+    shape = _IN_LISTS.sub("(?)", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+class RequestQueries:
+    """Statements run on behalf of one request."""
+
+    __slots__ = ("count", "db_seconds", "shapes", "started")
+
+    def __init__(self):
+        self.count = 0
+        self.db_seconds = 0.0
+        self.shapes: Counter = Counter()
+        self.started = time.perf_counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.db_seconds += seconds
+        self.shapes[statement] += 1
+
+    def repeated(self, threshold: int) -> List[Dict[str, Any]]:
+        """Shapes run at least `threshold` times, most repeated first."""
+        by_shape: Counter = Counter()
+        for statement, count in self.shapes.items():
+            by_shape[statement_shape(statement)] += count
+        return [{"statement": shape, "count": count}
+                for shape, count in by_shape.most_common() if count >= threshold]
+
+    def server_timing(self) -> str:
+        db_ms = self.db_seconds * 1000
+        app_ms = (time.perf_counter() - self.started) * 1000
+        return f'db;dur={db_ms:.1f};desc="{self.count} queries", app;dur={app_ms:.1f}'
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+_enabled = False
+_toggle_lock = threading.Lock()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _current.get()
+    starts = conn.info.get(_START_KEY)
+    if queries is None or not starts:
+        return
+    queries.record(statement, time.perf_counter() - starts.pop())
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable() -> None:
+    global _enabled
+    with _toggle_lock:
+        if not _enabled:
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    with _toggle_lock:
+        if _enabled:
+            event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+            _enabled = False
+
+
+_stats_lock = threading.Lock()
+_routes: Dict[str, Dict[str, float]] = {}
+_flagged: deque = deque(maxlen=RECENT_FLAGGED)
+
+
+def _route_name(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "<unmatched>"
+    return f"{scope['method']} {path}"
+
+
+def _finish(scope, queries: RequestQueries) -> None:
+    route = _route_name(scope)
+    db_ms = queries.db_seconds * 1000
+    repeated = queries.repeated(conf.sql_n_plus_one_threshold)
+
+    with _stats_lock:
+        totals = _routes.setdefault(route, {"requests": 0, "queries": 0, "db_ms": 0.0, "max_queries": 0})
+        totals["requests"] += 1
+        totals["queries"] += queries.count
+        totals["db_ms"] += db_ms
+        totals["max_queries"] = max(totals["max_queries"], queries.count)
+        if repeated:
+            _flagged.append({"route": route, "path": scope["path"], "repeated": repeated})
+
+    for shape in repeated:
+        logger.warning("Possible N+1 in %s: statement ran %d times: %s", route, shape["count"], shape["statement"])
+    if queries.count > conf.sql_log_query_count or db_ms > conf.sql_log_db_ms:
+        logger.warning("Slow request %s %s: %d queries, %.1f ms in the database",
+                       scope["method"], scope["path"], queries.count, db_ms)
+
+
+def stats() -> Dict[str, Any]:
+    with _stats_lock:
+        routes = {
+            route: {**totals, "db_ms": round(totals["db_ms"], 3),
+                    "queries_per_request": round(totals["queries"] / totals["requests"], 2)}
+            for route, totals in sorted(_routes.items(), key=lambda item: -item[1]["queries"])
+        }
+        flagged = list(_flagged)
+    return {
+        "enabled": _enabled,
+        "thresholds": {
+            "n_plus_one": conf.sql_n_plus_one_threshold,
+            "query_count": conf.sql_log_query_count,
+            "db_ms": conf.sql_log_db_ms,
+        },
+        "routes": routes,
+        "recent_n_plus_one": flagged,
+    }
+
+
+def clear() -> None:
+    with _stats_lock:
+        _routes.clear()
+        _flagged.clear()
+
+
+class QueryStatsMiddleware:
+    """Collects RequestQueries for each HTTP request while enabled."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not _enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((SERVER_TIMING_HEADER.lower().encode(), queries.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current.set(queries)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            _finish(scope, queries)
@@ -0,0 +1,196 @@
+"""Routing of request sessions between the primary and read replicas.
+
+GET and HEAD requests read from a replica picked round robin; every other
+method gets the primary. The replica connection is checked out on the
+session's first statement, so a request that never queries (a 304, a live
+stream) takes none. A replica that fails to hand out a connection is skipped
+for conf.db_replica_retry_seconds, and the session falls through to the next
+one, or to the primary when none is left.
+
+Read-your-writes: ReadYourWritesMiddleware sets a cookie on the response
+to every write request, whatever response the route returned, holding the
+time until which that client's reads stay on the primary
+(conf.db_read_your_writes_seconds). It is a plain timestamp; the worst a
+forged one can do is send its own reads to the primary.
+
+Replica reads can lag the primary. The availability matrix and the menu
+search index are refreshed through primary_session(), so a lagging replica
+is never loaded into them; the menu listing body and HTTP validators cached
+during a replica read may keep a lagged copy until the next write.
+"""
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+from fastapi import Request, Response
+from starlette.datastructures import MutableHeaders
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import pool_stats
+from .config import conf
+
+STICKY_COOKIE = "db_primary_until"
+READ_METHODS = frozenset({"GET", "HEAD"})
+REPLICA_INFO_KEY = "replica"
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    # sessions are used from the threadpool
+    return {"connect_args": {"check_same_thread": False}} if url.startswith("sqlite") else {}
+
+
+class Replica:
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.down_until = 0.0
+        self.failures = 0
+
+
+class ReplicaSet:
+    """Health-aware round robin over replica engines."""
+
+    def __init__(self, replicas: List[Replica], retry_seconds: float):
+        self.replicas = replicas
+        self.retry_seconds = retry_seconds
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_urls(cls, urls: List[str], retry_seconds: float, **engine_kwargs) -> "ReplicaSet":
+        replicas = []
+        for i, url in enumerate(urls, start=1):
+            engine = create_engine(
+                url, poolclass=pool_stats.InstrumentedQueuePool, **engine_options(url), **engine_kwargs,
+            )
+            pool_stats.instrument(f"replica-{i}", engine)
+            replicas.append(Replica(f"replica-{i}", engine))
+        return cls(replicas, retry_seconds)
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    def candidates(self) -> List[Replica]:
+        """Healthy replicas, starting from the next one in turn."""
+        if not self.replicas:
+            return []
+        start = next(self._turn) % len(self.replicas)
+        now = time.monotonic()
+        ordered = self.replicas[start:] + self.replicas[:start]
+        return [replica for replica in ordered if replica.down_until <= now]
+
+    def mark_down(self, replica: Replica) -> None:
+        with self._lock:
+            replica.failures += 1
+            replica.down_until = time.monotonic() + self.retry_seconds
+
+    def status(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "name": replica.name,
+                "healthy": replica.down_until <= now,
+                "retry_in_seconds": round(max(replica.down_until - now, 0.0), 3),
+                "failures": replica.failures,
+            }
+            for replica in self.replicas
+        ]
+
+
+def _sticky(request: Request) -> bool:
+    try:
+        return time.time() < float(request.cookies.get(STICKY_COOKIE, 0))
+    except ValueError:
+        return False
+
+
+class ReplicaSession(Session):
+    """A read session that picks its replica on the first statement."""
+
+    def __init__(self, replicas: ReplicaSet, primary_bind, **kwargs):
+        super().__init__(autoflush=False, **kwargs)
+        self.replicas = replicas
+        self.primary_bind = primary_bind
+        self._routed = None
+        self.info[REPLICA_INFO_KEY] = None  # until routed
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._routed is None:
+            self._routed = self._route()
+        return self._routed
+
+    def _route(self):
+        for replica in self.replicas.candidates():
+            try:
+                # checked out once and reused by each transaction of this session
+                connection = replica.engine.connect()
+            except DBAPIError:
+                self.replicas.mark_down(replica)
+                continue
+            self.info[REPLICA_INFO_KEY] = replica.name
+            return connection
+        del self.info[REPLICA_INFO_KEY]
+        return self.primary_bind
+
+    def close(self) -> None:
+        super().close()
+        if isinstance(self._routed, Connection):
+            self._routed.close()
+        self._routed = None
+        self.info.setdefault(REPLICA_INFO_KEY, None)
+
+
+def open_session(request: Request, primary: sessionmaker, replicas: ReplicaSet) -> Session:
+    """A session on the primary, or one that will read from a healthy replica, for this request."""
+    if not replicas or request.method not in READ_METHODS or _sticky(request):
+        return primary()
+    return ReplicaSession(replicas, primary.kw["bind"])
+
+
+@contextmanager
+def primary_session(db: Session) -> Iterator[Session]:
+    """`db`, or a session on the primary while `db` reads (or may read) from a replica."""
+    if REPLICA_INFO_KEY not in db.info:
+        yield db
+        return
+    from . import database
+
+    with database.SessionLocal() as primary:
+        yield primary
+
+
+def _sticky_cookie() -> str:
+    window = conf.db_read_your_writes_seconds
+    response = Response()
+    response.set_cookie(STICKY_COOKIE, f"{time.time() + window:.3f}", max_age=max(math.ceil(window), 1),
+                        httponly=True, samesite="lax")
+    return response.headers["set-cookie"]
+
+
+class ReadYourWritesMiddleware:
+    """Adds the sticky cookie to the response of every write request while
+    replicas are configured, including responses a route builds itself."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        from . import database
+
+        if scope["type"] != "http" or scope["method"] in READ_METHODS or not database.replicas:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("set-cookie", _sticky_cookie())
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
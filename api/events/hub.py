@@ -0,0 +1,117 @@
+"""In-process publish/subscribe for server-sent events.
+
+Publishers may be sync controllers running in the threadpool; subscribers
+are async stream handlers. publish() hands each event to every subscriber's
+event loop with call_soon_threadsafe, and keeps the most recent events in a
+ring buffer so a reconnecting client can resume from its Last-Event-ID.
+"""
+import asyncio
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from .. import ids
+
+RESYNC = object()  # queued when a subscriber fell too far behind
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    type: str
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+class Subscription:
+    def __init__(self, hub: "EventHub", queue_size: int):
+        self._hub = hub
+        self._loop = asyncio.get_running_loop()
+        # one slot beyond queue_size is kept free for RESYNC
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size + 1)
+        self._queue_size = queue_size
+        self._overflowed = False
+
+    def _offer(self, event: Event) -> None:
+        # runs on the subscriber's loop
+        if self._overflowed:
+            return
+        if self._queue.qsize() >= self._queue_size:
+            # drop this and everything after it; the client resumes from the
+            # last event it did receive
+            self._overflowed = True
+            self._queue.put_nowait(RESYNC)
+            return
+        self._queue.put_nowait(event)
+
+    def deliver(self, event: Event) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._offer, event)
+        except RuntimeError:  # loop already closed
+            self.close()
+
+    async def get(self, timeout: Optional[float] = None):
+        """The next Event, RESYNC, or None if `timeout` passes first."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self._hub._unsubscribe(self)
+
+
+class EventHub:
+    def __init__(self, buffer_size: int = 10000, queue_size: int = 1000):
+        self._lock = threading.Lock()
+        self._recent: Deque[Event] = deque(maxlen=buffer_size)
+        self._subscribers: Set[Subscription] = set()
+        # every event published with an id above this is still in _recent;
+        # starts at the hub's creation, then follows evictions
+        self._complete_after = ids.lower_bound(datetime.utcnow())
+        self.queue_size = queue_size
+
+    def publish(self, event: Event) -> None:
+        with self._lock:
+            if len(self._recent) == self._recent.maxlen:
+                self._complete_after = max(self._complete_after, self._recent[0].id)
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def subscribe(self) -> Subscription:
+        """Must be called from the event loop that will consume the events."""
+        subscription = Subscription(self, self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def since(self, last_id: int) -> Optional[List[Event]]:
+        """Buffered events after `last_id`, or None if events after it may be
+        missing: published before this hub started (e.g. by a worker that has
+        since restarted) or already evicted. The caller must then catch up
+        another way."""
+        with self._lock:
+            if last_id < self._complete_after:
+                return None
+            return [event for event in self._recent if event.id > last_id]
+
+    def recent(self) -> List[Event]:
+        """Every buffered event, oldest first."""
+        with self._lock:
+            return list(self._recent)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._recent.clear()
+            self._complete_after = ids.lower_bound(datetime.utcnow())
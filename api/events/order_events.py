@@ -0,0 +1,167 @@
+"""Order events for the kitchen display feed (GET /orders/staff/stream).
+
+Controllers publish after their transaction commits (through
+commit_hooks, so a held session publishes only once its write is durable);
+each open stream gets
+only the events that happened since it connected. Event ids are snowflakes
+(api.ids), so they are time ordered and a client that
+reconnects with Last-Event-ID is resumed from the hub's buffer, or, if the
+buffer has moved past it, from a catch-up query on order_date/updated_at.
+A screen too far behind for either gets an order.resync event instead: it
+reloads /orders/staff, and the stream goes on from there.
+
+The hub is per process: with several workers, a screen only sees events
+for orders handled by the worker it is connected to.
+"""
+import json
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, selectinload
+
+from .. import ids
+from ..dependencies import commit_hooks
+from ..dependencies.config import conf
+from ..models.orders import Order
+from ..schemas.orders import OrderResponse
+from .hub import RESYNC, Event, EventHub
+
+ORDER_CREATED = "order.created"
+ORDER_STATUS_CHANGED = "order.status_changed"
+ORDER_RESYNC = "order.resync"
+
+# order_date is stamped before the commit and the event id after it, so the
+# catch-up query looks back a little further than the client's last event
+CATCH_UP_SLACK = timedelta(seconds=5)
+
+# keep proxies from buffering or caching the stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+hub = EventHub(buffer_size=conf.order_stream_buffer, queue_size=conf.order_stream_queue_size)
+
+
+def _order_data(order: Order) -> Dict[str, Any]:
+    return OrderResponse.model_validate(order).model_dump(mode="json")
+
+
+def status_change(
+    order_id: int,
+    tracking_number: Optional[str],
+    order_status: str,
+    previous_status: Optional[str],
+    updated_at: Optional[datetime],
+    actual_delivery_time: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Payload of an order.status_changed event."""
+    return {
+        "id": order_id,
+        "tracking_number": tracking_number,
+        "order_status": order_status,
+        "previous_status": previous_status,
+        "updated_at": updated_at.isoformat() if updated_at else None,
+        "actual_delivery_time": actual_delivery_time.isoformat() if actual_delivery_time else None,
+    }
+
+
+def _publish(kind: str, payloads: List[Dict[str, Any]]) -> None:
+    for data in payloads:
+        hub.publish(Event(ids.next_id(), kind, data))
+
+
+def publish_created(db: Session, orders: Iterable[Order]) -> None:
+    """Call after `db` commits the orders, with their details loaded."""
+    commit_hooks.run(db, _publish, ORDER_CREATED, [_order_data(order) for order in orders])
+
+
+def publish_status_changed(db: Session, changes: Iterable[Dict[str, Any]]) -> None:
+    """Call after `db` commits the status changes, with status_change() payloads."""
+    commit_hooks.run(db, _publish, ORDER_STATUS_CHANGED, list(changes))
+
+
+def catch_up(db: Session, last_event_id: int) -> Optional[List[Event]]:
+    """Events for orders created or changed since `last_event_id`, rebuilt
+    from the orders table, or None if more than
+    conf.order_stream_catch_up_limit orders changed: the screen must resync.
+    Delivery is at-least-once: a few orders just before the cut-off may be
+    sent again."""
+    since = ids.decode(last_event_id).created_at - CATCH_UP_SLACK
+    orders = (
+        db.query(Order)
+        .options(selectinload(Order.order_details))
+        .filter(or_(Order.order_date > since, Order.updated_at > since))
+        .order_by(Order.id)
+        .limit(conf.order_stream_catch_up_limit + 1)
+        .all()
+    )
+    if len(orders) > conf.order_stream_catch_up_limit:
+        return None
+
+    events = []
+    for order in orders:
+        if order.order_date > since:
+            events.append((order.order_date, ORDER_CREATED, _order_data(order)))
+        if order.updated_at is not None and order.updated_at > since:
+            data = status_change(
+                order.id, order.tracking_number, order.order_status, None,
+                order.updated_at, order.actual_delivery_time,
+            )
+            events.append((order.updated_at, ORDER_STATUS_CHANGED, data))
+    events.sort(key=lambda item: item[0])
+    # ids follow the rows' timestamps and stay above last_event_id
+    return [
+        Event(max(ids.lower_bound(at), last_event_id) + sequence, event_type, data)
+        for sequence, (at, event_type, data) in enumerate(events, start=1)
+    ]
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    if value is None or not value.strip():
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Last-Event-ID must be an event id from this stream.")
+
+
+def format_event(event: Event) -> str:
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data, separators=(',', ':'))}\n\n"
+
+
+async def stream(
+    last_event_id: Optional[int],
+    load_catch_up: Callable[[int], Awaitable[Optional[List[Event]]]],
+) -> AsyncIterator[str]:
+    """SSE body for one screen.
+
+    Subscribes before reading any backlog so nothing published in between is
+    lost; events seen in both are sent once. If the screen cannot keep up, the
+    stream ends and the browser reconnects with its Last-Event-ID; if even
+    the catch-up cannot replay what it missed, it is sent ORDER_RESYNC.
+    """
+    subscription = hub.subscribe()
+    try:
+        yield f"retry: {conf.order_stream_retry_ms}\n\n"
+        sent = set()
+        if last_event_id is not None:
+            backlog = hub.since(last_event_id)
+            if backlog is None:
+                backlog = await load_catch_up(last_event_id)
+            if backlog is None:
+                # the event's id resumes a later reconnect from here
+                backlog = [Event(ids.next_id(), ORDER_RESYNC)]
+            for event in backlog:
+                sent.add(event.id)
+                yield format_event(event)
+
+        while True:
+            event = await subscription.get(timeout=conf.order_stream_heartbeat_seconds)
+            if event is None:
+                yield ": keep-alive\n\n"
+            elif event is RESYNC:
+                return
+            elif event.id not in sent:
+                yield format_event(event)
+    finally:
+        subscription.close()
@@ -0,0 +1,142 @@
+"""Run a create endpoint at most once per Idempotency-Key.
+
+    return idempotency.run(db, key, "POST /orders", order_in, OrderResponse, 201,
+                           lambda session: orders_controller.create_order(session, order_in))
+
+Without a key the handler just runs. With one, the first request claims the
+key, runs, and stores its serialized response for conf.idempotency_ttl
+seconds; repeats get that response back (with an Idempotent-Replayed header)
+without running the handler again. A repeat that arrives while the first
+request is still running waits for it, up to conf.idempotency_wait_seconds,
+then gets 409. Reusing a key with a different body is rejected with 422.
+A handler that raises releases the key, so the client's retry runs again.
+
+The handler gets the session to write through, which may not be `db`: with
+the database store its commit is held back until the response is stored.
+"""
+import hashlib
+import json
+import time
+from typing import Any, Callable, Optional, Type
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from ..dependencies import commit_hooks
+from ..dependencies.config import conf
+from .store import STORES, IdempotencyRecord, IdempotencyStore
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 200
+
+_store: Optional[IdempotencyStore] = None
+
+
+def get_store() -> IdempotencyStore:
+    global _store
+    if _store is None:
+        try:
+            _store = STORES[conf.idempotency_store]()
+        except KeyError:
+            raise ValueError(f"Unknown IDEMPOTENCY_STORE {conf.idempotency_store!r}")
+    return _store
+
+
+def set_store(store: Optional[IdempotencyStore]) -> None:
+    global _store
+    _store = store
+
+
+def fingerprint(scope: str, payload: BaseModel) -> str:
+    body = json.dumps(payload.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{scope}\n{body}".encode()).hexdigest()
+
+
+def _store_key(scope: str, key: str) -> str:
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters.",
+        )
+    return f"{scope}:{key}"
+
+
+def _replay(record: IdempotencyRecord, expected: str) -> Optional[JSONResponse]:
+    """The stored response, or None while the original request is running."""
+    if record.fingerprint != expected:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{HEADER} was already used with a different request.",
+        )
+    if not record.completed:
+        return None
+    return JSONResponse(
+        content=json.loads(record.body),
+        status_code=record.status_code,
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def _still_running() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"A request with this {HEADER} is still being processed.",
+    )
+
+
+def _response(result: Any, response_model: Type[BaseModel], status_code: int):
+    model = response_model.model_validate(result, from_attributes=True)
+    content = jsonable_encoder(model)
+    return JSONResponse(content=content, status_code=status_code), json.dumps(content)
+
+
+def _handle(db: Session, store: IdempotencyStore, handler: Callable[[Session], Any],
+            response_model: Type[BaseModel], status_code: int):
+    """The response, its body, and the session the handler wrote through."""
+    with store.handler_session(db) as session:
+        response, body = _response(handler(session), response_model, status_code)
+    return response, body, session
+
+
+def run(
+    db: Session,
+    key: Optional[str],
+    scope: str,
+    payload: BaseModel,
+    response_model: Type[BaseModel],
+    status_code: int,
+    handler: Callable[[Session], Any],
+):
+    if key is None:
+        return handler(db)
+
+    store = get_store()
+    store_key = _store_key(scope, key)
+    expected = fingerprint(scope, payload)
+    deadline = time.monotonic() + conf.idempotency_wait_seconds
+
+    while True:
+        record = store.claim(db, store_key, expected, conf.idempotency_lock_seconds)
+        if record is None:
+            break
+        replay = _replay(record, expected)
+        if replay is not None:
+            return replay
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise _still_running()
+        store.wait(store_key, remaining)
+
+    try:
+        response, body, session = _handle(db, store, handler, response_model, status_code)
+    except BaseException:
+        store.release(db, store_key)
+        raise
+    store.complete(db, store_key, status_code, body, conf.idempotency_ttl)
+    commit_hooks.committed(session)
+    return response
+
@@ -0,0 +1,220 @@
+"""Backends that remember responses by Idempotency-Key.
+
+A request first claims its key. The claim either succeeds (the caller runs
+the request and then calls complete() or, on failure, release()) or returns
+the record already held for that key: a finished response to replay, or a
+claim by a request that is still running.
+
+Both stores take the request's Session so the database store writes through
+the same connection setup as the rest of the request; the memory store
+ignores it. The request runs on the session handler_session() gives it, so
+the database store can commit the stored response in the same transaction
+as whatever the request wrote.
+"""
+import heapq
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..dependencies import commit_hooks
+from ..dependencies.config import conf
+from ..models.idempotency_key import IdempotencyKey
+
+
+@dataclass(frozen=True)
+class IdempotencyRecord:
+    key: str
+    fingerprint: str
+    status_code: Optional[int] = None
+    body: Optional[str] = None
+
+    @property
+    def completed(self) -> bool:
+        return self.status_code is not None
+
+
+class IdempotencyStore(ABC):
+    poll_interval = 0.05
+
+    @abstractmethod
+    def claim(self, db: Session, key: str, fingerprint: str, lock_seconds: float) -> Optional[IdempotencyRecord]:
+        """Reserve `key`; None if this caller now owns it, else the existing record."""
+
+    @contextmanager
+    def handler_session(self, db: Session) -> Iterator[Session]:
+        """The session the claimed request runs on, before complete() or release()."""
+        yield db
+
+    @abstractmethod
+    def complete(self, db: Session, key: str, status_code: int, body: str, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def release(self, db: Session, key: str) -> None:
+        ...
+
+    def wait(self, key: str, timeout: float) -> None:
+        """Block until `key` may have changed or `timeout` passes."""
+        time.sleep(min(timeout, self.poll_interval))
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    """Per-process store; concurrent duplicates in one worker wait on a condition.
+
+    Holds at most `max_keys` (conf.idempotency_memory_max_keys) keys; past
+    that the least recently written one is dropped, so its replay is lost
+    early.
+    """
+
+    def __init__(self, max_keys: Optional[int] = None):
+        self.max_keys = conf.idempotency_memory_max_keys if max_keys is None else max_keys
+        self._records: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (record, expires_at)
+        self._expiries: list = []  # heap of (expires_at, key), with stale entries left in
+        self._changed = threading.Condition()
+
+    def _purge(self, now: float) -> None:
+        # claims and completed responses expire at different times, so go by
+        # each entry's own expiry rather than by write order
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiries)
+            entry = self._records.get(key)
+            if entry is not None and entry[1] == expires_at:
+                del self._records[key]
+
+    def _put(self, record: IdempotencyRecord, expires_at: float) -> None:
+        self._records[record.key] = (record, expires_at)
+        self._records.move_to_end(record.key)
+        heapq.heappush(self._expiries, (expires_at, record.key))
+        while len(self._records) > self.max_keys:
+            self._records.popitem(last=False)
+        if len(self._expiries) > 2 * len(self._records) + 64:
+            # drop the heap entries of rewritten and evicted keys
+            self._expiries = [(expires_at, key) for key, (_, expires_at) in self._records.items()]
+            heapq.heapify(self._expiries)
+
+    def claim(self, db, key, fingerprint, lock_seconds):
+        now = time.monotonic()
+        with self._changed:
+            self._purge(now)
+            entry = self._records.get(key)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+            self._put(IdempotencyRecord(key, fingerprint), now + lock_seconds)
+            return None
+
+    def complete(self, db, key, status_code, body, ttl):
+        with self._changed:
+            entry = self._records.get(key)
+            fingerprint = entry[0].fingerprint if entry else ""
+            self._put(IdempotencyRecord(key, fingerprint, status_code, body), time.monotonic() + ttl)
+            self._changed.notify_all()
+
+    def release(self, db, key):
+        with self._changed:
+            self._records.pop(key, None)
+            self._changed.notify_all()
+
+    def wait(self, key, timeout):
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def clear(self) -> None:
+        with self._changed:
+            self._records.clear()
+            self._expiries.clear()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+class DatabaseIdempotencyStore(IdempotencyStore):
+    """Store backed by the idempotency_keys table, shared by every worker.
+
+    The primary key on `key` makes the claim atomic across processes; a
+    duplicate that finds a running claim polls the row until it completes.
+    The claim is committed on its own, but the completed response is
+    committed in one transaction with the request's writes, so a worker that
+    dies in between leaves neither behind and the retry runs again.
+    """
+
+    def _get(self, db: Session, key: str) -> Optional[IdempotencyKey]:
+        return db.query(IdempotencyKey).filter(IdempotencyKey.key == key).populate_existing().first()
+
+    def claim(self, db, key, fingerprint, lock_seconds):
+        now = datetime.utcnow()
+        for _ in range(3):
+            row = self._get(db, key)
+            if row is not None:
+                if row.expires_at > now:
+                    record = IdempotencyRecord(row.key, row.fingerprint, row.status_code, row.response_body)
+                    db.commit()  # end the read so later polls see fresh data
+                    return record
+                db.delete(row)
+                db.commit()
+
+            db.add(IdempotencyKey(
+                key=key,
+                fingerprint=fingerprint,
+                created_at=now,
+                expires_at=now + timedelta(seconds=lock_seconds),
+            ))
+            try:
+                db.commit()
+                return None
+            except IntegrityError:
+                db.rollback()  # another request claimed it first; read its row
+        # the row keeps changing under us; report it as in flight so the caller waits
+        return IdempotencyRecord(key, fingerprint)
+
+    @contextmanager
+    def handler_session(self, db):
+        # joined to db's transaction: the handler's commit() only flushes, and
+        # complete() commits its writes; a rollback() still discards them.
+        # Held, so cache invalidation and order events wait for that commit.
+        session = Session(bind=db.connection(), join_transaction_mode="rollback_only", autoflush=False)
+        commit_hooks.hold(session)
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def complete(self, db, key, status_code, body, ttl):
+        db.query(IdempotencyKey).filter(IdempotencyKey.key == key).update(
+            {
+                IdempotencyKey.status_code: status_code,
+                IdempotencyKey.response_body: body,
+                IdempotencyKey.expires_at: datetime.utcnow() + timedelta(seconds=ttl),
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+
+    def release(self, db, key):
+        # close rather than roll back: the handler may already have rolled
+        # back the transaction it shares with db
+        db.close()
+        db.query(IdempotencyKey).filter(IdempotencyKey.key == key).delete(synchronize_session=False)
+        db.commit()
+
+    def purge_expired(self, db: Session) -> int:
+        deleted = (
+            db.query(IdempotencyKey)
+            .filter(IdempotencyKey.expires_at <= datetime.utcnow())
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return deleted
+
+
+STORES: Dict[str, type] = {
+    "memory": MemoryIdempotencyStore,
+    "database": DatabaseIdempotencyStore,
+}
@@ -0,0 +1,186 @@
+"""Time-ordered, worker-aware ids for tracking numbers.
+
+Snowflake layout in 63 bits:
+
+    | 41 bits: ms since EPOCH | 10 bits: worker id | 12 bits: sequence |
+
+Up to 4096 ids per millisecond per worker, generated in memory without a
+database round trip. Ids from one worker strictly increase, and ids from
+different workers never collide as long as their worker ids differ.
+
+A worker id is a host number times conf.worker_slots (WORKER_SLOTS, default
+16) plus a slot. The slot is the first one this process can hold an
+exclusive lock on, in conf.worker_id_lock_dir; the lock is held for the life
+of the process and dropped by the OS when it exits, so processes on one host
+never share a slot. Where files cannot be locked (no fcntl), each process
+must be given its slot as WORKER_SLOT; starting without one is an error
+rather than a guess. The host number is WORKER_ID, which must differ between
+hosts; without it, it is hashed from the host name and two hosts may collide.
+
+Tracking numbers render the id as 13 Crockford base32 characters. The width
+is fixed, so string order matches id order and new rows land at the end of
+the unique index on orders.tracking_number.
+"""
+import os
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import IO, Callable, NamedTuple, Optional
+
+from .dependencies.config import conf
+
+try:
+    import fcntl
+except ImportError:  # not on Windows
+    fcntl = None
+
+EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_WIDTH = 13  # 13 * 5 bits >= 63
+
+
+_slot_file: Optional[IO] = None  # kept open, and locked, for the life of the process
+
+
+def _claim_slot(base: int, slots: int) -> int:
+    """First slot in [0, slots) not held by another process on this host."""
+    global _slot_file
+    if conf.worker_slot is not None:
+        if not 0 <= conf.worker_slot < slots:
+            raise ValueError(f"WORKER_SLOT must be between 0 and {slots - 1} with WORKER_SLOTS={slots}")
+        return conf.worker_slot
+    if fcntl is None:
+        raise RuntimeError(
+            "Worker id slots cannot be locked on this platform; set WORKER_SLOT to a number "
+            f"between 0 and {slots - 1} that no other process on this host uses."
+        )
+    os.makedirs(conf.worker_id_lock_dir, exist_ok=True)
+    for slot in range(slots):
+        f = open(os.path.join(conf.worker_id_lock_dir, f"worker-{base + slot}.lock"), "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            continue
+        _slot_file = f
+        return slot
+    raise RuntimeError(f"All {slots} worker id slots of host {base // slots} are taken; raise WORKER_SLOTS.")
+
+
+def default_worker_id() -> int:
+    slots = conf.worker_slots
+    hosts = (MAX_WORKER_ID + 1) // slots
+    if conf.worker_id is None:
+        host = zlib.crc32(socket.gethostname().encode()) % hosts
+    elif 0 <= conf.worker_id < hosts:
+        host = conf.worker_id
+    else:
+        raise ValueError(f"WORKER_ID must be between 0 and {hosts - 1} with WORKER_SLOTS={slots}")
+    return host * slots + _claim_slot(host * slots, slots)
+
+
+class DecodedId(NamedTuple):
+    created_at: datetime
+    worker_id: int
+    sequence: int
+
+
+class SnowflakeGenerator:
+    def __init__(self, worker_id: int, clock: Callable[[], float] = time.time):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next_id(self) -> int:
+        with self._lock:
+            now_ms = int(self._clock() * 1000) - EPOCH_MS
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            else:
+                # Same millisecond, or the clock stepped back: keep counting
+                # on the last timestamp so ids never go backwards. When the
+                # sequence runs out, borrow the next millisecond.
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    self._last_ms += 1
+                    self._sequence = 0
+            return (self._last_ms << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+
+def decode(snowflake: int) -> DecodedId:
+    ms = (snowflake >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS
+    return DecodedId(
+        created_at=datetime(1970, 1, 1) + timedelta(milliseconds=ms),
+        worker_id=(snowflake >> SEQUENCE_BITS) & MAX_WORKER_ID,
+        sequence=snowflake & MAX_SEQUENCE,
+    )
+
+
+def lower_bound(created_at: datetime) -> int:
+    """Smallest id that could have been generated at `created_at` (naive UTC)."""
+    ms = (created_at - datetime(1970, 1, 1)) // timedelta(milliseconds=1) - EPOCH_MS
+    return max(ms, 0) << (WORKER_BITS + SEQUENCE_BITS)
+
+
+def encode_base32(value: int) -> str:
+    chars = []
+    for _ in range(_WIDTH):
+        value, digit = divmod(value, 32)
+        chars.append(_ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def decode_base32(text: str) -> int:
+    value = 0
+    for char in text.upper():
+        value = value * 32 + _ALPHABET.index(char)
+    return value
+
+
+_generator: Optional[SnowflakeGenerator] = None
+_generator_lock = threading.Lock()
+
+
+def _get_generator() -> SnowflakeGenerator:
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = SnowflakeGenerator(default_worker_id())
+    return _generator
+
+
+def _reset_after_fork() -> None:
+    # a forked worker needs a slot of its own; closing the inherited file
+    # leaves the parent's lock in place
+    global _generator, _slot_file
+    _generator = None
+    if _slot_file is not None:
+        _slot_file.close()
+        _slot_file = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def next_id() -> int:
+    return _get_generator().next_id()
+
+
+def tracking_number(prefix: str) -> str:
+    """e.g. tracking_number("TRK") -> "TRK-01HRZ5Q8M2K0S"."""
+    return f"{prefix}-{encode_base32(next_id())}"
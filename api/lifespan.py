@@ -0,0 +1,79 @@
+"""Startup and shutdown of the app (FastAPI lifespan).
+
+Importing api.main never touches the database. Tables are created by
+`python -m api.manage init-db`; on startup the app only reads the schema
+version (one query), with PREWARM_CACHES=1 fills the menu and promotion
+caches before the first request, and with SQL_INSTRUMENTATION=1 switches on
+per-request SQL statistics (api.dependencies.query_stats). With
+PROMETHEUS_MULTIPROC_DIR set, shutdown drops this worker's live gauges.
+"""
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, inspect, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from .dependencies import query_stats
+from .dependencies.config import conf
+from .metrics import app_metrics
+from .models.schema_version import SCHEMA_VERSION, SchemaVersion
+
+logger = logging.getLogger(__name__)
+
+
+def schema_version(bind) -> Optional[int]:
+    """Highest applied schema version, or None if init-db never ran."""
+    with bind.connect() as conn:
+        if not inspect(conn).has_table(SchemaVersion.__tablename__):
+            return None
+        return conn.execute(select(func.max(SchemaVersion.version))).scalar()
+
+
+def check_schema(bind, mode: str) -> None:
+    if mode == "off":
+        return
+    try:
+        version = schema_version(bind)
+    except SQLAlchemyError as e:
+        problem = f"Could not check the database schema: {e.__dict__.get('orig', e)}"
+    else:
+        if version is not None and version >= SCHEMA_VERSION:
+            return
+        problem = (
+            f"Database schema is at version {version}, this code expects {SCHEMA_VERSION}. "
+            "Run `python -m api.manage init-db`."
+        )
+    if mode == "strict":
+        raise RuntimeError(problem)
+    logger.warning(problem)
+
+
+def prewarm_caches(session_factory) -> None:
+    from .cache import availability
+    from .cache import menu as menu_cache
+    from .cache import promotions as promotion_cache
+    from .search import menu_index
+
+    with session_factory() as db:
+        menu_cache.preload(db)
+        promotion_cache.preload(db)
+        menu_index.preload(db)
+        availability.max_available(db, ())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from .dependencies import database
+
+    await run_in_threadpool(check_schema, database.engine, conf.schema_check)
+    if conf.sql_instrumentation:
+        query_stats.enable()
+    if conf.prewarm_caches:
+        await run_in_threadpool(prewarm_caches, database.SessionLocal)
+    try:
+        yield
+    finally:
+        app_metrics.mark_process_dead()
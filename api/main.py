@@ -1,26 +1,35 @@
-import uvicorn
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .routers import index as indexRoute
-from .models import model_loader
+from .models import model_loader  # noqa: F401  (registers every table; creates none)
 from .dependencies.config import conf
+from .dependencies.pagination import NEXT_CURSOR_HEADER
+from .dependencies.query_stats import SERVER_TIMING_HEADER, QueryStatsMiddleware
+from .dependencies.replicas import ReadYourWritesMiddleware
+from .idempotency.handler import REPLAYED_HEADER
+from .lifespan import lifespan
+from .metrics.app_metrics import MetricsMiddleware
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 origins = ["*"]
 
+app.add_middleware(indexRoute.LoadRoutesMiddleware)  # innermost: routers are mounted on first use
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(QueryStatsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REPLAYED_HEADER, SERVER_TIMING_HEADER],
 )
-
-model_loader.index()
-indexRoute.load_routes(app)
+app.add_middleware(MetricsMiddleware)  # outermost: times the whole stack
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host=conf.app_host, port=conf.app_port)
\ No newline at end of file
+    import uvicorn
+
+    uvicorn.run(app, host=conf.app_host, port=conf.app_port)
@@ -0,0 +1,103 @@
+"""Maintenance commands.
+
+    python -m api.manage init-db
+    python -m api.manage rebuild-ratings
+    python -m api.manage rebuild-sales
+    python -m api.manage migrate-guest-metadata
+    python -m api.manage purge-idempotency-keys
+"""
+import argparse
+import json
+
+from .dependencies.database import SessionLocal
+from .models import model_loader  # noqa: F401  (registers every table)
+
+
+def init_db(args) -> None:
+    from .models.schema_version import SCHEMA_VERSION
+
+    model_loader.index()
+    print(f"Created missing tables, columns and indexes; schema is at version {SCHEMA_VERSION}.")
+
+
+def rebuild_ratings(args) -> None:
+    from .controllers.review import rebuild_rating_aggregates
+
+    with SessionLocal() as db:
+        count = rebuild_rating_aggregates(db)
+    print(f"Rebuilt rating aggregates for {count} menu items.")
+
+
+def rebuild_sales(args) -> None:
+    from .controllers.analytics import rebuild_sales_rollups
+
+    with SessionLocal() as db:
+        days = rebuild_sales_rollups(db)
+    print(f"Rebuilt sales rollups for {days} days.")
+
+
+def migrate_guest_metadata(args) -> None:
+    """Add the guest columns to an existing orders table and move the JSON
+    blobs older guest orders kept in special_instructions into them."""
+    from .controllers.guest_orders import GUEST_FIELDS
+    from .dependencies.database import engine
+    from .models.orders import Order
+
+    for name in model_loader.add_missing_columns(engine, Order.__table__):
+        print(f"Added orders.{name}.")
+
+    migrated = 0
+    with SessionLocal() as db:
+        legacy = db.query(Order).filter(
+            Order.customer_id == 0,
+            Order.guest_name.is_(None),
+            Order.special_instructions.like("{%"),
+        )
+        for order in legacy.yield_per(500):
+            try:
+                meta = json.loads(order.special_instructions)
+            except ValueError:
+                continue
+            for name in GUEST_FIELDS:
+                setattr(order, name, meta.get(name))
+            order.special_instructions = None
+            migrated += 1
+        db.commit()
+    print(f"Migrated guest metadata for {migrated} orders.")
+
+
+def purge_idempotency_keys(args) -> None:
+    from .idempotency.store import DatabaseIdempotencyStore
+
+    with SessionLocal() as db:
+        count = DatabaseIdempotencyStore().purge_expired(db)
+    print(f"Deleted {count} expired idempotency keys.")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m api.manage")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser(
+        "init-db", help="create missing tables, columns and indexes and record the schema version"
+    ).set_defaults(func=init_db)
+    commands.add_parser(
+        "rebuild-ratings", help="recompute menu_item_ratings from the reviews table"
+    ).set_defaults(func=rebuild_ratings)
+    commands.add_parser(
+        "rebuild-sales", help="recompute the sales_daily* rollups from orders and order_details"
+    ).set_defaults(func=rebuild_sales)
+    commands.add_parser(
+        "migrate-guest-metadata",
+        help="add the orders guest columns and backfill them from special_instructions",
+    ).set_defaults(func=migrate_guest_metadata)
+    commands.add_parser(
+        "purge-idempotency-keys", help="delete expired rows from idempotency_keys"
+    ).set_defaults(func=purge_idempotency_keys)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
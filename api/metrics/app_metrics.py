@@ -0,0 +1,126 @@
+"""The service's Prometheus metrics, served at GET /metrics.
+
+Request durations are labelled with the route template (/orders/{order_id}),
+not the raw path, so ids never create new series; requests that match no
+route share the "<unmatched>" label. The route is only known once the router
+has run, so in-flight requests are counted per method. Business counters are
+bumped by the controllers after their transaction commits.
+
+Metrics are prometheus_client ones. With several workers, start them with
+PROMETHEUS_MULTIPROC_DIR set to an empty directory shared by all of them
+(emptied on each deploy): prometheus_client's multiprocess mode then keeps
+every worker's values in files there, and a scrape of any worker reports
+the sum over all of them. In-flight requests only count live workers; each
+worker drops its own on shutdown.
+"""
+import os
+import time
+from typing import Iterable, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+from ..dependencies.config import conf
+from ..models.orders import Order
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+REGISTRY = CollectorRegistry()
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to serve a request, by route template and status code.",
+    ("method", "route", "status"), registry=REGISTRY,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests being served right now.", ("method",),
+    registry=REGISTRY, multiprocess_mode="livesum",
+)
+# 422: the request did not match its schema; 400: a controller rejected it
+# (bad promotion, status transition, cursor, export format, ...)
+VALIDATION_STATUSES = frozenset({400, 422})
+VALIDATION_FAILURES = Counter(
+    "validation_failures_total", "Requests rejected as invalid (400 and 422), by status.",
+    ("method", "route", "status"), registry=REGISTRY,
+)
+ORDERS_CREATED = Counter(
+    "orders_created_total", "Customer orders created (single and batch).", registry=REGISTRY,
+)
+GUEST_ORDERS_CREATED = Counter(
+    "guest_orders_created_total", "Guest orders created.", registry=REGISTRY,
+)
+PROMO_REDEMPTIONS = Counter(
+    "promo_redemptions_total", "Orders created with a promotion code applied.", registry=REGISTRY,
+)
+
+
+def record_orders_created(orders: Iterable[Order], guest: bool = False) -> None:
+    """Call after the orders are committed."""
+    created = redeemed = 0
+    for order in orders:
+        created += 1
+        if order.promotion_code:
+            redeemed += 1
+    (GUEST_ORDERS_CREATED if guest else ORDERS_CREATED).inc(created)
+    if redeemed:
+        PROMO_REDEMPTIONS.inc(redeemed)
+
+
+def route_template(scope) -> str:
+    """Template of the route that served `scope`, once routing has run."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method)
+        status = 500  # unless a response starts
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            # the router records the matched route in the (shared) scope
+            route = route_template(scope)
+            HTTP_REQUEST_DURATION.labels(method, route, status).observe(time.perf_counter() - start)
+            if status in VALIDATION_STATUSES:
+                VALIDATION_FAILURES.labels(method, route, status).inc()
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the shared directory (at shutdown)."""
+    if conf.metrics_dir:
+        multiprocess.mark_process_dead(os.getpid(), conf.metrics_dir)
+
+
+def exposition() -> Tuple[bytes, str]:
+    """(body, content type) of a scrape of this worker, or of all of them."""
+    if conf.metrics_dir:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, conf.metrics_dir)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def clear() -> None:
+    """Reset this process's series (tests)."""
+    for metric in (HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT, VALIDATION_FAILURES):
+        metric.clear()
+    for counter in (ORDERS_CREATED, GUEST_ORDERS_CREATED, PROMO_REDEMPTIONS):
+        counter.reset()
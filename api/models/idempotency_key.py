@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from ..dependencies.database import Base
+
+
+class IdempotencyKey(Base):
+    """Stored responses for requests sent with an Idempotency-Key header.
+
+    A row without a status_code is a claim held by a request that is still
+    running; expires_at bounds both claims and stored responses.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
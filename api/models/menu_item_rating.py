@@ -0,0 +1,77 @@
+from sqlalchemy import Column, Float, ForeignKey, Integer, case, event, func, inspect
+from sqlalchemy.orm import relationship
+
+from ..dependencies.database import Base
+from .review import Review
+from .upsert import increment_row
+
+STAR_BUCKETS = range(6)  # ratings are 0-5 and bucketed to the nearest star
+
+
+class MenuItemRating(Base):
+    """Running rating aggregate per menu item, maintained on review writes."""
+
+    __tablename__ = "menu_item_ratings"
+
+    menu_item_id = Column(Integer, ForeignKey("sandwiches.id", ondelete="CASCADE"), primary_key=True)
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    review_count = Column(Integer, nullable=False, default=0)
+
+    stars_0 = Column(Integer, nullable=False, default=0)
+    stars_1 = Column(Integer, nullable=False, default=0)
+    stars_2 = Column(Integer, nullable=False, default=0)
+    stars_3 = Column(Integer, nullable=False, default=0)
+    stars_4 = Column(Integer, nullable=False, default=0)
+    stars_5 = Column(Integer, nullable=False, default=0)
+
+    menu_item = relationship("Sandwich")
+
+    @property
+    def average_rating(self) -> float:
+        return self.rating_sum / self.review_count if self.review_count else 0.0
+
+    def histogram(self):
+        return {star: getattr(self, f"stars_{star}") for star in STAR_BUCKETS}
+
+
+def star_bucket(rating: float) -> int:
+    return min(max(int(rating + 0.5), 0), 5)
+
+
+def star_bucket_sql(rating):
+    """star_bucket() as a SQL expression, for rebuilding from the reviews table."""
+    return case((rating < 0.5, 0), (rating >= 4.5, 5), else_=func.floor(rating + 0.5))
+
+
+def _apply_delta(connection, menu_item_id: int, rating: float, sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) one review's rating in one statement."""
+    bucket = f"stars_{star_bucket(rating)}"
+    deltas = {"rating_sum": rating * sign, "review_count": sign, bucket: sign}
+    increment_row(
+        connection, MenuItemRating.__table__, {"menu_item_id": menu_item_id}, deltas,
+        initial={name: max(delta, 0) for name, delta in deltas.items()},
+    )
+
+
+@event.listens_for(Review, "after_insert")
+def _review_inserted(mapper, connection, target):
+    _apply_delta(connection, target.menu_item_id, target.rating, 1)
+
+
+@event.listens_for(Review, "after_update")
+def _review_updated(mapper, connection, target):
+    state = inspect(target)
+    rating_history = state.attrs.rating.history
+    item_history = state.attrs.menu_item_id.history
+    if not rating_history.has_changes() and not item_history.has_changes():
+        return
+
+    old_rating = rating_history.deleted[0] if rating_history.deleted else target.rating
+    old_item = item_history.deleted[0] if item_history.deleted else target.menu_item_id
+    _apply_delta(connection, old_item, old_rating, -1)
+    _apply_delta(connection, target.menu_item_id, target.rating, 1)
+
+
+@event.listens_for(Review, "after_delete")
+def _review_deleted(mapper, connection, target):
+    _apply_delta(connection, target.menu_item_id, target.rating, -1)
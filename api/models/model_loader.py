@@ -1,3 +1,6 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
 from ..dependencies.database import engine, Base
 
 from .sandwiches import Sandwich
@@ -9,6 +12,10 @@ from .customer import Customer
 from .review import Review
 from .payment import Payment
 from .promotion import Promotion
+from .menu_item_rating import MenuItemRating
+from .idempotency_key import IdempotencyKey
+from .sales_rollup import DailySales, DailyItemSales, DailyPromotionSales
+from .schema_version import SCHEMA_VERSION, SchemaVersion
 
 __all__ = [
     "Sandwich",
@@ -20,7 +27,48 @@ __all__ = [
     "Review",
     "Payment",
     "Promotion",
+    "MenuItemRating",
+    "IdempotencyKey",
+    "DailySales",
+    "DailyItemSales",
+    "DailyPromotionSales",
+    "SchemaVersion",
 ]
 
-def index():
-    Base.metadata.create_all(engine)
\ No newline at end of file
+def add_missing_columns(bind, table) -> list:
+    """ALTER TABLE ADD COLUMN each column of `table` its database table lacks.
+
+    Returns the names added. Raises RuntimeError for a missing column that
+    can't be added to existing rows (NOT NULL without a server default).
+    """
+    existing = {column["name"] for column in inspect(bind).get_columns(table.name)}
+    missing = [column for column in table.columns if column.name not in existing]
+    blocked = [c.name for c in missing if not c.nullable and c.server_default is None]
+    if blocked:
+        raise RuntimeError(f"Cannot add NOT NULL columns to {table.name}: {', '.join(blocked)}.")
+    with bind.begin() as conn:
+        for column in missing:
+            ddl = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+    return [column.name for column in missing]
+
+
+def index(bind=None):
+    """Create any missing tables, columns and indexes and record SCHEMA_VERSION.
+
+    Only run by `python -m api.manage init-db`; the app itself never
+    creates tables.
+    """
+    bind = bind if bind is not None else engine
+    Base.metadata.create_all(bind)
+    # create_all skips existing tables, and so the columns and indexes added to them later
+    for table in Base.metadata.sorted_tables:
+        add_missing_columns(bind, table)
+        for table_index in table.indexes:
+            table_index.create(bind, checkfirst=True)
+    with bind.begin() as conn:
+        applied = conn.execute(
+            SchemaVersion.__table__.select().where(SchemaVersion.version == SCHEMA_VERSION)
+        ).first()
+        if applied is None:
+            conn.execute(SchemaVersion.__table__.insert().values(version=SCHEMA_VERSION))
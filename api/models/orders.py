@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 
 from ..dependencies.database import Base
@@ -7,15 +7,27 @@ from ..dependencies.database import Base
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # keyset pagination: newest first, id as tie-breaker
+        Index("ix_orders_order_date_id", "order_date", "id"),
+        # catch-up query of the staff order stream
+        Index("ix_orders_updated_at", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
 
     customer_id = Column(Integer, nullable=False)  # 0 for guest orders
     delivery_address = Column(String(255), nullable=True)
 
-    # we'll store guest metadata or notes here as JSON/text
     special_instructions = Column(Text, nullable=True)
 
+    # guest (walk-in / table) orders; NULL for customer orders
+    guest_name = Column(String(100), nullable=True)
+    contact_phone = Column(String(30), nullable=True)
+    contact_email = Column(String(255), nullable=True)
+    table_number = Column(Integer, nullable=True)
+    notes = Column(Text, nullable=True)
+
     tracking_number = Column(String(50), unique=True, index=True, nullable=True)
     order_status = Column(String(50), nullable=False, default="PLACED")
 
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
 from sqlalchemy.sql import func
 from ..dependencies.database import Base
 
 
 class Promotion(Base):
     __tablename__ = "promotions"
+    __table_args__ = (
+        # keyset pagination: newest first, id as tie-breaker
+        Index("ix_promotions_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     code = Column(String(50), unique=True, nullable=False, index=True)
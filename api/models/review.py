@@ -1,17 +1,26 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.sql import func
 from ..dependencies.database import Base
 
 
 class Review(Base):
     __tablename__ = "reviews"
+    __table_args__ = (
+        # keyset pagination: newest first, id as tie-breaker
+        Index("ix_reviews_created_at_id", "created_at", "id"),
+        Index("ix_reviews_menu_item_created_at_id", "menu_item_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
-    menu_item_id = Column(Integer,ForeignKey("sandwiches.id", ondelete="CASCADE"),nullable=False,)
+    # active_history: the rating aggregate listeners need the previous values
+    # even when an earlier commit expired them
+    menu_item_id = column_property(
+        Column(Integer, ForeignKey("sandwiches.id", ondelete="CASCADE"), nullable=False), active_history=True,
+    )
 
-    rating = Column(Float, nullable=False)
+    rating = column_property(Column(Float, nullable=False), active_history=True)
     review_text = Column(String(1000))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Date, Float, Integer, String
+
+from ..dependencies.database import Base
+
+
+class DailySales(Base):
+    """Order totals per calendar day (UTC), maintained on order creation."""
+
+    __tablename__ = "sales_daily"
+
+    day = Column(Date, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    subtotal = Column(Float, nullable=False, default=0.0)
+    tax_amount = Column(Float, nullable=False, default=0.0)
+    discount_amount = Column(Float, nullable=False, default=0.0)
+    revenue = Column(Float, nullable=False, default=0.0)  # sum of total_price
+
+
+class DailyItemSales(Base):
+    """Units sold and line revenue per sandwich per day."""
+
+    __tablename__ = "sales_daily_items"
+
+    day = Column(Date, primary_key=True)
+    sandwich_id = Column(Integer, primary_key=True)
+    units = Column(Integer, nullable=False, default=0)
+    order_lines = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)  # sum of line subtotals
+
+
+class DailyPromotionSales(Base):
+    """Orders and discount granted per promotion code per day."""
+
+    __tablename__ = "sales_daily_promotions"
+
+    day = Column(Date, primary_key=True)
+    promotion_code = Column(String(50), primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    discount_amount = Column(Float, nullable=False, default=0.0)
+    revenue = Column(Float, nullable=False, default=0.0)
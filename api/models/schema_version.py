@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer
+
+from ..dependencies.database import Base
+
+# Bump together with any change to the tables, and make the matching
+# `python -m api.manage` command stamp it.
+SCHEMA_VERSION = 1
+
+
+class SchemaVersion(Base):
+    """Schema versions applied by `python -m api.manage init-db`; the app checks
+    the highest one at startup."""
+
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    applied_at = Column(DateTime, nullable=False, default=datetime.utcnow)
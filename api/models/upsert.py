@@ -0,0 +1,37 @@
+from typing import Optional
+
+from sqlalchemy import insert, update
+
+
+def increment_row(connection, table, keys: dict, deltas: dict, initial: Optional[dict] = None) -> None:
+    """Add `deltas` to the row identified by `keys`, creating it if missing.
+
+    A missing row is inserted with `initial` (default: the deltas). One upsert
+    statement where the dialect supports it, so concurrent transactions never
+    lose each other's increments.
+    """
+    increments = {name: table.c[name] + delta for name, delta in deltas.items()}
+    initial = {**keys, **(deltas if initial is None else initial)}
+
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        stmt = mysql_insert(table).values(**initial).on_duplicate_key_update(**increments)
+    elif dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+        stmt = dialect_insert(table).values(**initial).on_conflict_do_update(
+            index_elements=[table.c[name] for name in keys], set_=increments,
+        )
+    else:
+        condition = [table.c[name] == value for name, value in keys.items()]
+        result = connection.execute(update(table).where(*condition).values(**increments))
+        if result.rowcount:
+            return
+        stmt = insert(table).values(**initial)
+
+    connection.execute(stmt)
@@ -0,0 +1,59 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from ..controllers import analytics as analytics_controller
+from ..dependencies.auth import require_roles
+from ..dependencies.database import get_db
+from ..schemas.analytics import (
+    DailySalesResponse,
+    ItemDailySalesResponse,
+    ItemSalesResponse,
+    PromotionSalesResponse,
+    SalesSummaryResponse,
+)
+from ..schemas.roles import Role
+
+# date ranges are inclusive on both ends
+DateFrom = Query(None, alias="from")
+DateTo = Query(None, alias="to")
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["Analytics"],
+    dependencies=[Depends(require_roles(Role.STAFF, Role.ADMIN))],
+)
+
+
+@router.get("/summary", response_model=SalesSummaryResponse, summary="Order totals for a date range")
+def get_sales_summary(date_from: Optional[date] = DateFrom, date_to: Optional[date] = DateTo,
+                      db: Session = Depends(get_db)):
+    return analytics_controller.sales_summary(db, date_from, date_to)
+
+
+@router.get("/daily", response_model=List[DailySalesResponse], summary="Order totals per day")
+def get_daily_sales(date_from: Optional[date] = DateFrom, date_to: Optional[date] = DateTo,
+                    db: Session = Depends(get_db)):
+    return analytics_controller.daily_sales(db, date_from, date_to)
+
+
+@router.get("/items", response_model=List[ItemSalesResponse], summary="Best selling menu items by revenue")
+def get_item_sales(date_from: Optional[date] = DateFrom, date_to: Optional[date] = DateTo,
+                   limit: int = Query(50, ge=1, le=1000), db: Session = Depends(get_db)):
+    return analytics_controller.item_sales(db, date_from, date_to, limit=limit)
+
+
+@router.get("/items/{menu_item_id}/daily", response_model=List[ItemDailySalesResponse],
+            summary="Units and revenue per day for one menu item")
+def get_item_daily_sales(menu_item_id: int, date_from: Optional[date] = DateFrom,
+                         date_to: Optional[date] = DateTo, db: Session = Depends(get_db)):
+    return analytics_controller.item_daily_sales(db, menu_item_id, date_from, date_to)
+
+
+@router.get("/promotions", response_model=List[PromotionSalesResponse],
+            summary="Orders and discount granted per promotion code")
+def get_promotion_sales(date_from: Optional[date] = DateFrom, date_to: Optional[date] = DateTo,
+                        db: Session = Depends(get_db)):
+    return analytics_controller.promotion_sales(db, date_from, date_to)
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, Query
+
+from ..cache import menu as menu_cache
+from ..cache import promotions as promotion_cache
+from ..dependencies import database, pool_stats, query_stats
+from ..dependencies.auth import require_roles
+from ..schemas.roles import Role
+
+router = APIRouter(
+    prefix="/diagnostics",
+    tags=["Diagnostics"],
+    dependencies=[Depends(require_roles(Role.STAFF, Role.ADMIN))],
+)
+
+
+@router.get("/db-pool", summary="Live connection pool statistics per engine")
+def get_db_pool_stats():
+    return pool_stats.all_pool_status()
+
+
+@router.get("/db-replicas", summary="Health of the read replicas used by GET requests")
+def get_db_replicas():
+    return database.replicas.status()
+
+
+@router.get("/caches", summary="Hit/miss counters of the process-local caches")
+def get_cache_stats():
+    return {
+        "menu": menu_cache.stats(),
+        "promotions": promotion_cache.stats(),
+    }
+
+
+@router.get("/sql", summary="Statement counts and database time per route, and suspected N+1 patterns")
+def get_sql_stats():
+    return query_stats.stats()
+
+
+@router.put("/sql", summary="Switch per-request SQL instrumentation on or off in this worker",
+            dependencies=[Depends(require_roles(Role.ADMIN))])
+def set_sql_instrumentation(enabled: bool = Query(...)):
+    if enabled:
+        query_stats.enable()
+    else:
+        query_stats.disable()
+    return {"enabled": query_stats.enabled()}
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, status, Query
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ..controllers import guest_orders as controller
 from ..schemas import guest_orders as schema
-from ..dependencies.database import get_db
+from ..dependencies.database import get_async_db, get_db
+from ..idempotency import handler as idempotency
 from ..schemas.guest_orders import GuestOrderCreate, GuestOrder
 
 router = APIRouter(
@@ -20,9 +24,13 @@ router = APIRouter(
 )
 def create_guest_order(
     request: schema.GuestOrderCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias=idempotency.HEADER),
 ):
-    return controller.create(db=db, request=request)
+    return idempotency.run(
+        db, idempotency_key, "POST /guestorders", request, schema.GuestOrder,
+        status.HTTP_201_CREATED, lambda session: controller.create(db=session, request=request),
+    )
 
 
 # 👇 MOVE THIS BLOCK ABOVE "/{order_id}"
@@ -41,3 +49,27 @@ def lookup_guest_order(
 @router.get("/{order_id}", response_model=GuestOrder)
 def get_guest_order(order_id: int, db: Session = Depends(get_db)):
     return controller.read_one(db=db, order_id=order_id)
+
+
+# served in place of the reads above when conf.async_db is set (see index.load_routes)
+async_router = APIRouter(
+    tags=["Guest Orders"],
+    prefix="/guestorders"
+)
+
+
+@async_router.get(
+    "/lookup",
+    response_model=schema.GuestOrder,
+    summary="Lookup a guest order by public code"
+)
+async def lookup_guest_order_async(
+    code: str = Query(..., min_length=1),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await controller.lookup_by_code_async(db=db, code=code)
+
+
+@async_router.get("/{order_id}", response_model=GuestOrder)
+async def get_guest_order_async(order_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await controller.read_one_async(db=db, order_id=order_id)
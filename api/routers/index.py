@@ -1,10 +1,65 @@
-from . import orders, order_details, guest_orders, menu_items, review, promotions
+"""The app's routers, mounted when the app is first used rather than imported.
 
+api.main only adds LoadRoutesMiddleware, so importing the app imports none
+of the modules below (nor the controllers, caches and schemas behind them).
+They are imported and included on the app's first ASGI event: the lifespan
+startup under a server, or the first request when a client skips the
+lifespan. Each module has a module-level router of sync routes on get_db.
 
-def load_routes(app):
-    app.include_router(orders.router)
-    app.include_router(order_details.router)
-    app.include_router(guest_orders.router)
-    app.include_router(menu_items.router)
-    app.include_router(review.router)
-    app.include_router(promotions.router)
\ No newline at end of file
+With conf.async_db set, modules that also have an async_router (the hot
+reads, on get_async_db and the native async controllers) are served from it
+in place of the sync route with the same path and method; the rest stays on
+the sync routes.
+"""
+from importlib import import_module
+
+from fastapi import APIRouter
+
+from ..dependencies.config import conf
+
+ROUTERS = (
+    "diagnostics",
+    "metrics",
+    "orders",
+    "order_details",
+    "guest_orders",
+    "menu_items",
+    "review",
+    "promotions",
+    "analytics",
+)
+
+
+def _with_async(router: APIRouter, async_router: APIRouter) -> APIRouter:
+    """`router` with each route `async_router` also serves swapped for the async
+    one, in place, so paths still match in the order they were declared."""
+    replacements = {(route.path, method): route for route in async_router.routes for method in route.methods}
+    merged = APIRouter()
+    for route in router.routes:
+        merged.routes.append(next(
+            (replacements[(route.path, method)] for method in route.methods if (route.path, method) in replacements),
+            route,
+        ))
+    return merged
+
+
+def load_routes(app, async_db=None):
+    if async_db is None:
+        async_db = conf.async_db
+    for name in ROUTERS:
+        module = import_module(f".{name}", __package__)
+        async_router = getattr(module, "async_router", None) if async_db else None
+        app.include_router(module.router if async_router is None else _with_async(module.router, async_router))
+    app.state.routes_loaded = True
+    app.openapi_schema = None  # in case it was generated before the routes were in
+
+
+class LoadRoutesMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        app = scope["app"]
+        if not getattr(app.state, "routes_loaded", False):
+            load_routes(app)  # no await in between: one event loop mounts them once
+        await self.app(scope, receive, send)
@@ -1,65 +1,90 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..dependencies.database import get_db
-from ..models.sandwiches import Sandwich
+from ..cache import availability
+from ..cache import menu as menu_cache
+from ..cache import versions
+from ..controllers import menu_items as controller
+from ..dependencies.auth import require_roles
+from ..dependencies.database import get_async_db, get_db
+from ..dependencies import http_cache
+from ..schemas.roles import Role
 from ..schemas.menu_item import MenuItemCreate, MenuItemRead, MenuItemUpdate
 
 router = APIRouter(prefix="/menu-items", tags=["Menu Items"])
 
 
+def _unfiltered(search, category, is_vegetarian, include_inactive, available_only) -> bool:
+    # the plain listing is served from one shared, pre-serialized body
+    return not (search or category or is_vegetarian is not None or include_inactive or available_only)
+
+
 @router.post("/", response_model=MenuItemRead, status_code=status.HTTP_201_CREATED)
 def create_menu_item(
     payload: MenuItemCreate,
     db: Session = Depends(get_db),
 ):
-    item = Sandwich(**payload.dict())
-    db.add(item)
-    db.commit()
-    db.refresh(item)
-    return item
+    return controller.create_menu_item(db, payload)
 
 
 @router.get("/", response_model=List[MenuItemRead])
 def list_menu_items(
+    request: Request,
+    response: Response,
     search: Optional[str] = None,
     category: Optional[str] = None,
     is_vegetarian: Optional[bool] = None,
     include_inactive: bool = False,
+    available_only: bool = False,
     db: Session = Depends(get_db),
 ):
-    query = db.query(Sandwich)
-
-    if not include_inactive:
-        query = query.filter(Sandwich.is_active.is_(True))
-
-    if search:
-        pattern = f"%{search}%"
-        query = query.filter(Sandwich.name.ilike(pattern))
-
-    if category:
-        query = query.filter(Sandwich.food_category == category)
-
-    if is_vegetarian is not None:
-        query = query.filter(Sandwich.is_vegetarian.is_(is_vegetarian))
-
-    return query.all()
+    availability.refresh(db)  # may bump versions.MENU
+    not_modified = http_cache.check(request, response, versions.MENU)
+    if not_modified:
+        return not_modified
+
+    if _unfiltered(search, category, is_vegetarian, include_inactive, available_only):
+        body = http_cache.cached_body(controller.MENU_LISTING, response)
+        if body is None:
+            body = http_cache.store_body(
+                controller.MENU_LISTING, response, controller.serialize_menu_items(controller.list_menu_items(db))
+            )
+        return http_cache.json_response(body, response)
+
+    return controller.list_menu_items(
+        db,
+        search=search,
+        category=category,
+        is_vegetarian=is_vegetarian,
+        include_inactive=include_inactive,
+        available_only=available_only,
+    )
+
+
+@router.get(
+    "/cache/stats",
+    summary="Menu cache hit/miss counters",
+    dependencies=[Depends(require_roles(Role.STAFF, Role.ADMIN))],
+)
+def get_menu_cache_stats():
+    return menu_cache.stats()
 
 
 @router.get("/{item_id}", response_model=MenuItemRead)
 def get_menu_item(
     item_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
 ):
-    item = db.query(Sandwich).get(item_id)
-    if not item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Menu item not found",
-        )
-    return item
+    availability.refresh(db)  # may bump versions.MENU
+    not_modified = http_cache.check(request, response, versions.MENU)
+    if not_modified:
+        return not_modified
+    return controller.get_menu_item(db, item_id)
 
 
 @router.put("/{item_id}", response_model=MenuItemRead)
@@ -68,20 +93,7 @@ def update_menu_item(
     payload: MenuItemUpdate,
     db: Session = Depends(get_db),
 ):
-    item = db.query(Sandwich).get(item_id)
-    if not item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Menu item not found",
-        )
-
-    for field, value in payload.dict(exclude_unset=True).items():
-        setattr(item, field, value)
-
-    db.add(item)
-    db.commit()
-    db.refresh(item)
-    return item
+    return controller.update_menu_item(db, item_id, payload)
 
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -89,13 +101,57 @@ def delete_menu_item(
     item_id: int,
     db: Session = Depends(get_db),
 ):
-    item = db.query(Sandwich).get(item_id)
-    if not item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Menu item not found",
-        )
-
-    db.delete(item)
-    db.commit()
-    return
\ No newline at end of file
+    controller.delete_menu_item(db, item_id)
+
+
+# served in place of the reads above when conf.async_db is set (see index.load_routes)
+async_router = APIRouter(prefix="/menu-items", tags=["Menu Items"])
+
+
+@async_router.get("/", response_model=List[MenuItemRead])
+async def list_menu_items_async(
+    request: Request,
+    response: Response,
+    search: Optional[str] = None,
+    category: Optional[str] = None,
+    is_vegetarian: Optional[bool] = None,
+    include_inactive: bool = False,
+    available_only: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    await availability.refresh_async(db)  # may bump versions.MENU
+    not_modified = http_cache.check(request, response, versions.MENU)
+    if not_modified:
+        return not_modified
+
+    if _unfiltered(search, category, is_vegetarian, include_inactive, available_only):
+        body = http_cache.cached_body(controller.MENU_LISTING, response)
+        if body is None:
+            body = http_cache.store_body(
+                controller.MENU_LISTING, response,
+                controller.serialize_menu_items(await controller.list_menu_items_async(db)),
+            )
+        return http_cache.json_response(body, response)
+
+    return await controller.list_menu_items_async(
+        db,
+        search=search,
+        category=category,
+        is_vegetarian=is_vegetarian,
+        include_inactive=include_inactive,
+        available_only=available_only,
+    )
+
+
+@async_router.get("/{item_id}", response_model=MenuItemRead)
+async def get_menu_item_async(
+    item_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
+    await availability.refresh_async(db)  # may bump versions.MENU
+    not_modified = http_cache.check(request, response, versions.MENU)
+    if not_modified:
+        return not_modified
+    return await controller.get_menu_item_async(db, item_id)
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+
+from ..metrics import app_metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", summary="Prometheus metrics (all workers when PROMETHEUS_MULTIPROC_DIR is set)",
+            response_class=Response)
+def get_metrics():
+    body, content_type = app_metrics.exposition()
+    return Response(content=body, media_type=content_type)
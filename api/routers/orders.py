@@ -1,11 +1,21 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..dependencies.database import get_db
-from ..schemas.orders import OrderCreate, OrderResponse
+from ..dependencies import database
+from ..dependencies.database import get_async_db, get_db
+from ..dependencies.pagination import set_next_cursor
+from ..schemas.orders import (
+    OrderCreate, OrderResponse, OrderBatchCreate, OrderBatchResponse, OrderStatusBulkUpdate, OrderStatusBulkResponse,
+)
 from ..controllers import orders as orders_controller
+from ..events import order_events
+from ..idempotency import handler as idempotency
 
 from ..dependencies.auth import require_roles
 from ..schemas.roles import Role
@@ -16,34 +26,128 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=OrderResponse, status_code=201)
-def create_order(order_in: OrderCreate, db: Session = Depends(get_db)):
-    order = orders_controller.create_order(db, order_in)
-    return order
+def create_order(order_in: OrderCreate, db: Session = Depends(get_db),
+                 idempotency_key: Optional[str] = Header(None, alias=idempotency.HEADER)):
+    return idempotency.run(db, idempotency_key, "POST /orders", order_in, OrderResponse, 201,
+                           lambda session: orders_controller.create_order(session, order_in))
+
+
+@router.post("/batch", response_model=OrderBatchResponse, summary="Create many orders in one transaction")
+def create_orders_batch(batch_in: OrderBatchCreate, db: Session = Depends(get_db)):
+    return orders_controller.create_orders_batch(db, batch_in.orders)
+
 
 @router.get("/", response_model=List[OrderResponse])
-def list_orders(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500),
-    db: Session = Depends(get_db),):
-    return orders_controller.list_orders(db, skip=skip, limit=limit)
+def list_orders(response: Response, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500),
+                cursor: Optional[str] = None, db: Session = Depends(get_db),):
+    orders = orders_controller.list_orders(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, orders, limit, orders_controller.ORDER_KEYSET, cursor)
+    return orders
 
 
 @router.get("/staff", response_model=List[OrderResponse], summary="Staff view: list all orders",
             dependencies=[Depends(require_roles(Role.STAFF, Role.ADMIN))])
-def list_staff_orders(skip: int = Query(0, ge=0), limit: int = Query(1000, ge=1, le=5000), db: Session = Depends(get_db)):
-    orders = orders_controller.list_staff_orders(db, skip=skip, limit=limit)
+def list_staff_orders(response: Response, skip: int = Query(0, ge=0), limit: int = Query(1000, ge=1, le=5000),
+                      cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    orders = orders_controller.list_staff_orders(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, orders, limit, orders_controller.ORDER_KEYSET, cursor)
     return orders
 
+
+@router.get("/staff/export", summary="Staff view: stream orders as NDJSON or CSV",
+            response_class=StreamingResponse,
+            dependencies=[Depends(require_roles(Role.STAFF, Role.ADMIN))])
+def export_staff_orders(format: str = Query("ndjson"),
+                        date_from: Optional[datetime] = Query(None, alias="from"),
+                        date_to: Optional[datetime] = Query(None, alias="to"), db: Session = Depends(get_db)):
+    # validated up front: errors must happen before the response starts
+    chunks = orders_controller.export_orders(db, format, date_from=date_from, date_to=date_to)
+    return StreamingResponse(chunks, media_type=orders_controller.EXPORT_MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f'attachment; filename="orders.{format}"'})
+
+
+def _catch_up(event_id: int):
+    # no request session: it would hold a pooled connection for the life of the stream
+    db = database.SessionLocal()
+    try:
+        return order_events.catch_up(db, event_id)
+    finally:
+        db.close()
+
+
+@router.get("/staff/stream", summary="Staff view: live order events (Server-Sent Events)",
+            response_class=StreamingResponse,
+            dependencies=[Depends(require_roles(Role.STAFF, Role.ADMIN))])
+async def stream_staff_orders(last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")):
+    resume_from = order_events.parse_last_event_id(last_event_id)
+
+    async def catch_up(event_id: int):
+        return await run_in_threadpool(_catch_up, event_id)
+
+    return StreamingResponse(order_events.stream(resume_from, catch_up), media_type="text/event-stream",
+                             headers=order_events.SSE_HEADERS)
+
+
+@router.patch("/staff/status", response_model=OrderStatusBulkResponse,
+              summary="Staff view: move many orders to a new status",
+              dependencies=[Depends(require_roles(Role.STAFF, Role.ADMIN))])
+def update_order_statuses(update_in: OrderStatusBulkUpdate, db: Session = Depends(get_db)):
+    return orders_controller.update_order_statuses(db, update_in)
+
+
 @router.get("/staff/{order_id}", response_model=OrderResponse, summary="Staff view: get any order by ID",
             dependencies=[Depends(require_roles(Role.STAFF, Role.ADMIN))],)
-def get_order_for_staff(order_id: int, db: Session = Depends(get_db),):
-    order = orders_controller.get_order(db, order_id)
-    return order
+def get_order_for_staff(order_id: int, db: Session = Depends(get_db)):
+    return orders_controller.get_order(db, order_id)
+
 
 @router.get("/tracking/{tracking_number}", response_model=OrderResponse)
 def get_order_by_tracking(tracking_number: str, db: Session = Depends(get_db)):
-    order = orders_controller.get_order_by_tracking(db, tracking_number)
-    return order
+    return orders_controller.get_order_by_tracking(db, tracking_number)
+
 
 @router.get("/{order_id}", response_model=OrderResponse)
 def get_order(order_id: int, db: Session = Depends(get_db)):
     order = orders_controller.get_order(db, order_id)
-    return order
\ No newline at end of file
+    return order
+
+
+# The hot reads on the async driver, served in place of the routes above
+# when conf.async_db is set (see index.load_routes).
+async_router = APIRouter(
+    prefix="/orders",
+    tags=["Orders"],
+)
+
+@async_router.get("/", response_model=List[OrderResponse])
+async def list_orders_async(response: Response, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500),
+                            cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    orders = await orders_controller.list_orders_async(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, orders, limit, orders_controller.ORDER_KEYSET, cursor)
+    return orders
+
+
+@async_router.get("/staff", response_model=List[OrderResponse], summary="Staff view: list all orders",
+                  dependencies=[Depends(require_roles(Role.STAFF, Role.ADMIN))])
+async def list_staff_orders_async(response: Response, skip: int = Query(0, ge=0),
+                                  limit: int = Query(1000, ge=1, le=5000), cursor: Optional[str] = None,
+                                  db: AsyncSession = Depends(get_async_db)):
+    orders = await orders_controller.list_staff_orders_async(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, orders, limit, orders_controller.ORDER_KEYSET, cursor)
+    return orders
+
+
+@async_router.get("/staff/{order_id}", response_model=OrderResponse, summary="Staff view: get any order by ID",
+                  dependencies=[Depends(require_roles(Role.STAFF, Role.ADMIN))],)
+async def get_order_for_staff_async(order_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await orders_controller.get_order_async(db, order_id)
+
+
+@async_router.get("/tracking/{tracking_number}", response_model=OrderResponse)
+async def get_order_by_tracking_async(tracking_number: str, db: AsyncSession = Depends(get_async_db)):
+    return await orders_controller.get_order_by_tracking_async(db, tracking_number)
+
+
+@async_router.get("/{order_id}", response_model=OrderResponse)
+async def get_order_async(order_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await orders_controller.get_order_async(db, order_id)
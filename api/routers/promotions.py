@@ -1,9 +1,11 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..dependencies.database import get_db
+from ..dependencies.database import get_async_db, get_db
+from ..dependencies.pagination import set_next_cursor
 from ..dependencies.auth import require_roles
 from ..schemas.roles import Role
 from ..schemas.promotion import PromotionCreate, PromotionUpdate, PromotionResponse
@@ -32,11 +34,15 @@ def create_promotion(
     dependencies=[Depends(require_roles(Role.STAFF, Role.ADMIN))],
 )
 def list_promotions(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
 ):
-    return promotion_controller.list_promotions(db, skip=skip, limit=limit)
+    promotions = promotion_controller.list_promotions(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, promotions, limit, promotion_controller.PROMOTION_KEYSET, cursor)
+    return promotions
 
 @router.get(
     "/{promotion_id}",
@@ -71,4 +77,38 @@ def delete_promotion(
     promotion_id: int,
     db: Session = Depends(get_db),
 ):
-    promotion_controller.delete_promotion(db, promotion_id)
\ No newline at end of file
+    promotion_controller.delete_promotion(db, promotion_id)
+
+
+# served in place of the reads above when conf.async_db is set (see index.load_routes)
+async_router = APIRouter(
+    prefix="/promotions",
+    tags=["Promotions"],
+)
+
+@async_router.get(
+    "/",
+    response_model=List[PromotionResponse],
+    dependencies=[Depends(require_roles(Role.STAFF, Role.ADMIN))],
+)
+async def list_promotions_async(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    promotions = await promotion_controller.list_promotions_async(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, promotions, limit, promotion_controller.PROMOTION_KEYSET, cursor)
+    return promotions
+
+@async_router.get(
+    "/{promotion_id}",
+    response_model=PromotionResponse,
+    dependencies=[Depends(require_roles(Role.STAFF, Role.ADMIN))],
+)
+async def get_promotion_async(
+    promotion_id: int,
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await promotion_controller.get_promotion_async(db, promotion_id)
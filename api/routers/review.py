@@ -1,9 +1,13 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..dependencies.database import get_db
+from ..cache import versions
+from ..dependencies import http_cache
+from ..dependencies.database import get_async_db, get_db
+from ..dependencies.pagination import set_next_cursor
 from ..controllers import review as reviews_controller
 from ..schemas.review import ReviewResponse, RatingSummaryResponse
 
@@ -13,20 +17,88 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[ReviewResponse])
-def list_reviews(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500),
-                db: Session = Depends(get_db),
+def list_reviews(response: Response, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500),
+                cursor: Optional[str] = None, db: Session = Depends(get_db),
 ):
-    return reviews_controller.list_reviews(db, skip=skip, limit=limit)
+    reviews = reviews_controller.list_reviews(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, reviews, limit, reviews_controller.REVIEW_KEYSET, cursor)
+    return reviews
 
 
 @router.get("/item/{menu_item_id}", response_model=List[ReviewResponse])
-def list_reviews_for_item(menu_item_id: int, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500),
-                        db: Session = Depends(get_db),
+def list_reviews_for_item(request: Request, response: Response, menu_item_id: int,
+                        skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500),
+                        cursor: Optional[str] = None, db: Session = Depends(get_db),
 ):
-    return reviews_controller.list_reviews_for_item(db, menu_item_id=menu_item_id, skip=skip, limit=limit,)
+    not_modified = http_cache.check(request, response, versions.reviews_key(menu_item_id))
+    if not_modified:
+        return not_modified
+    reviews = reviews_controller.list_reviews_for_item(db, menu_item_id=menu_item_id, skip=skip, limit=limit,
+                                                       cursor=cursor,)
+    set_next_cursor(response, reviews, limit, reviews_controller.REVIEW_KEYSET, cursor)
+    return reviews
 
 
 @router.get("/item/{menu_item_id}/rating", response_model=RatingSummaryResponse)
-def get_rating_summary(menu_item_id: int, db: Session = Depends(get_db),
+def get_rating_summary(request: Request, response: Response, menu_item_id: int, db: Session = Depends(get_db),
 ):
-    return reviews_controller.get_rating_summary_for_item(db, menu_item_id)
\ No newline at end of file
+    not_modified = http_cache.check(request, response, versions.reviews_key(menu_item_id))
+    if not_modified:
+        return not_modified
+    return reviews_controller.get_rating_summary_for_item(db, menu_item_id)
+
+
+@router.get("/ratings", response_model=List[RatingSummaryResponse],
+            summary="Rating summaries for many menu items in one query")
+def get_rating_summaries(ids: str = Query(..., description="Comma-separated menu item ids"),
+                         db: Session = Depends(get_db),
+):
+    return reviews_controller.get_rating_summaries(db, reviews_controller.parse_id_list(ids))
+
+
+# served in place of the routes above when conf.async_db is set (see index.load_routes)
+async_router = APIRouter(
+    prefix="/reviews",
+    tags=["Reviews"],
+)
+
+@async_router.get("/", response_model=List[ReviewResponse])
+async def list_reviews_async(response: Response, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500),
+                             cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db),
+):
+    reviews = await reviews_controller.list_reviews_async(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, reviews, limit, reviews_controller.REVIEW_KEYSET, cursor)
+    return reviews
+
+
+@async_router.get("/item/{menu_item_id}", response_model=List[ReviewResponse])
+async def list_reviews_for_item_async(request: Request, response: Response, menu_item_id: int,
+                                      skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500),
+                                      cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db),
+):
+    not_modified = http_cache.check(request, response, versions.reviews_key(menu_item_id))
+    if not_modified:
+        return not_modified
+    reviews = await reviews_controller.list_reviews_for_item_async(
+        db, menu_item_id=menu_item_id, skip=skip, limit=limit, cursor=cursor,
+    )
+    set_next_cursor(response, reviews, limit, reviews_controller.REVIEW_KEYSET, cursor)
+    return reviews
+
+
+@async_router.get("/item/{menu_item_id}/rating", response_model=RatingSummaryResponse)
+async def get_rating_summary_async(request: Request, response: Response, menu_item_id: int,
+                                   db: AsyncSession = Depends(get_async_db),
+):
+    not_modified = http_cache.check(request, response, versions.reviews_key(menu_item_id))
+    if not_modified:
+        return not_modified
+    return await reviews_controller.get_rating_summary_for_item_async(db, menu_item_id)
+
+
+@async_router.get("/ratings", response_model=List[RatingSummaryResponse],
+                  summary="Rating summaries for many menu items in one query")
+async def get_rating_summaries_async(ids: str = Query(..., description="Comma-separated menu item ids"),
+                                     db: AsyncSession = Depends(get_async_db),
+):
+    return await reviews_controller.get_rating_summaries_async(db, reviews_controller.parse_id_list(ids))
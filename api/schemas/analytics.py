@@ -0,0 +1,51 @@
+from datetime import date
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class DailySalesResponse(BaseModel):
+    day: date
+    order_count: int
+    subtotal: float
+    tax_amount: float
+    discount_amount: float
+    revenue: float
+
+    class Config:
+        from_attributes = True
+
+
+class SalesSummaryResponse(BaseModel):
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    days: int
+    order_count: int
+    subtotal: float
+    tax_amount: float
+    discount_amount: float
+    revenue: float
+    average_order_value: float
+
+
+class ItemSalesResponse(BaseModel):
+    menu_item_id: int
+    name: Optional[str] = None
+    units: int
+    order_lines: int
+    revenue: float
+
+
+class ItemDailySalesResponse(BaseModel):
+    day: date
+    units: int
+    order_lines: int
+    revenue: float
+
+
+class PromotionSalesResponse(BaseModel):
+    promotion_code: str
+    order_count: int
+    discount_amount: float
+    revenue: float
+
@@ -39,6 +39,8 @@ class MenuItemUpdate(BaseModel):
 
 class MenuItemRead(MenuItemBase):
     id: int
+    # units the kitchen can make from current stock; None if no recipe limits it
+    max_available: Optional[int] = None
 
     class Config:
         orm_mode = True
\ No newline at end of file
@@ -1,6 +1,15 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import AliasChoices, BaseModel, Field
+from typing import Any, Dict, Optional, List
 from datetime import datetime
+from enum import Enum
+
+
+class OrderStatus(str, Enum):
+    PLACED = "PLACED"  # customer orders start here
+    PENDING = "PENDING"  # guest orders start here
+    PREPARING = "PREPARING"
+    READY = "READY"
+    DELIVERED = "DELIVERED"
 
 
 class OrderItemBase(BaseModel):
@@ -14,6 +23,8 @@ class OrderItemCreate(OrderItemBase):
 
 
 class OrderItemResponse(OrderItemBase):
+    # OrderDetail rows store the menu item as sandwich_id
+    menu_item_id: int = Field(..., validation_alias=AliasChoices("menu_item_id", "sandwich_id"))
     id: int
     order_id: int
     unit_price: float
@@ -53,7 +64,47 @@ class OrderResponse(OrderBase):
     estimated_delivery_time: Optional[datetime] = None
     actual_delivery_time: Optional[datetime] = None
     updated_at: Optional[datetime] = None
-    order_items: List[OrderItemResponse] = []
+    # the Order model exposes its line items as the order_details relationship
+    order_items: List[OrderItemResponse] = Field(
+        default=[], validation_alias=AliasChoices("order_items", "order_details")
+    )
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class OrderBatchCreate(BaseModel):
+    # Each entry is validated as an OrderCreate on its own so that one bad
+    # order does not reject the whole batch.
+    orders: List[Dict[str, Any]] = Field(..., min_length=1, max_length=1000)
+
+
+class OrderBatchResult(BaseModel):
+    index: int
+    success: bool
+    order: Optional[OrderResponse] = None
+    error: Optional[str] = None
+
+
+class OrderBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[OrderBatchResult]
+
+
+class OrderStatusBulkUpdate(OrderUpdate):
+    order_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    order_status: OrderStatus
+
+
+class OrderStatusResult(BaseModel):
+    order_id: int
+    success: bool
+    previous_status: Optional[str] = None
+    order_status: Optional[str] = None
+    error: Optional[str] = None
+
+
+class OrderStatusBulkResponse(BaseModel):
+    updated: int
+    failed: int
+    results: List[OrderStatusResult]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, Optional
 from datetime import datetime
 
 
@@ -31,4 +31,6 @@ class ReviewResponse(ReviewBase):
 class RatingSummaryResponse(BaseModel):
     menu_item_id: int
     average_rating: float
-    review_count: int
\ No newline at end of file
+    review_count: int
+    # number of reviews per star value (ratings rounded to the nearest star)
+    histogram: Dict[int, int] = {}
\ No newline at end of file
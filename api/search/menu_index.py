@@ -0,0 +1,281 @@
+"""In-process full-text index over the menu.
+
+Menu items are tokenized from name, food_category, ingredients_text and
+description into weighted postings (term -> {menu item id: weight}). A query
+token matches a term exactly, as a prefix of a longer term, or (for tokens of
+four or more characters) within a small edit distance, with candidates found
+through a trigram -> terms index instead of comparing against the whole
+vocabulary. Items must match every query token and are ranked by the summed
+weight of their best match per token.
+
+The index is loaded from the database on first use, updated in place by the
+menu_items controller on writes, and fully rebuilt every
+conf.menu_search_rebuild_seconds so that writes made by other worker
+processes are picked up. One request rebuilds at a time, into a new index
+that replaces the current one once it is complete; while it does, other
+requests search the index as it was (or, before the first load, wait for it).
+Writes made during a rebuild are applied to both.
+"""
+import bisect
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..dependencies.config import conf
+from ..dependencies.replicas import primary_session
+from ..models.sandwiches import Sandwich
+
+if TYPE_CHECKING:  # the async driver is only needed when the async routes are served
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "food_category": 2.0,
+    "ingredients_text": 1.5,
+    "description": 1.0,
+}
+
+EXACT = 1.0
+PREFIX = 0.8
+FUZZY = 0.5
+MIN_FUZZY_LENGTH = 4
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _max_edits(term: str) -> int:
+    return 1 if len(term) < 8 else 2
+
+
+def _within_edits(a: str, b: str, limit: int) -> bool:
+    """Levenshtein distance <= limit, giving up as soon as a row exceeds it."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+class MenuSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._terms: List[str] = []  # sorted vocabulary, for prefix ranges
+        self._trigrams: Dict[str, Set[str]] = defaultdict(set)
+        self._doc_terms: Dict[int, Set[str]] = {}
+        self.loaded_at: Optional[float] = None
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple]) -> "MenuSearchIndex":
+        """A new index over (id, *FIELD_WEIGHTS values) rows."""
+        index = cls()
+        for item_id, *values in rows:
+            index.add(item_id, dict(zip(FIELD_WEIGHTS, values)))
+        index.loaded_at = time.monotonic()
+        return index
+
+    # -- writes ---------------------------------------------------------
+
+    def _add_term(self, term: str) -> None:
+        self._postings[term] = {}
+        bisect.insort(self._terms, term)
+        for gram in trigrams(term):
+            self._trigrams[gram].add(term)
+
+    def _drop_term(self, term: str) -> None:
+        del self._postings[term]
+        del self._terms[bisect.bisect_left(self._terms, term)]
+        for gram in trigrams(term):
+            bucket = self._trigrams.get(gram)
+            if bucket is not None:
+                bucket.discard(term)
+                if not bucket:
+                    del self._trigrams[gram]
+
+    def remove(self, item_id: int) -> None:
+        with self._lock:
+            for term in self._doc_terms.pop(item_id, ()):
+                postings = self._postings[term]
+                postings.pop(item_id, None)
+                if not postings:
+                    self._drop_term(term)
+
+    def add(self, item_id: int, fields: Dict[str, Optional[str]]) -> None:
+        weights: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(fields.get(field)):
+                weights[term] = max(weights.get(term, 0.0), weight)
+
+        with self._lock:
+            self.remove(item_id)
+            for term, weight in weights.items():
+                if term not in self._postings:
+                    self._add_term(term)
+                self._postings[term][item_id] = weight
+            self._doc_terms[item_id] = set(weights)
+
+    # -- reads ----------------------------------------------------------
+
+    def _expand(self, token: str) -> Dict[str, float]:
+        """Vocabulary terms matching one query token, with their match factor."""
+        matches: Dict[str, float] = {}
+        if token in self._postings:
+            matches[token] = EXACT
+
+        terms = self._terms
+        for i in range(bisect.bisect_left(terms, token), len(terms)):
+            term = terms[i]
+            if not term.startswith(token):
+                break
+            matches.setdefault(term, PREFIX)
+
+        if len(token) >= MIN_FUZZY_LENGTH:
+            limit = _max_edits(token)
+            candidates: Set[str] = set()
+            for gram in trigrams(token):
+                candidates |= self._trigrams.get(gram, set())
+            for term in candidates:
+                if term not in matches and _within_edits(token, term, limit):
+                    matches[term] = FUZZY
+        return matches
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[int]:
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        with self._lock:
+            scores: Optional[Dict[int, float]] = None
+            for token in tokens:
+                best: Dict[int, float] = {}
+                for term, factor in self._expand(token).items():
+                    for item_id, weight in self._postings[term].items():
+                        score = weight * factor
+                        if score > best.get(item_id, 0.0):
+                            best[item_id] = score
+
+                if scores is None:
+                    scores = best
+                else:
+                    scores = {i: s + best[i] for i, s in scores.items() if i in best}
+                if not scores:
+                    return []
+
+        ranked = sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [item_id for item_id, _ in ranked]
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+
+_index = MenuSearchIndex()
+_load_lock = threading.Lock()
+_writes_lock = threading.Lock()
+# writes made while a rebuild runs, replayed onto the new index before it is swapped in
+_replay: Optional[List[Callable[[MenuSearchIndex], None]]] = None
+
+
+def _fields(item) -> Dict[str, Optional[str]]:
+    return {field: getattr(item, field) for field in FIELD_WEIGHTS}
+
+
+def _fresh() -> bool:
+    loaded_at = _index.loaded_at
+    return loaded_at is not None and time.monotonic() - loaded_at < conf.menu_search_rebuild_seconds
+
+
+def _ensure_loaded(db: Session) -> None:
+    global _index, _replay
+    if _fresh():
+        return
+    # a stale index is still usable: leave the rebuild to whoever is doing it
+    if not _load_lock.acquire(blocking=_index.loaded_at is None):
+        return
+    try:
+        if _fresh():  # rebuilt while we waited for the lock
+            return
+        with _writes_lock:
+            _replay = []
+        columns = [Sandwich.id] + [getattr(Sandwich, field) for field in FIELD_WEIGHTS]
+        rebuilt = None
+        try:
+            # built without holding the index lock, so searches carry on meanwhile
+            with primary_session(db) as primary:  # never load a lagging replica's menu
+                rebuilt = MenuSearchIndex.build(primary.query(*columns).yield_per(1000))
+        finally:
+            with _writes_lock:
+                if rebuilt is not None:
+                    for write in _replay:
+                        write(rebuilt)
+                    _index = rebuilt
+                _replay = None
+    finally:
+        _load_lock.release()
+
+
+def preload(db: Session) -> None:
+    _ensure_loaded(db)
+
+
+def search(db: Session, query: str, limit: Optional[int] = None) -> List[int]:
+    """Menu item ids matching `query`, best match first."""
+    _ensure_loaded(db)
+    return _index.search(query, limit=limit)
+
+
+async def search_async(db: "AsyncSession", query: str, limit: Optional[int] = None) -> List[int]:
+    """search() for an AsyncSession; only a due rebuild goes through run_sync."""
+    if not _fresh():
+        await db.run_sync(_ensure_loaded)
+    return _index.search(query, limit=limit)
+
+
+def _write(apply: Callable[[MenuSearchIndex], None]) -> None:
+    with _writes_lock:
+        # Before the first search the index is empty and will be loaded in full.
+        if _index.loaded_at is not None:
+            apply(_index)
+        if _replay is not None:
+            _replay.append(apply)
+
+
+def index_item(item: Sandwich) -> None:
+    item_id, fields = item.id, _fields(item)
+    _write(lambda index: index.add(item_id, fields))
+
+
+def remove_item(item_id: int) -> None:
+    _write(lambda index: index.remove(item_id))
+
+
+def clear() -> None:
+    global _index
+    with _writes_lock:
+        _index = MenuSearchIndex()
@@ -0,0 +1,182 @@
+"""Compare p50/p95/p99 latency of the sync and async (ASYNC_DB=1) read routes.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_async_db --clients 200 --requests 20
+
+Both apps are driven in-process through httpx's ASGI transport, so the sync
+stack is bounded by the threadpool exactly as under uvicorn while network
+overhead is left out. By default a throwaway SQLite file is used (aiosqlite
+for the async stack); pass --db-url and --async-db-url to point both stacks at
+the same MySQL database, e.g. mysql+pymysql://... and mysql+aiomysql://...
+SQLite numbers mostly reflect aiosqlite's thread-per-connection design; the
+comparison that matters for sizing is the one against MySQL.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.dependencies.database import Base, get_db, get_async_db
+from api.models import model_loader  # noqa: F401  (registers every table)
+from api.models.orders import Order
+from api.models.order_details import OrderDetail
+from api.models.sandwiches import Sandwich
+from api.routers import index as indexRoute
+
+
+def _seed(db_url, sandwiches, orders):
+    engine = create_engine(db_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Sandwich), [
+            {"name": f"Sandwich {i}", "price": 5 + i % 10, "is_active": True}
+            for i in range(sandwiches)
+        ])
+        conn.execute(insert(Order), [
+            {
+                "customer_id": i,
+                "delivery_address": f"{i} Load Test Lane",
+                "tracking_number": f"TRK-BENCH-{i}",
+                "order_status": "PLACED",
+                "subtotal": 10.0,
+                "tax_amount": 0.7,
+                "discount_amount": 0.0,
+                "total_price": 10.7,
+            }
+            for i in range(orders)
+        ])
+        conn.execute(insert(OrderDetail), [
+            {
+                "order_id": i + 1,
+                "sandwich_id": 1 + i % sandwiches,
+                "amount": 1,
+                "quantity": 1,
+                "unit_price": 10.0,
+                "subtotal": 10.0,
+            }
+            for i in range(orders)
+        ])
+    engine.dispose()
+
+
+def _sync_app(db_url, pool_size):
+    engine = create_engine(db_url, pool_size=pool_size, max_overflow=0,
+                           connect_args={"check_same_thread": False} if db_url.startswith("sqlite") else {})
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    indexRoute.load_routes(app, async_db=False)
+    app.dependency_overrides[get_db] = override_get_db
+    return app, engine
+
+
+def _async_app(async_db_url, pool_size):
+    engine = create_async_engine(async_db_url, pool_size=pool_size, max_overflow=0)
+    Session = async_sessionmaker(autoflush=False, bind=engine)
+
+    async def override_get_async_db():
+        async with Session() as db:
+            yield db
+
+    app = FastAPI()
+    indexRoute.load_routes(app, async_db=True)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    return app, engine
+
+
+async def _drive(app, clients, requests_per_client, orders):
+    latencies = []
+    errors = 0
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker(seed):
+            nonlocal errors
+            rng = random.Random(seed)
+            for _ in range(requests_per_client):
+                if rng.random() < 0.5:
+                    url = "/menu-items/"
+                else:
+                    url = f"/orders/{rng.randint(1, orders)}"
+                start = time.perf_counter()
+                response = await client.get(url)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    return latencies, errors, elapsed
+
+
+def _report(label, latencies, errors, elapsed):
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{label:6s} {len(latencies) / elapsed:9.1f} req/s  "
+        f"p50 {quantiles[49] * 1000:8.1f} ms  p95 {quantiles[94] * 1000:8.1f} ms  "
+        f"p99 {quantiles[98] * 1000:8.1f} ms  errors {errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", default=None)
+    parser.add_argument("--async-db-url", default=None)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--pool-size", type=int, default=None,
+                        help="connections per stack (default: one per client). The sync stack can "
+                             "deadlock when fewer connections than in-flight requests are available, "
+                             "because session teardown also waits for a threadpool slot")
+    parser.add_argument("--sandwiches", type=int, default=30)
+    parser.add_argument("--orders", type=int, default=2000)
+    args = parser.parse_args()
+
+    db_url, async_db_url = args.db_url, args.async_db_url
+    if db_url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="bench_async_"), "bench.db")
+        db_url = f"sqlite:///{path}"
+        async_db_url = f"sqlite+aiosqlite:///{path}"
+    elif async_db_url is None:
+        parser.error("--async-db-url is required together with --db-url")
+
+    pool_size = args.pool_size or args.clients
+    _seed(db_url, args.sandwiches, args.orders)
+    print(f"{args.clients} concurrent clients x {args.requests} requests")
+
+    app, engine = _sync_app(db_url, pool_size)
+    _report("sync", *asyncio.run(_drive(app, args.clients, args.requests, args.orders)))
+    engine.dispose()
+
+    async def run_async():
+        app, engine = _async_app(async_db_url, pool_size)
+        try:
+            return await _drive(app, args.clients, args.requests, args.orders)
+        finally:
+            await engine.dispose()
+
+    _report("async", *asyncio.run(run_async()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""Load test the hot endpoints and check the numbers against a stored baseline.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_load --concurrency 50 --requests 2000 --output results.json
+
+Seeds --sandwiches, --orders and --reviews rows into a throwaway SQLite file
+(or the database at --db-url, which is wiped first), then drives each
+scenario in turn at --concurrency in-flight requests through httpx's ASGI
+transport and prints throughput and p50/p95/p99:
+
+    create_order        POST /orders/
+    create_guest_order  POST /guestorders/
+    menu_items          GET  /menu-items/
+    staff_orders        GET  /orders/staff?limit=--staff-limit  (X-Role: staff)
+    item_rating         GET  /reviews/item/{id}/rating
+
+--output writes the results as JSON. To guard against regressions, record a
+baseline once on the machine that will run the check,
+
+    python -m benchmarks.bench_load --baseline benchmarks/baselines/local.json --update-baseline
+
+and later runs with the same --baseline exit with status 1 when a scenario
+is slower than its baseline by more than --tolerance (latency up, or
+throughput down), or fails more requests. Baselines are only comparable
+between runs on the same hardware, database and seed volumes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.controllers import review as review_controller
+from api.dependencies.database import Base, get_async_db, get_db
+from api.models import model_loader
+from api.models.customer import Customer
+from api.models.order_details import OrderDetail
+from api.models.orders import Order
+from api.models.review import Review
+from api.models.sandwiches import Sandwich
+from api.routers import index as indexRoute
+
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+STAFF_HEADERS = {"X-Role": "staff"}
+
+
+def _seed(db_url, sandwiches, orders, reviews):
+    """Recreate the schema and bulk insert the seed rows; returns the sandwich ids."""
+    engine = create_engine(db_url)
+    Base.metadata.drop_all(bind=engine)
+    model_loader.index(engine)
+    customers = max(1, min(reviews, 1000))
+    with engine.begin() as conn:
+        conn.execute(insert(Sandwich), [
+            {"name": f"Sandwich {i}", "price": 5 + i % 10, "is_active": True}
+            for i in range(sandwiches)
+        ])
+        sandwich_ids = conn.execute(select(Sandwich.id).order_by(Sandwich.id)).scalars().all()
+        conn.execute(insert(Customer), [
+            {"name": f"Customer {i}", "email": f"customer{i}@load.test", "phone_number": "555-0100",
+             "address": f"{i} Load Test Lane"}
+            for i in range(customers)
+        ])
+        customer_ids = conn.execute(select(Customer.id).order_by(Customer.id)).scalars().all()
+        if orders:
+            conn.execute(insert(Order), [
+                {
+                    "customer_id": customer_ids[i % customers],
+                    "delivery_address": f"{i} Load Test Lane",
+                    "tracking_number": f"TRK-LOAD-{i}",
+                    "order_status": "PLACED",
+                    "subtotal": 10.0,
+                    "tax_amount": 0.7,
+                    "discount_amount": 0.0,
+                    "total_price": 10.7,
+                }
+                for i in range(orders)
+            ])
+            order_ids = conn.execute(select(Order.id).order_by(Order.id)).scalars().all()
+            conn.execute(insert(OrderDetail), [
+                {
+                    "order_id": order_id,
+                    "sandwich_id": sandwich_ids[i % sandwiches],
+                    "amount": 1,
+                    "quantity": 1,
+                    "unit_price": 10.0,
+                    "subtotal": 10.0,
+                }
+                for i, order_id in enumerate(order_ids)
+            ])
+        if reviews:
+            rng = random.Random(0)
+            conn.execute(insert(Review), [
+                {
+                    "customer_id": customer_ids[i % customers],
+                    "menu_item_id": sandwich_ids[i % sandwiches],
+                    "rating": rng.randint(1, 5),
+                    "review_text": "Seeded by the load benchmark",
+                }
+                for i in range(reviews)
+            ])
+    # Core inserts bypass the Review mapper events that keep the aggregates
+    with sessionmaker(bind=engine)() as db:
+        review_controller.rebuild_rating_aggregates(db)
+    engine.dispose()
+    return sandwich_ids
+
+
+def _sync_session(db_url, pool_size):
+    engine = create_engine(db_url, pool_size=pool_size, max_overflow=0,
+                           connect_args={"check_same_thread": False} if db_url.startswith("sqlite") else {})
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    return engine, override_get_db
+
+
+def _sync_app(db_url, pool_size):
+    engine, override_get_db = _sync_session(db_url, pool_size)
+    app = FastAPI()
+    indexRoute.load_routes(app, async_db=False)
+    app.dependency_overrides[get_db] = override_get_db
+    return app, engine
+
+
+def _async_app(db_url, async_db_url, pool_size):
+    # only the hot reads have async routes; the writes stay on the sync ones
+    sync_engine, override_get_db = _sync_session(db_url, pool_size)
+    engine = create_async_engine(async_db_url, pool_size=pool_size, max_overflow=0)
+    Session = async_sessionmaker(autoflush=False, bind=engine)
+
+    async def override_get_async_db():
+        async with Session() as db:
+            yield db
+
+    app = FastAPI()
+    indexRoute.load_routes(app, async_db=True)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    return app, sync_engine, engine
+
+
+def _scenarios(sandwich_ids, staff_limit):
+    """name -> function(client, rng) issuing one request."""
+
+    def create_order(client, rng):
+        return client.post("/orders/", json={
+            "customer_id": 1,
+            "delivery_address": "1 Load Test Lane",
+            "order_items": [{"menu_item_id": rng.choice(sandwich_ids), "quantity": rng.randint(1, 3)}],
+        })
+
+    def create_guest_order(client, rng):
+        return client.post("/guestorders/", json={
+            "guest_name": "Load Test",
+            "items": [{"menu_item_id": rng.choice(sandwich_ids), "quantity": rng.randint(1, 3)}],
+        })
+
+    def menu_items(client, rng):
+        return client.get("/menu-items/")
+
+    def staff_orders(client, rng):
+        return client.get("/orders/staff", params={"limit": staff_limit}, headers=STAFF_HEADERS)
+
+    def item_rating(client, rng):
+        return client.get(f"/reviews/item/{rng.choice(sandwich_ids)}/rating")
+
+    return {
+        "create_order": create_order,
+        "create_guest_order": create_guest_order,
+        "menu_items": menu_items,
+        "staff_orders": staff_orders,
+        "item_rating": item_rating,
+    }
+
+
+async def _drive(client, request, concurrency, total, warmup):
+    """Issue `total` requests with `concurrency` in flight; latencies in seconds."""
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker(seed, count_latency):
+        nonlocal errors, remaining
+        rng = random.Random(seed)
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await request(client, rng)
+            if count_latency:
+                latencies.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors += 1
+
+    remaining = warmup
+    await asyncio.gather(*(worker(-i - 1, False) for i in range(min(concurrency, warmup))))
+
+    remaining = total
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i, True) for i in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def _summarize(latencies, errors, elapsed):
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p95_ms": round(quantiles[94] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+    }
+
+
+async def _run_scenarios(app, scenarios, args):
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, request in scenarios.items():
+            results[name] = _summarize(*await _drive(client, request, args.concurrency, args.requests, args.warmup))
+            _print_result(name, results[name])
+    return results
+
+
+def _print_result(name, result):
+    print(
+        f"{name:20s} {result['throughput']:9.1f} req/s  p50 {result['p50_ms']:8.1f} ms  "
+        f"p95 {result['p95_ms']:8.1f} ms  p99 {result['p99_ms']:8.1f} ms  errors {result['errors']}"
+    )
+
+
+def compare(results, baseline, tolerance, min_delta_ms=1.0):
+    """Regressions of `results` against `baseline`, as human-readable lines.
+
+    A latency percentile regresses when it grew by more than `tolerance`
+    (a fraction) and by more than `min_delta_ms`, so sub-millisecond noise on
+    fast endpoints does not fail the check. Throughput regresses when it fell
+    by more than `tolerance`. Scenarios missing from either side are skipped.
+    """
+    problems = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in LATENCY_METRICS:
+            limit = max(base[metric] * (1 + tolerance), base[metric] + min_delta_ms)
+            if result[metric] > limit:
+                problems.append(f"{name}: {metric} {result[metric]} > {limit:.2f} (baseline {base[metric]})")
+        floor = base["throughput"] * (1 - tolerance)
+        if result["throughput"] < floor:
+            problems.append(
+                f"{name}: throughput {result['throughput']} < {floor:.1f} (baseline {base['throughput']})"
+            )
+        if result["errors"] > base["errors"]:
+            problems.append(f"{name}: {result['errors']} errors (baseline {base['errors']})")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", default=None, help="database to seed and run against (it is wiped)")
+    parser.add_argument("--wipe", action="store_true",
+                        help="allow wiping a --db-url that is not SQLite (its tables are dropped)")
+    parser.add_argument("--async-db-url", default=None, help="async driver URL for the same database")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="drive the ASYNC_DB=1 routes")
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight")
+    parser.add_argument("--requests", type=int, default=1000, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per scenario")
+    parser.add_argument("--scenarios", default=None,
+                        help="comma-separated subset of: create_order, create_guest_order, menu_items, "
+                             "staff_orders, item_rating (default: all)")
+    parser.add_argument("--sandwiches", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--reviews", type=int, default=5000)
+    parser.add_argument("--staff-limit", type=int, default=100, help="page size of the staff order listing")
+    parser.add_argument("--output", default=None, help="write the results as JSON to this file")
+    parser.add_argument("--baseline", default=None, help="JSON results file to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline, as a fraction (default 0.25)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="latency growth below this is never a regression (default 1.0)")
+    args = parser.parse_args(argv)
+
+    if args.update_baseline and not args.baseline:
+        parser.error("--update-baseline needs --baseline")
+    if args.sandwiches < 1:
+        parser.error("--sandwiches must be at least 1")
+
+    db_url, async_db_url = args.db_url, args.async_db_url
+    if db_url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="bench_load_"), "bench.db")
+        db_url = f"sqlite:///{path}"
+        async_db_url = f"sqlite+aiosqlite:///{path}"
+    elif not db_url.startswith("sqlite") and not args.wipe:
+        parser.error("--db-url drops every table before seeding; pass --wipe to confirm for a non-SQLite database")
+    elif args.use_async and async_db_url is None:
+        parser.error("--async-db-url is required together with --db-url and --async")
+
+    sandwich_ids = _seed(db_url, args.sandwiches, args.orders, args.reviews)
+    scenarios = _scenarios(sandwich_ids, args.staff_limit)
+    if args.scenarios:
+        names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+        unknown = sorted(set(names) - set(scenarios))
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(unknown)}")
+        scenarios = {name: scenarios[name] for name in names}
+
+    stack = "async" if args.use_async else "sync"
+    print(f"{stack} reads, {args.concurrency} in flight x {args.requests} requests per scenario")
+
+    # the sync routes can deadlock with fewer connections than requests in
+    # flight, because session teardown also waits for a threadpool slot
+    if args.use_async:
+        async def run_async():
+            app, sync_engine, engine = _async_app(db_url, async_db_url, args.concurrency)
+            try:
+                return await _run_scenarios(app, scenarios, args)
+            finally:
+                await engine.dispose()
+                sync_engine.dispose()
+
+        results = asyncio.run(run_async())
+    else:
+        app, engine = _sync_app(db_url, args.concurrency)
+        try:
+            results = asyncio.run(_run_scenarios(app, scenarios, args))
+        finally:
+            engine.dispose()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": db_url.split(":", 1)[0],
+            "stack": stack,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "seed": {"sandwiches": args.sandwiches, "orders": args.orders, "reviews": args.reviews},
+            "staff_limit": args.staff_limit,
+        },
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline and args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline["scenarios"], args.tolerance, args.min_delta_ms)
+        if problems:
+            print(f"regressions against {args.baseline}:")
+            for problem in problems:
+                print(f"  {problem}")
+            return 1
+        print(f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
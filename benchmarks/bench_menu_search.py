@@ -0,0 +1,110 @@
+"""Compare menu search through the in-process index with the old ILIKE scan.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_menu_search --items 50000
+
+By default a throwaway SQLite file is used; pass --db-url to point at MySQL.
+The index build time is reported separately from per-query latency.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from api.dependencies.database import Base
+from api.models import model_loader  # noqa: F401  (registers every table)
+from api.models.sandwiches import Sandwich
+from api.search import menu_index
+
+BREADS = ["sourdough", "rye", "ciabatta", "baguette", "focaccia", "brioche", "wrap", "pita"]
+FILLINGS = ["turkey", "chicken", "ham", "tuna", "salami", "falafel", "halloumi", "meatball",
+            "pastrami", "egg", "avocado", "mozzarella", "roastbeef", "tofu"]
+EXTRAS = ["pesto", "bacon", "lettuce", "tomato", "pickles", "jalapeno", "mustard", "aioli",
+          "onion", "spinach", "cheddar", "swiss", "hummus", "olives"]
+CATEGORIES = ["Classics", "Hot", "Cold", "Vegetarian", "Specials", "Wraps"]
+
+QUERIES = ["turkey", "pesto chicken", "ciabatta", "jalapeno", "meatbal", "chiken pesto",
+           "vegetarian halloumi", "sourdough bacon"]
+
+
+def _rows(count):
+    rng = random.Random(7)
+    for i in range(count):
+        filling = rng.choice(FILLINGS)
+        extras = rng.sample(EXTRAS, 3)
+        bread = rng.choice(BREADS)
+        yield {
+            "name": f"{filling.title()} {extras[0].title()} {bread.title()} {i}",
+            "price": 5 + (i % 10),
+            "food_category": rng.choice(CATEGORIES),
+            "ingredients_text": ", ".join([filling, bread] + extras),
+            "description": f"{bread} with {filling} and {extras[1]}",
+        }
+
+
+def _setup(db_url, count):
+    engine = create_engine(db_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with Session() as db:
+        db.execute(insert(Sandwich), list(_rows(count)))
+        db.commit()
+    return engine, Session
+
+
+def _ilike(db, text):
+    return db.query(Sandwich.id).filter(Sandwich.name.ilike(f"%{text}%")).limit(200).all()
+
+
+def _latencies(fn, db, repeat):
+    timings = []
+    for _ in range(repeat):
+        for text in QUERIES:
+            start = time.perf_counter()
+            fn(db, text)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", default=None)
+    parser.add_argument("--items", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db_url = args.db_url
+    if db_url is None:
+        tmp_dir = tempfile.mkdtemp(prefix="bench_search_")
+        db_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+    engine, Session = _setup(db_url, args.items)
+    with Session() as db:
+        menu_index.clear()
+        start = time.perf_counter()
+        menu_index.search(db, "warmup")
+        build = time.perf_counter() - start
+
+        index_p50, index_p95 = _latencies(
+            lambda db, text: menu_index.search(db, text, limit=200), db, args.repeat
+        )
+        ilike_p50, ilike_p95 = _latencies(_ilike, db, args.repeat)
+
+    print(f"menu items:      {args.items}")
+    print(f"index build:     {build:10.2f}s")
+    print(f"index search:    p50 {index_p50:8.2f}ms   p95 {index_p95:8.2f}ms")
+    print(f"ILIKE scan:      p50 {ilike_p50:8.2f}ms   p95 {ilike_p95:8.2f}ms  (name only, no ranking)")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
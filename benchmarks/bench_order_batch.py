@@ -0,0 +1,107 @@
+"""Compare orders/sec of POST /orders (one order per call) with /orders/batch.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_order_batch --orders 2000 --batch-size 200
+
+By default a throwaway SQLite file is used; pass --db-url to point at MySQL.
+The controllers are called directly so the numbers measure the DB write path,
+not HTTP overhead.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.dependencies.database import Base
+from api.models import model_loader  # noqa: F401  (registers every table)
+from api.models.sandwiches import Sandwich
+from api.controllers import orders as orders_controller
+from api.schemas.orders import OrderCreate
+
+
+def _make_payloads(count, sandwich_ids):
+    rng = random.Random(42)
+    payloads = []
+    for i in range(count):
+        items = [
+            {"menu_item_id": rng.choice(sandwich_ids), "quantity": rng.randint(1, 3)}
+            for _ in range(rng.randint(1, 4))
+        ]
+        payloads.append({
+            "customer_id": i + 1,
+            "delivery_address": f"{i} Benchmark Avenue",
+            "order_items": items,
+        })
+    return payloads
+
+
+def _setup(db_url, sandwich_count):
+    engine = create_engine(db_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with Session() as db:
+        db.add_all(
+            Sandwich(name=f"Sandwich {i}", price=5 + (i % 10))
+            for i in range(sandwich_count)
+        )
+        db.commit()
+        sandwich_ids = [row.id for row in db.query(Sandwich.id)]
+    return engine, Session, sandwich_ids
+
+
+def bench_single(Session, payloads):
+    start = time.perf_counter()
+    with Session() as db:
+        for payload in payloads:
+            orders_controller.create_order(db, OrderCreate.model_validate(payload))
+    return time.perf_counter() - start
+
+
+def bench_batch(Session, payloads, batch_size):
+    start = time.perf_counter()
+    with Session() as db:
+        for offset in range(0, len(payloads), batch_size):
+            result = orders_controller.create_orders_batch(db, payloads[offset:offset + batch_size])
+            assert result.failed == 0, result.results
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", default=None)
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--sandwiches", type=int, default=50)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    db_url = args.db_url
+    if db_url is None:
+        tmp_dir = tempfile.mkdtemp(prefix="bench_orders_")
+        db_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+    engine, Session, sandwich_ids = _setup(db_url, args.sandwiches)
+    payloads = _make_payloads(args.orders, sandwich_ids)
+
+    batch_elapsed = bench_batch(Session, payloads, args.batch_size)
+
+    engine, Session, sandwich_ids = _setup(db_url, args.sandwiches)
+    single_elapsed = bench_single(Session, payloads)
+
+    print(f"orders:          {args.orders}")
+    print(f"single path:     {args.orders / single_elapsed:10.1f} orders/sec ({single_elapsed:.2f}s)")
+    print(f"batch path:      {args.orders / batch_elapsed:10.1f} orders/sec ({batch_elapsed:.2f}s, batch size {args.batch_size})")
+    print(f"speedup:         {single_elapsed / batch_elapsed:10.1f}x")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
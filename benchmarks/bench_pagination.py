@@ -0,0 +1,99 @@
+"""Compare a deep keyset (cursor) page of GET /orders with the first page and
+with the equivalent OFFSET page.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_pagination --orders 100000
+
+By default a throwaway SQLite file is used; pass --db-url to point at MySQL.
+Each timing is the best of --repeat runs of orders_controller.list_orders.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from api.controllers import orders as orders_controller
+from api.dependencies.database import Base
+from api.dependencies.pagination import encode_cursor
+from api.models import model_loader  # noqa: F401  (registers every table)
+from api.models.orders import Order
+
+START = datetime(2024, 1, 1)
+
+
+def _setup(db_url, count):
+    engine = create_engine(db_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with Session() as db:
+        db.execute(insert(Order), [
+            {
+                "customer_id": 1,
+                "delivery_address": "1 Pagination Road",
+                "tracking_number": f"TRK-BENCH-{i}",
+                "order_status": "PLACED",
+                "subtotal": 10.0,
+                "tax_amount": 0.7,
+                "discount_amount": 0.0,
+                "total_price": 10.7,
+                "order_date": START + timedelta(seconds=i),
+            }
+            for i in range(count)
+        ])
+        db.commit()
+    return engine, Session
+
+
+def _best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", default=None)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db_url = args.db_url
+    if db_url is None:
+        tmp_dir = tempfile.mkdtemp(prefix="bench_pagination_")
+        db_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+    engine, Session = _setup(db_url, args.orders)
+    # the page that starts 2 * limit rows before the oldest order
+    deep_position = args.orders - 2 * args.limit
+    deep_row_id = args.orders - deep_position
+    deep_cursor = encode_cursor(START + timedelta(seconds=deep_row_id - 1), deep_row_id)
+
+    with Session() as db:
+        first = _best_of(lambda: orders_controller.list_orders(db, limit=args.limit, cursor=""), args.repeat)
+        cursor = _best_of(
+            lambda: orders_controller.list_orders(db, limit=args.limit, cursor=deep_cursor), args.repeat
+        )
+        offset = _best_of(
+            lambda: orders_controller.list_orders(db, skip=deep_position, limit=args.limit), args.repeat
+        )
+
+    print(f"orders:          {args.orders}  (page size {args.limit}, {deep_position} rows deep)")
+    print(f"first page:      {first:8.2f}ms")
+    print(f"deep cursor:     {cursor:8.2f}ms")
+    print(f"deep OFFSET:     {offset:8.2f}ms")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
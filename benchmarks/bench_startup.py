@@ -0,0 +1,109 @@
+"""Measure cold start: import of api.main, lifespan startup and first request.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_startup --runs 10
+
+Every run is a fresh interpreter, as for a new uvicorn worker. It imports the
+app, runs the lifespan (mounting the routers, the schema check, plus cache
+pre-warming with --prewarm), and serves GET /menu-items/ once. The routers
+are imported on the lifespan startup rather than with api.main, so their
+cost shows under startup; compare totals (import to first request). By default a throwaway SQLite file set up
+with init-db is used; pass --db-url to point at MySQL.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.models import model_loader
+from api.models.sandwiches import Sandwich
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child; prints {"import": ms, "startup": ms, "first_request": ms}.
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import api.main
+imported = time.perf_counter()
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from api.dependencies import database
+
+engine = create_engine(sys.argv[1])
+database.engine = engine
+database.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def get_db():
+    with database.SessionLocal() as db:
+        yield db
+
+api.main.app.dependency_overrides[database.get_db] = get_db
+before_startup = time.perf_counter()
+with TestClient(api.main.app) as client:
+    started = time.perf_counter()
+    assert client.get("/menu-items/").status_code == 200
+    served = time.perf_counter()
+
+print(json.dumps({
+    "import": (imported - start) * 1000,
+    "startup": (started - before_startup) * 1000,
+    "first_request": (served - started) * 1000,
+}))
+"""
+
+
+def _setup(db_url, sandwich_count):
+    engine = create_engine(db_url)
+    model_loader.index(engine)
+    with sessionmaker(bind=engine)() as db:
+        if not db.query(Sandwich.id).first():
+            db.add_all(Sandwich(name=f"Sandwich {i}", price=5 + (i % 10)) for i in range(sandwich_count))
+            db.commit()
+    engine.dispose()
+
+
+def _run_once(db_url, prewarm):
+    env = dict(os.environ, PREWARM_CACHES="1" if prewarm else "0", SCHEMA_CHECK="strict")
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, db_url],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", default=None)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--sandwiches", type=int, default=200)
+    parser.add_argument("--prewarm", action="store_true")
+    args = parser.parse_args()
+
+    db_url = args.db_url
+    if db_url is None:
+        tmp_dir = tempfile.mkdtemp(prefix="bench_startup_")
+        db_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    _setup(db_url, args.sandwiches)
+
+    runs = [_run_once(db_url, args.prewarm) for _ in range(args.runs)]
+
+    print(f"runs:            {args.runs} (prewarm {'on' if args.prewarm else 'off'})")
+    for phase in ("import", "startup", "first_request"):
+        values = [run[phase] for run in runs]
+        print(f"{phase + ':':<16} median {statistics.median(values):8.1f} ms   min {min(values):8.1f} ms")
+    totals = [sum(run.values()) for run in runs]
+    print(f"{'total:':<16} median {statistics.median(totals):8.1f} ms   min {min(totals):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,146 @@
 import os
 import sys
+import threading
+
+import pytest
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Shared test DB setup (SQLite file) for the test modules that use the
+# `client` / `db_session` fixtures below.
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_api.db"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False}
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    # Every test starts from an empty database, so process-local caches keyed
+    # by row id must not leak between tests.
+    from api.cache import availability
+    from api.cache import menu as menu_cache
+    from api.cache import promotions as promotion_cache
+    from api.cache import versions
+    from api.dependencies import http_cache
+    from api.events import order_events
+    from api.idempotency import handler as idempotency
+    from api.metrics import app_metrics
+    from api.search import menu_index
+
+    menu_cache.clear()
+    promotion_cache.clear()
+    menu_index.clear()
+    availability.clear()
+    versions.clear()
+    http_cache.clear()
+    idempotency.set_store(None)
+    order_events.hub.clear()
+    app_metrics.clear()
+    yield
+    menu_cache.clear()
+    promotion_cache.clear()
+    menu_index.clear()
+    availability.clear()
+    versions.clear()
+    http_cache.clear()
+    idempotency.set_store(None)
+    order_events.hub.clear()
+    app_metrics.clear()
+
+
+@pytest.fixture
+def test_db():
+    from api.dependencies.database import Base
+    from api.models import model_loader  # noqa: F401  (registers every table)
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(test_db):
+    from api.main import app
+    from api.dependencies.database import get_db
+
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        yield TestClient(app)
+    finally:
+        if previous is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = previous
+
+
+@pytest.fixture
+def session_factory(test_db):
+    return TestingSessionLocal
+
+
+@pytest.fixture
+def db_session(test_db):
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def sandwich(db_session):
+    from api.models.sandwiches import Sandwich
+
+    item = Sandwich(name="Reuben", price=10.00)
+    db_session.add(item)
+    db_session.commit()
+    db_session.refresh(item)
+    return item
+
+
+def run_concurrently(n, fn):
+    """[fn(0), ..., fn(n - 1)], each called on its own thread, all released at once."""
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def call(i):
+        barrier.wait()
+        results[i] = fn(i)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def order_payload(menu_item_id, quantity=1, **fields):
+    """A POST /orders body with one line; `fields` are added to it."""
+    return {
+        "customer_id": 1,
+        "delivery_address": "1 Test Lane",
+        "order_items": [{"menu_item_id": menu_item_id, "quantity": quantity}],
+        **fields,
+    }
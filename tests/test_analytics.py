@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert
+
+from api.controllers import analytics as analytics_controller
+from api.models.order_details import OrderDetail
+from api.models.orders import Order
+from api.models.promotion import Promotion
+from api.models.sales_rollup import DailyItemSales, DailyPromotionSales, DailySales
+from api.models.sandwiches import Sandwich
+
+STAFF = {"X-Role": "staff"}
+
+
+@pytest.fixture
+def sandwiches(db_session):
+    items = [Sandwich(name="BLT", price=8.00), Sandwich(name="Falafel Wrap", price=6.00)]
+    db_session.add_all(items)
+    db_session.add(Promotion(
+        code="FIVE", discount_type="fixed", discount_value=5, usage_count=0, is_active=1,
+        start_date=datetime.utcnow() - timedelta(days=1),
+        expiration_date=datetime.utcnow() + timedelta(days=1),
+    ))
+    db_session.commit()
+    return items
+
+
+def _order(customer_id, items, promotion_code=None):
+    return {
+        "customer_id": customer_id,
+        "delivery_address": "12 Rollup Road",
+        "order_items": [{"menu_item_id": i, "quantity": q} for i, q in items],
+        "promotion_code": promotion_code,
+    }
+
+
+def _place_orders(client, blt, wrap):
+    assert client.post("/orders/", json=_order(1, [(blt.id, 2)])).status_code == 201
+    assert client.post("/orders/", json=_order(2, [(blt.id, 1), (wrap.id, 1)], "FIVE")).status_code == 201
+    batch = client.post("/orders/batch", json={"orders": [
+        _order(3, [(wrap.id, 3)]),
+        _order(4, [(blt.id, 1)], "FIVE"),
+    ]})
+    assert batch.json()["created"] == 2
+    guest = client.post("/guestorders/", json={"items": [{"menu_item_id": wrap.id, "quantity": 2}]})
+    assert guest.status_code == 201
+
+
+def _rollup_snapshot(db_session):
+    db_session.expire_all()
+    return {
+        model.__tablename__: sorted(
+            tuple(round(v, 6) if isinstance(v, float) else v for v in
+                  (getattr(row, c.key) for c in model.__table__.columns))
+            for row in db_session.query(model)
+        )
+        for model in (DailySales, DailyItemSales, DailyPromotionSales)
+    }
+
+
+def test_rollups_follow_order_creation(client, sandwiches):
+    blt, wrap = sandwiches
+    _place_orders(client, blt, wrap)
+    today = datetime.utcnow().date().isoformat()
+
+    daily = client.get("/analytics/daily", headers=STAFF).json()
+    assert [d["day"] for d in daily] == [today]
+    assert daily[0]["order_count"] == 5
+    assert daily[0]["subtotal"] == pytest.approx(16 + 14 + 18 + 8 + 12)
+    assert daily[0]["discount_amount"] == pytest.approx(10)
+
+    items = client.get("/analytics/items", headers=STAFF).json()
+    assert [(i["name"], i["units"], i["order_lines"]) for i in items] == [
+        ("Falafel Wrap", 6, 3),
+        ("BLT", 4, 3),
+    ]
+
+    promotions = client.get("/analytics/promotions", headers=STAFF).json()
+    assert [(p["promotion_code"], p["order_count"]) for p in promotions] == [("FIVE", 2)]
+    assert promotions[0]["discount_amount"] == pytest.approx(10)
+
+    summary = client.get("/analytics/summary", headers=STAFF).json()
+    assert summary["days"] == 1
+    assert summary["order_count"] == 5
+    assert summary["average_order_value"] == pytest.approx(summary["revenue"] / 5)
+
+
+def test_rebuild_matches_incremental_rollups(client, db_session, sandwiches):
+    blt, wrap = sandwiches
+    _place_orders(client, blt, wrap)
+    incremental = _rollup_snapshot(db_session)
+
+    assert analytics_controller.rebuild_sales_rollups(db_session) == 1
+    assert _rollup_snapshot(db_session) == incremental
+
+
+def test_reports_read_only_rollups_and_filter_by_day(client, db_session, test_db, sandwiches):
+    blt, _ = sandwiches
+    start = datetime(2025, 3, 1, 12)
+    for day in range(10):
+        db_session.execute(insert(Order), [{
+            "customer_id": 1, "delivery_address": "1 History Lane", "tracking_number": f"TRK-H-{day}",
+            "order_status": "DELIVERED", "subtotal": 8.0 * (day + 1), "tax_amount": 0.0,
+            "discount_amount": 0.0, "total_price": 8.0 * (day + 1), "order_date": start + timedelta(days=day),
+        }])
+        order_id = db_session.query(Order.id).filter_by(tracking_number=f"TRK-H-{day}").scalar()
+        db_session.add(OrderDetail(order_id=order_id, sandwich_id=blt.id, amount=day + 1,
+                                   quantity=day + 1, unit_price=8.0, subtotal=8.0 * (day + 1)))
+    db_session.commit()
+    analytics_controller.rebuild_sales_rollups(db_session)
+
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_db, "before_cursor_execute", _record)
+    try:
+        params = {"from": "2025-03-03", "to": "2025-03-05"}
+        daily = client.get("/analytics/daily", params=params, headers=STAFF).json()
+        history = client.get(f"/analytics/items/{blt.id}/daily", params=params, headers=STAFF).json()
+        summary = client.get("/analytics/summary", params=params, headers=STAFF).json()
+    finally:
+        event.remove(test_db, "before_cursor_execute", _record)
+
+    assert [d["day"] for d in daily] == ["2025-03-03", "2025-03-04", "2025-03-05"]
+    assert [h["units"] for h in history] == [3, 4, 5]
+    assert summary["revenue"] == pytest.approx(8.0 * (3 + 4 + 5))
+    assert not [s for s in statements if "FROM orders" in s or "FROM order_details" in s]
+
+
+def test_analytics_require_staff_and_valid_range(client, test_db):
+    assert client.get("/analytics/daily").status_code == 403
+    params = {"from": "2025-03-05", "to": "2025-03-01"}
+    assert client.get("/analytics/daily", params=params, headers=STAFF).status_code == 400
@@ -0,0 +1,306 @@
+import inspect
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from api.dependencies.database import get_async_db, get_db
+from api.models.review import Review
+from api.routers import index as indexRoute
+from conftest import override_get_db
+
+# Same SQLite file as the shared `test_db` fixture, through the async driver.
+# NullPool: every TestClient runs its own event loop, so connections must not
+# be pooled across tests.
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_api.db", poolclass=NullPool)
+AsyncTestingSessionLocal = async_sessionmaker(autoflush=False, bind=async_engine)
+
+
+async def override_get_async_db():
+    async with AsyncTestingSessionLocal() as db:
+        yield db
+
+
+@pytest.fixture
+def async_client(test_db):
+    app = FastAPI()
+    indexRoute.load_routes(app, async_db=True)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    with TestClient(app) as client:
+        yield client
+
+
+def _create_menu_item(client, name="Meatball Sub", price="8.75"):
+    response = client.post("/menu-items/", json={"name": name, "price": price})
+    assert response.status_code == 201
+    return response.json()
+
+
+def _api_routes(routes):
+    for route in routes:
+        included = getattr(route, "original_router", None)  # include_router wraps instead of copying
+        if included is not None:
+            yield from _api_routes(included.routes)
+        elif hasattr(route, "dependant"):
+            yield route
+
+
+def _served(app):
+    """(method, path) -> the route serving it, for the app's API routes."""
+    return {(method, route.path): route for route in _api_routes(app.routes) for method in route.methods}
+
+
+def _session_dependencies(route):
+    return {d.call for d in route.dependant.dependencies} & {get_db, get_async_db}
+
+
+def test_async_db_swaps_in_async_routes_only_for_the_hot_reads():
+    sync_app, async_app = FastAPI(), FastAPI()
+    indexRoute.load_routes(sync_app, async_db=False)
+    indexRoute.load_routes(async_app, async_db=True)
+    sync_routes, async_routes = _served(sync_app), _served(async_app)
+    assert sync_routes.keys() == async_routes.keys()
+    assert len(async_routes) == sum(len(route.methods) for route in _api_routes(async_app.routes))
+
+    async_reads = {key for key, route in async_routes.items() if get_async_db in _session_dependencies(route)}
+    assert async_reads == {
+        ("GET", "/orders/"), ("GET", "/orders/staff"), ("GET", "/orders/staff/{order_id}"),
+        ("GET", "/orders/tracking/{tracking_number}"), ("GET", "/orders/{order_id}"),
+        ("GET", "/guestorders/lookup"), ("GET", "/guestorders/{order_id}"),
+        ("GET", "/menu-items/"), ("GET", "/menu-items/{item_id}"),
+        ("GET", "/reviews/"), ("GET", "/reviews/item/{menu_item_id}"),
+        ("GET", "/reviews/item/{menu_item_id}/rating"), ("GET", "/reviews/ratings"),
+        ("GET", "/promotions/"), ("GET", "/promotions/{promotion_id}"),
+    }
+    for key, route in sync_routes.items():
+        assert get_async_db not in _session_dependencies(route)
+        if get_db in _session_dependencies(route):
+            assert not inspect.iscoroutinefunction(route.endpoint)
+        if key in async_reads:
+            assert inspect.iscoroutinefunction(async_routes[key].endpoint)
+        else:
+            assert async_routes[key] is route
+
+
+def test_async_menu_and_order_flow(async_client):
+    item = _create_menu_item(async_client)
+
+    created = async_client.post("/orders/", json={
+        "customer_id": 7,
+        "delivery_address": "9 Async Avenue",
+        "order_items": [{"menu_item_id": item["id"], "quantity": 2}],
+    })
+    assert created.status_code == 201
+    order = created.json()
+    assert order["subtotal"] == pytest.approx(17.50)
+    assert order["order_items"][0]["menu_item_id"] == item["id"]
+
+    fetched = async_client.get(f"/orders/{order['id']}")
+    assert fetched.status_code == 200
+    assert fetched.json()["tracking_number"] == order["tracking_number"]
+
+    listed = async_client.get("/orders/staff", headers={"X-Role": "staff"})
+    assert [o["id"] for o in listed.json()] == [order["id"]]
+
+    assert async_client.get("/orders/999").status_code == 404
+
+    moved = async_client.patch("/orders/staff/status", headers={"X-Role": "staff"},
+                               json={"order_ids": [order["id"]], "order_status": "PREPARING"})
+    assert moved.status_code == 200
+    assert moved.json()["results"][0]["previous_status"] == "PLACED"
+    assert async_client.get(f"/orders/{order['id']}").json()["order_status"] == "PREPARING"
+
+
+def test_order_reads_await_the_async_driver(async_client, monkeypatch):
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    item = _create_menu_item(async_client)
+    order = async_client.post("/orders/", json={
+        "customer_id": 7,
+        "delivery_address": "9 Async Avenue",
+        "order_items": [{"menu_item_id": item["id"], "quantity": 1}],
+    }).json()
+
+    def no_run_sync(self, fn, *args, **kwargs):
+        raise AssertionError("order reads should not go through run_sync")
+
+    monkeypatch.setattr(AsyncSession, "run_sync", no_run_sync)
+    assert async_client.get(f"/orders/{order['id']}").json()["order_items"][0]["quantity"] == 1
+    assert async_client.get(f"/orders/tracking/{order['tracking_number']}").json()["id"] == order["id"]
+    assert async_client.get("/orders/staff/999", headers={"X-Role": "staff"}).status_code == 404
+
+    first = async_client.get("/orders/", params={"limit": 1, "cursor": ""})
+    assert [o["id"] for o in first.json()] == [order["id"]]
+    following = async_client.get("/orders/", params={"limit": 1, "cursor": first.headers["x-next-cursor"]})
+    assert following.json() == []
+
+
+def test_other_reads_await_the_async_driver(async_client, db_session, monkeypatch):
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    staff = {"X-Role": "staff"}
+    item = _create_menu_item(async_client, name="Tuna Melt")
+    guest = async_client.post("/guestorders/", json={
+        "guest_name": "Eli",
+        "items": [{"menu_item_id": item["id"], "quantity": 2}],
+    }).json()
+    promotion = async_client.post("/promotions/", headers=staff, json={
+        "code": "NATIVE5",
+        "discount_type": "fixed_amount",
+        "discount_value": 5,
+        "start_date": "2025-01-01T00:00:00",
+        "expiration_date": "2030-01-01T00:00:00",
+    }).json()
+    db_session.add(Review(menu_item_id=item["id"], customer_id=1, rating=4))
+    db_session.commit()
+    assert async_client.get("/menu-items/", params={"search": "tuna"}).status_code == 200  # loads the index
+
+    def no_run_sync(self, fn, *args, **kwargs):
+        raise AssertionError("these reads should not go through run_sync")
+
+    monkeypatch.setattr(AsyncSession, "run_sync", no_run_sync)
+    assert async_client.get(f"/guestorders/{guest['id']}").json()["items"][0]["quantity"] == 2
+    assert async_client.get("/guestorders/lookup", params={"code": guest["code"]}).json()["id"] == guest["id"]
+    assert async_client.get("/guestorders/999").status_code == 404
+
+    assert [i["id"] for i in async_client.get("/menu-items/").json()] == [item["id"]]
+    assert [i["id"] for i in async_client.get("/menu-items/", params={"search": "tuna"}).json()] == [item["id"]]
+    assert async_client.get(f"/menu-items/{item['id']}").json()["name"] == "Tuna Melt"
+    assert async_client.get("/menu-items/999").status_code == 404
+
+    assert [r["rating"] for r in async_client.get(f"/reviews/item/{item['id']}").json()] == [4]
+    assert len(async_client.get("/reviews/").json()) == 1
+    assert async_client.get(f"/reviews/item/{item['id']}/rating").json()["review_count"] == 1
+    assert [s["menu_item_id"] for s in async_client.get("/reviews/ratings", params={"ids": item["id"]}).json()] == \
+        [item["id"]]
+
+    assert [p["code"] for p in async_client.get("/promotions/", headers=staff).json()] == ["NATIVE5"]
+    assert async_client.get(f"/promotions/{promotion['id']}", headers=staff).json()["code"] == "NATIVE5"
+    assert async_client.get("/promotions/999", headers=staff).status_code == 404
+
+
+def test_async_guest_order_and_menu_update(async_client):
+    item = _create_menu_item(async_client, name="Caprese", price="7.00")
+
+    created = async_client.post("/guestorders/", json={
+        "guest_name": "Dana",
+        "items": [{"menu_item_id": item["id"], "quantity": 1}],
+    })
+    assert created.status_code == 201
+    code = created.json()["code"]
+
+    lookup = async_client.get("/guestorders/lookup", params={"code": code})
+    assert lookup.status_code == 200
+    assert lookup.json()["guest_name"] == "Dana"
+
+    updated = async_client.put(f"/menu-items/{item['id']}", json={"is_active": False})
+    assert updated.status_code == 200
+    assert async_client.get("/menu-items/").json() == []
+
+    assert async_client.delete(f"/menu-items/{item['id']}").status_code == 204
+    assert async_client.get(f"/menu-items/{item['id']}").status_code == 404
+
+
+def test_async_menu_listing_is_conditional(async_client, monkeypatch):
+    from api.dependencies.config import conf
+
+    monkeypatch.setattr(conf, "http_revalidate_seconds", 0)
+    item = _create_menu_item(async_client)
+
+    first = async_client.get("/menu-items/")
+    assert [i["id"] for i in first.json()] == [item["id"]]
+    assert async_client.get("/menu-items/").content == first.content
+    etag = first.headers["etag"]
+    assert async_client.get("/menu-items/", headers={"If-None-Match": etag}).status_code == 304
+    assert async_client.get(f"/reviews/item/{item['id']}/rating").headers["etag"]
+
+
+def test_async_promotions_and_reviews(async_client):
+    item = _create_menu_item(async_client)
+    staff = {"X-Role": "staff"}
+
+    created = async_client.post("/promotions/", headers=staff, json={
+        "code": "ASYNC10",
+        "discount_type": "percentage",
+        "discount_value": 10,
+        "start_date": "2025-01-01T00:00:00",
+        "expiration_date": "2030-01-01T00:00:00",
+    })
+    assert created.status_code == 201
+
+    listed = async_client.get("/promotions/", headers=staff)
+    assert [p["code"] for p in listed.json()] == ["ASYNC10"]
+
+    rating = async_client.get(f"/reviews/item/{item['id']}/rating")
+    assert rating.status_code == 200
+    assert rating.json()["review_count"] == 0
+
+
+@pytest.mark.parametrize("store", ["memory", "database"])
+def test_async_order_idempotency_key(async_client, monkeypatch, store):
+    from api.dependencies.config import conf
+
+    monkeypatch.setattr(conf, "idempotency_store", store)
+    item = _create_menu_item(async_client, name="Reuben", price="9.00")
+    payload = {
+        "customer_id": 3,
+        "delivery_address": "3 Retry Road",
+        "order_items": [{"menu_item_id": item["id"], "quantity": 1}],
+    }
+    headers = {"Idempotency-Key": f"async-{store}"}
+
+    first = async_client.post("/orders/", json=payload, headers=headers)
+    second = async_client.post("/orders/", json=payload, headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json() == first.json()
+    assert len(async_client.get("/orders/").json()) == 1
+
+
+def test_async_order_export_streams_rows(async_client):
+    item = _create_menu_item(async_client, name="Club", price="9.00")
+    for customer_id in (1, 2, 3):
+        async_client.post("/orders/", json={
+            "customer_id": customer_id,
+            "delivery_address": "4 Export Row",
+            "order_items": [{"menu_item_id": item["id"], "quantity": 1}],
+        })
+
+    response = async_client.get("/orders/staff/export", params={"format": "ndjson"}, headers={"X-Role": "staff"})
+    assert response.status_code == 200
+    assert [row["customer_id"] for row in map(json.loads, response.text.splitlines())] == [1, 2, 3]
+
+    bad = async_client.get("/orders/staff/export", params={"format": "xml"}, headers={"X-Role": "staff"})
+    assert bad.status_code == 400
+
+
+def test_async_statements_are_counted(test_db):
+    from api.dependencies import query_stats
+
+    app = FastAPI()
+    app.add_middleware(query_stats.QueryStatsMiddleware)
+    indexRoute.load_routes(app, async_db=True)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    query_stats.enable()
+    try:
+        with TestClient(app) as client:
+            item = _create_menu_item(client)
+            timing = client.get(f"/reviews/item/{item['id']}").headers["server-timing"]
+    finally:
+        query_stats.disable()
+        query_stats.clear()
+    assert 'desc="0 queries"' not in timing
+
+
+def test_async_url_follows_the_configured_database():
+    from api.dependencies.database import async_url
+
+    assert async_url("sqlite:///./api.db") == "sqlite+aiosqlite:///./api.db"
+    assert async_url("mysql+pymysql://app:p%40ss@db:3306/menu?charset=utf8mb4") == \
+        "mysql+aiomysql://app:p%40ss@db:3306/menu?charset=utf8mb4"
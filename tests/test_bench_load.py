@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from benchmarks import bench_load
+
+
+def _result(p50=10.0, p95=20.0, p99=30.0, throughput=100.0, errors=0):
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "throughput": throughput, "errors": errors}
+
+
+def test_compare_flags_slower_scenarios_only():
+    baseline = {"menu_items": _result(), "item_rating": _result(p50=0.4, p95=0.5, p99=0.6)}
+    results = {
+        "menu_items": _result(p95=26.0, throughput=70.0, errors=2),
+        "item_rating": _result(p50=0.8, p95=1.0, p99=1.2),  # doubled, but under a millisecond
+        "staff_orders": _result(p99=500.0),  # no baseline yet
+    }
+
+    problems = bench_load.compare(results, baseline, tolerance=0.25)
+
+    assert [problem.split(":")[0] for problem in problems] == ["menu_items"] * 3
+    assert "p95_ms 26.0" in problems[0]
+    assert "throughput 70.0" in problems[1]
+    assert "2 errors" in problems[2]
+    assert bench_load.compare(results, baseline, tolerance=0.5) == [problems[2]]
+
+
+def test_small_run_writes_results_and_checks_the_baseline(tmp_path, capsys):
+    baseline = tmp_path / "baselines" / "local.json"
+    output = tmp_path / "results.json"
+    args = ["--db-url", f"sqlite:///{tmp_path / 'load.db'}", "--concurrency", "4", "--requests", "20",
+            "--warmup", "4", "--sandwiches", "5", "--orders", "30", "--reviews", "30",
+            "--baseline", str(baseline)]
+
+    assert bench_load.main(args + ["--update-baseline", "--output", str(output)]) == 0
+    report = json.loads(output.read_text())
+    assert set(report["scenarios"]) == {
+        "create_order", "create_guest_order", "menu_items", "staff_orders", "item_rating",
+    }
+    assert all(result["requests"] == 20 and result["errors"] == 0 for result in report["scenarios"].values())
+    assert json.loads(baseline.read_text())["scenarios"] == report["scenarios"]
+
+    # an impossibly fast baseline makes the run fail
+    for result in report["scenarios"].values():
+        result.update(p50_ms=0, p95_ms=0, p99_ms=0, throughput=1e9)
+    baseline.write_text(json.dumps(report))
+    assert bench_load.main(args + ["--scenarios", "menu_items"]) == 1
+    assert "regressions against" in capsys.readouterr().out
+
+
+def test_non_sqlite_database_is_only_wiped_with_wipe(monkeypatch):
+    def refuse(*args):
+        raise AssertionError("seeded without --wipe")
+
+    monkeypatch.setattr(bench_load, "_seed", refuse)
+    with pytest.raises(SystemExit):
+        bench_load.main(["--db-url", "mysql+pymysql://root@localhost/sandwich_maker_api"])
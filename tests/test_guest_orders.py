@@ -1,10 +1,11 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 from api.main import app
 from api.dependencies.database import Base, get_db
+from api.models.orders import Order
 from api.models.sandwiches import Sandwich
 
 # Test DB setup (SQLite file)
@@ -182,3 +183,61 @@ def test_get_guest_order_by_code(sample_sandwich):
     assert data["code"] == code
     assert data["guest_name"] == "Charlie"
     assert data["items"][0]["quantity"] == 3
+
+
+def test_guest_order_read_uses_stored_prices_in_one_query(sample_sandwich, db_session):
+    create_resp = client.post("/guestorders/", json={
+        "guest_name": "Dana",
+        "table_number": 3,
+        "items": [{"menu_item_id": sample_sandwich.id, "quantity": 2}],
+    })
+    assert create_resp.status_code == 201
+    created = create_resp.json()
+
+    # a later menu price change must not rewrite what the guest was charged
+    sandwich = db_session.get(Sandwich, sample_sandwich.id)
+    sandwich.price = 12.50
+    db_session.commit()
+
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        by_id = client.get(f"/guestorders/{created['id']}")
+        by_id_statements = len(statements)
+        statements.clear()
+        by_code = client.get(f"/guestorders/lookup?code={created['code']}")
+        by_code_statements = len(statements)
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+
+    assert by_id_statements == 1
+    assert by_code_statements == 1
+
+    for response in (by_id, by_code):
+        data = response.json()
+        assert data["guest_name"] == "Dana"
+        assert data["table_number"] == 3
+        item = data["items"][0]
+        assert item["name"] == "Classic Veggie Sandwich"
+        assert item["unit_price"] == pytest.approx(7.99)
+        assert item["subtotal"] == pytest.approx(2 * 7.99)
+
+
+def test_guest_metadata_is_stored_in_columns(sample_sandwich, db_session):
+    create_resp = client.post("/guestorders/", json={
+        "guest_name": "Eve",
+        "contact_email": "eve@example.com",
+        "notes": "Allergic to sesame",
+        "items": [{"menu_item_id": sample_sandwich.id, "quantity": 1}],
+    })
+    assert create_resp.status_code == 201
+
+    order = db_session.get(Order, create_resp.json()["id"])
+    assert order.guest_name == "Eve"
+    assert order.contact_email == "eve@example.com"
+    assert order.notes == "Allergic to sesame"
+    assert order.special_instructions is None
@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from sqlalchemy import event
+
+from api.cache import versions
+from api.dependencies.config import conf
+from api.models.recipes import Recipe
+from api.models.resources import Resource
+from api.models.review import Review
+from api.models.sandwiches import Sandwich
+
+
+@pytest.fixture(autouse=True)
+def fixed_window(monkeypatch):
+    # validators also roll every http_revalidate_seconds; keep them still
+    monkeypatch.setattr(conf, "http_revalidate_seconds", 0)
+
+
+@pytest.fixture
+def menu(db_session):
+    bread = Resource(item="Bread", amount=10)
+    db_session.add(bread)
+    blt = Sandwich(name="BLT", price=6.50)
+    cubano = Sandwich(name="Cubano", price=9.25)
+    db_session.add_all([blt, cubano])
+    db_session.flush()
+    db_session.add(Recipe(sandwich_id=blt.id, resource_id=bread.id, amount=2))
+    db_session.commit()
+    return {"blt": blt.id, "cubano": cubano.id}
+
+
+@pytest.fixture
+def statements(test_db):
+    recorded = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append(statement)
+
+    event.listen(test_db, "before_cursor_execute", _record)
+    yield recorded
+    event.remove(test_db, "before_cursor_execute", _record)
+
+
+def test_menu_listing_revalidates_without_the_database(client, menu, statements):
+    first = client.get("/menu-items/")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == f"public, max-age={conf.http_cache_max_age}, must-revalidate"
+    assert "last-modified" in first.headers
+
+    statements.clear()
+    revalidated = client.get("/menu-items/", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+    # no validator: the precomputed body is served, still without a query
+    again = client.get("/menu-items/")
+    assert again.content == first.content
+    assert statements == []
+
+
+def test_precomputed_listing_matches_the_response_model(client, menu):
+    precomputed = client.get("/menu-items/").json()
+    rendered = client.get("/menu-items/", params={"is_vegetarian": False}).json()
+    assert precomputed == rendered
+    assert {item["name"]: item["max_available"] for item in precomputed} == {"BLT": 5, "Cubano": None}
+
+
+def test_menu_writes_change_the_validator(client, menu):
+    etag = client.get("/menu-items/").headers["etag"]
+
+    assert client.put(f"/menu-items/{menu['cubano']}", json={"price": "9.75"}).status_code == 200
+    response = client.get("/menu-items/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert {item["name"]: item["price"] for item in response.json()}["Cubano"] == "9.75"
+    assert response.headers["etag"] != etag
+
+
+def test_orders_selling_an_item_out_change_the_validator(client, menu):
+    etag = client.get(f"/menu-items/{menu['blt']}").headers["etag"]
+
+    created = client.post("/orders/", json={
+        "customer_id": 1,
+        "delivery_address": "4 Validator Way",
+        "order_items": [{"menu_item_id": menu["blt"], "quantity": 5}],
+    })
+    assert created.status_code == 201
+
+    response = client.get(f"/menu-items/{menu['blt']}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["max_available"] == 0
+    assert client.get("/menu-items/").json()[0]["max_available"] == 0
+
+
+def test_orders_that_only_lower_a_count_keep_the_validator(client, menu):
+    etag = client.get("/menu-items/").headers["etag"]
+
+    created = client.post("/orders/", json={
+        "customer_id": 1,
+        "delivery_address": "4 Validator Way",
+        "order_items": [{"menu_item_id": menu["blt"], "quantity": 2}],
+    })
+    assert created.status_code == 201
+
+    assert client.get("/menu-items/", headers={"If-None-Match": etag}).status_code == 304
+    # a freshly rendered response still has the current count
+    assert client.get(f"/menu-items/{menu['blt']}").json()["max_available"] == 3
+
+
+def test_orders_without_recipes_keep_the_validator(client, menu):
+    etag = client.get("/menu-items/").headers["etag"]
+
+    created = client.post("/orders/", json={
+        "customer_id": 1,
+        "delivery_address": "4 Validator Way",
+        "order_items": [{"menu_item_id": menu["cubano"], "quantity": 2}],
+    })
+    assert created.status_code == 201
+    assert client.get("/menu-items/", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_if_modified_since(client, menu):
+    response = client.get(f"/menu-items/{menu['blt']}")
+    last_modified = response.headers["last-modified"]
+
+    assert client.get(f"/menu-items/{menu['blt']}", headers={"If-Modified-Since": last_modified}).status_code == 304
+    earlier = format_datetime(datetime.now(timezone.utc) - timedelta(days=1), usegmt=True)
+    assert client.get(f"/menu-items/{menu['blt']}", headers={"If-Modified-Since": earlier}).status_code == 200
+
+
+def test_validators_differ_between_processes(client, menu):
+    etag = client.get("/menu-items/").headers["etag"]
+    versions.clear()  # what a freshly started or forked worker looks like
+    assert client.get("/menu-items/", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_reviews_are_versioned_per_item(client, db_session, menu):
+    blt_rating = client.get(f"/reviews/item/{menu['blt']}/rating").headers["etag"]
+    cubano_reviews = client.get(f"/reviews/item/{menu['cubano']}").headers["etag"]
+
+    db_session.add(Review(customer_id=1, menu_item_id=menu["blt"], rating=4, review_text="Crisp"))
+    db_session.commit()
+
+    rating = client.get(f"/reviews/item/{menu['blt']}/rating", headers={"If-None-Match": blt_rating})
+    assert rating.status_code == 200
+    assert rating.json()["review_count"] == 1
+    assert client.get(f"/reviews/item/{menu['cubano']}",
+                      headers={"If-None-Match": cubano_reviews}).status_code == 304
+
+
+def test_rolled_back_writes_keep_the_validator(db_session, menu):
+    before = versions.validators(versions.MENU).etag
+    db_session.get(Sandwich, menu["blt"]).price = 1.00
+    db_session.flush()
+    db_session.rollback()
+    assert versions.validators(versions.MENU).etag == before
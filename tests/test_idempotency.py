@@ -0,0 +1,186 @@
+import threading
+import time
+
+import pytest
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import event
+
+from api.dependencies.config import conf
+from api.events import order_events
+from api.idempotency import handler as idempotency
+from api.idempotency.store import DatabaseIdempotencyStore, MemoryIdempotencyStore
+from api.metrics import app_metrics
+from api.models.idempotency_key import IdempotencyKey
+from api.models.orders import Order
+from api.models.recipes import Recipe
+from api.models.resources import Resource
+
+from conftest import order_payload, run_concurrently
+
+
+def test_repeated_order_is_replayed_without_touching_orders(client, db_session, test_db, sandwich):
+    headers = {"Idempotency-Key": "order-abc"}
+    first = client.post("/orders/", json=order_payload(sandwich.id), headers=headers)
+    assert first.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_db, "before_cursor_execute", _count)
+    try:
+        second = client.post("/orders/", json=order_payload(sandwich.id), headers=headers)
+    finally:
+        event.remove(test_db, "before_cursor_execute", _count)
+
+    assert second.status_code == 201
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json() == first.json()
+    assert statements == []
+    assert db_session.query(Order).count() == 1
+
+
+def test_key_reused_with_different_body_is_rejected(client, sandwich):
+    headers = {"Idempotency-Key": "order-xyz"}
+    assert client.post("/orders/", json=order_payload(sandwich.id), headers=headers).status_code == 201
+
+    response = client.post("/orders/", json=order_payload(sandwich.id, quantity=3), headers=headers)
+    assert response.status_code == 422
+
+
+def test_guest_order_retry_returns_same_order(client, db_session, sandwich):
+    payload = {"guest_name": "Ivy", "items": [{"menu_item_id": sandwich.id, "quantity": 2}]}
+    headers = {"Idempotency-Key": "guest-1"}
+
+    first = client.post("/guestorders/", json=payload, headers=headers)
+    second = client.post("/guestorders/", json=payload, headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert second.json()["id"] == first.json()["id"]
+    assert db_session.query(Order).count() == 1
+
+
+def test_failed_request_releases_its_key(client, db_session, sandwich):
+    headers = {"Idempotency-Key": "will-fail"}
+    payload = order_payload(9999)
+
+    assert client.post("/orders/", json=payload, headers=headers).status_code == 400
+    retry = client.post("/orders/", json=payload, headers=headers)
+    assert retry.status_code == 400
+    assert "Idempotent-Replayed" not in retry.headers
+
+    # nothing was stored for the key, so a corrected request may reuse it
+    fixed = client.post("/orders/", json=order_payload(sandwich.id), headers=headers)
+    assert fixed.status_code == 201
+    assert db_session.query(Order).count() == 1
+
+
+def test_stored_response_expires(client, db_session, sandwich, monkeypatch):
+    monkeypatch.setattr(conf, "idempotency_ttl", 0.05)
+    headers = {"Idempotency-Key": "short-lived"}
+
+    assert client.post("/orders/", json=order_payload(sandwich.id), headers=headers).status_code == 201
+    time.sleep(0.1)
+    assert client.post("/orders/", json=order_payload(sandwich.id), headers=headers).status_code == 201
+    assert db_session.query(Order).count() == 2
+
+
+def test_database_store_keeps_no_order_without_its_stored_response(client, db_session, sandwich, monkeypatch):
+    monkeypatch.setattr(conf, "http_revalidate_seconds", 0)  # keep the validators still
+    idempotency.set_store(DatabaseIdempotencyStore())
+    headers = {"Idempotency-Key": "lost-response"}
+    bread = Resource(item="Bread", amount=2)  # the order sells the sandwich out
+    db_session.add(bread)
+    db_session.flush()
+    db_session.add(Recipe(sandwich_id=sandwich.id, resource_id=bread.id, amount=2))
+    db_session.commit()
+    etag = client.get(f"/menu-items/{sandwich.id}").headers["etag"]
+
+    def crash(self, db, key, status_code, body, ttl):
+        raise RuntimeError("worker died before the response was stored")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(DatabaseIdempotencyStore, "complete", crash)
+        with pytest.raises(RuntimeError):
+            client.post("/orders/", json=order_payload(sandwich.id), headers=headers)
+    assert db_session.query(Order).count() == 0
+    # nothing that only a committed order may cause has happened
+    assert order_events.hub.recent() == []
+    assert app_metrics.REGISTRY.get_sample_value("orders_created_total") == 0
+    assert client.get(f"/menu-items/{sandwich.id}", headers={"If-None-Match": etag}).status_code == 304
+
+    db_session.query(IdempotencyKey).delete()  # the claim outlived the worker; let it lapse
+    db_session.commit()
+    first = client.post("/orders/", json=order_payload(sandwich.id), headers=headers)
+    second = client.post("/orders/", json=order_payload(sandwich.id), headers=headers)
+    assert first.status_code == second.status_code == 201
+    assert second.json() == first.json()
+    assert db_session.query(Order).count() == 1
+    assert [event.data["id"] for event in order_events.hub.recent()] == [first.json()["id"]]
+    assert app_metrics.REGISTRY.get_sample_value("orders_created_total") == 1
+    sold_out = client.get(f"/menu-items/{sandwich.id}", headers={"If-None-Match": etag})
+    assert sold_out.status_code == 200 and sold_out.json()["max_available"] == 0
+
+
+class _Payload(BaseModel):
+    value: int
+
+
+class _Result(BaseModel):
+    value: int
+    run: int
+
+
+@pytest.mark.parametrize("store_class", [MemoryIdempotencyStore, DatabaseIdempotencyStore])
+def test_concurrent_duplicates_run_once(session_factory, store_class):
+    idempotency.set_store(store_class())
+    clients = 10
+    runs = []
+    lock = threading.Lock()
+
+    def handler(session):
+        with lock:
+            runs.append(1)
+            run = len(runs)
+        time.sleep(0.2)  # long enough for every duplicate to find the claim
+        return _Result(value=7, run=run)
+
+    def send(i):
+        db = session_factory()
+        try:
+            return idempotency.run(db, "same-key", "POST /test", _Payload(value=7), _Result, 201, handler)
+        finally:
+            db.close()
+
+    responses = run_concurrently(clients, send)
+
+    assert len(runs) == 1
+    assert len(responses) == clients
+    assert all(isinstance(r, JSONResponse) and r.status_code == 201 for r in responses)
+    assert {r.body for r in responses} == {b'{"value":7,"run":1}'}
+    replayed = [r for r in responses if r.headers.get("Idempotent-Replayed") == "true"]
+    assert len(replayed) == clients - 1
+
+
+def test_memory_store_is_bounded_and_purges_by_each_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    store = MemoryIdempotencyStore(max_keys=3)
+
+    # a long-lived completed response written before a short claim
+    assert store.claim(None, "done", "f", lock_seconds=60) is None
+    store.complete(None, "done", 201, "{}", ttl=3600)
+    assert store.claim(None, "running", "f", lock_seconds=5) is None
+    now[0] += 10
+    assert store.claim(None, "other", "f", lock_seconds=60) is None
+    assert len(store) == 2  # "running" expired although "done" was written first
+    assert store.claim(None, "done", "f", lock_seconds=60).completed
+
+    for i in range(5):
+        store.claim(None, f"key-{i}", "f", lock_seconds=60)
+    assert len(store) == 3
+    assert store.claim(None, "key-4", "f", lock_seconds=60) is not None  # newest are kept
+    assert store.claim(None, "done", "f", lock_seconds=60) is None  # oldest was evicted
@@ -0,0 +1,127 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from api import ids
+from api.ids import MAX_SEQUENCE, SnowflakeGenerator
+
+
+class _Clock:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __call__(self):
+        return self.seconds
+
+
+def test_ids_increase_and_encode_time_and_worker():
+    clock = _Clock(datetime(2025, 6, 1, 12, 0).timestamp())
+    generator = SnowflakeGenerator(worker_id=17, clock=clock)
+
+    first, second = generator.next_id(), generator.next_id()
+    assert second > first
+
+    decoded = ids.decode(second)
+    assert decoded.worker_id == 17
+    assert decoded.sequence == 1
+    assert decoded.created_at == datetime.utcfromtimestamp(clock.seconds)
+
+
+def test_sequence_overflow_and_clock_step_back_stay_monotonic():
+    clock = _Clock(1_750_000_000.0)
+    generator = SnowflakeGenerator(worker_id=1, clock=clock)
+
+    generated = [generator.next_id() for _ in range(MAX_SEQUENCE + 10)]
+    clock.seconds -= 5  # NTP step backwards
+    generated += [generator.next_id() for _ in range(10)]
+
+    assert generated == sorted(generated)
+    assert len(set(generated)) == len(generated)
+
+
+def test_workers_never_collide():
+    clock = _Clock(1_750_000_000.0)
+    a = SnowflakeGenerator(worker_id=1, clock=clock)
+    b = SnowflakeGenerator(worker_id=2, clock=clock)
+
+    assert {a.next_id() for _ in range(1000)}.isdisjoint(b.next_id() for _ in range(1000))
+
+    with pytest.raises(ValueError):
+        SnowflakeGenerator(worker_id=ids.MAX_WORKER_ID + 1)
+
+
+def test_tracking_numbers_sort_like_ids_and_round_trip():
+    numbers = [ids.tracking_number("TRK") for _ in range(2000)]
+
+    assert numbers == sorted(numbers)
+    assert len(set(numbers)) == len(numbers)
+    assert all(len(n) == len("TRK-") + 13 for n in numbers)
+
+    value = ids.next_id()
+    assert ids.decode_base32(ids.encode_base32(value)) == value
+
+
+def test_threaded_generation_is_unique_and_fast():
+    generator = SnowflakeGenerator(worker_id=5)
+    per_thread = 25_000
+    results = [[] for _ in range(4)]
+
+    def run(out):
+        for _ in range(per_thread):
+            out.append(generator.next_id())
+
+    threads = [threading.Thread(target=run, args=(out,)) for out in results]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    generated = [value for out in results for value in out]
+    assert len(set(generated)) == 4 * per_thread
+    assert all(out == sorted(out) for out in results)
+    # tens of thousands per second per process, with a wide margin for slow CI
+    assert 4 * per_thread / elapsed > 20_000
+
+
+def test_processes_on_one_host_get_distinct_worker_ids(tmp_path, monkeypatch):
+    monkeypatch.setattr(ids.conf, "worker_id_lock_dir", str(tmp_path))
+    monkeypatch.setattr(ids.conf, "worker_id", 3)
+    monkeypatch.setattr(ids.conf, "worker_slots", 4)
+    monkeypatch.setattr(ids, "_slot_file", None)
+
+    # each claim opens its own lock file, like a separate process would
+    held = []
+    for expected in (12, 13, 14, 15):
+        assert ids.default_worker_id() == expected
+        held.append(ids._slot_file)
+    with pytest.raises(RuntimeError):
+        ids.default_worker_id()
+
+    held[1].close()  # that worker exited
+    assert ids.default_worker_id() == 13
+    held[1] = ids._slot_file
+    for f in held:
+        f.close()
+
+    monkeypatch.setattr(ids.conf, "worker_id", 256)
+    with pytest.raises(ValueError):
+        ids.default_worker_id()
+
+
+def test_without_file_locks_a_worker_slot_must_be_configured(tmp_path, monkeypatch):
+    monkeypatch.setattr(ids, "fcntl", None)
+    monkeypatch.setattr(ids.conf, "worker_id", 3)
+    monkeypatch.setattr(ids.conf, "worker_slots", 4)
+    monkeypatch.setattr(ids.conf, "worker_slot", None)
+    with pytest.raises(RuntimeError, match="WORKER_SLOT"):
+        ids.default_worker_id()
+
+    monkeypatch.setattr(ids.conf, "worker_slot", 2)
+    assert ids.default_worker_id() == 14
+    monkeypatch.setattr(ids.conf, "worker_slot", 4)
+    with pytest.raises(ValueError):
+        ids.default_worker_id()
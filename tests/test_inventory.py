@@ -0,0 +1,129 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from api.controllers import guest_orders as guest_orders_controller
+from api.models.orders import Order
+from api.models.recipes import Recipe
+from api.models.resources import Resource
+from api.models.sandwiches import Sandwich
+from api.schemas.guest_orders import GuestOrderCreate
+
+from conftest import run_concurrently
+
+
+@pytest.fixture
+def kitchen(db_session):
+    bread = Resource(item="Bread", amount=10)
+    ham = Resource(item="Ham", amount=3)
+    cheese = Resource(item="Cheese", amount=50)
+    ham_sandwich = Sandwich(name="Ham & Cheese", price=7.00)
+    grilled_cheese = Sandwich(name="Grilled Cheese", price=5.00)
+    db_session.add_all([bread, ham, cheese, ham_sandwich, grilled_cheese])
+    db_session.flush()
+    db_session.add_all([
+        Recipe(sandwich_id=ham_sandwich.id, resource_id=bread.id, amount=2),
+        Recipe(sandwich_id=ham_sandwich.id, resource_id=ham.id, amount=1),
+        Recipe(sandwich_id=ham_sandwich.id, resource_id=cheese.id, amount=1),
+        Recipe(sandwich_id=grilled_cheese.id, resource_id=bread.id, amount=2),
+        Recipe(sandwich_id=grilled_cheese.id, resource_id=cheese.id, amount=2),
+    ])
+    db_session.commit()
+    return {"bread": bread.id, "ham": ham.id, "cheese": cheese.id,
+            "ham_sandwich": ham_sandwich.id, "grilled_cheese": grilled_cheese.id}
+
+
+def _stock(db_session):
+    db_session.expire_all()
+    return {r.item: r.amount for r in db_session.query(Resource)}
+
+
+def _order(items):
+    return {
+        "customer_id": 1,
+        "delivery_address": "7 Pantry Place",
+        "order_items": [{"menu_item_id": i, "quantity": q} for i, q in items],
+    }
+
+
+def test_order_reserves_recipe_demand(client, db_session, kitchen):
+    response = client.post("/orders/", json=_order([
+        (kitchen["ham_sandwich"], 2),
+        (kitchen["grilled_cheese"], 1),
+    ]))
+    assert response.status_code == 201
+    assert _stock(db_session) == {"Bread": 4, "Ham": 1, "Cheese": 46}
+
+
+def test_out_of_stock_names_the_resource_and_keeps_stock(client, db_session, kitchen):
+    response = client.post("/orders/", json=_order([(kitchen["ham_sandwich"], 4)]))
+
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Out of stock: Ham."
+    # bread was reserved before ham ran out and must have been given back
+    assert _stock(db_session) == {"Bread": 10, "Ham": 3, "Cheese": 50}
+    assert db_session.query(Order).count() == 0
+
+
+def test_batch_only_fails_orders_that_run_out(client, db_session, kitchen):
+    response = client.post("/orders/batch", json={"orders": [
+        _order([(kitchen["ham_sandwich"], 2)]),
+        _order([(kitchen["ham_sandwich"], 2)]),  # only one ham left by now
+        _order([(kitchen["grilled_cheese"], 3)]),
+    ]})
+
+    results = response.json()["results"]
+    assert [r["success"] for r in results] == [True, False, True]
+    assert results[1]["error"] == "Out of stock: Ham."
+    assert _stock(db_session) == {"Bread": 0, "Ham": 1, "Cheese": 42}
+
+
+def test_batch_loads_recipes_once(client, test_db, kitchen):
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_db, "before_cursor_execute", _record)
+    try:
+        response = client.post("/orders/batch", json={"orders": [
+            _order([(kitchen["ham_sandwich"], 1)]),
+            _order([(kitchen["grilled_cheese"], 1)]),
+            _order([(kitchen["ham_sandwich"], 1), (kitchen["grilled_cheese"], 1)]),
+        ]})
+    finally:
+        event.remove(test_db, "before_cursor_execute", _record)
+
+    assert response.json()["created"] == 3
+    assert sum("FROM recipes" in statement for statement in statements) == 1
+
+
+def test_guest_order_checks_stock(client, db_session, kitchen):
+    response = client.post("/guestorders/", json={
+        "items": [{"menu_item_id": kitchen["grilled_cheese"], "quantity": 6}],
+    })
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Out of stock: Bread."
+
+
+def test_parallel_orders_never_oversell(session_factory, db_session, kitchen):
+    def place_order(i):
+        request = GuestOrderCreate(
+            guest_name=f"Guest {i}",
+            items=[{"menu_item_id": kitchen["ham_sandwich"], "quantity": 1}],
+        )
+        db = session_factory()
+        try:
+            guest_orders_controller.create(db, request)
+            return "ok"
+        except HTTPException as exc:
+            return exc.detail
+        finally:
+            db.close()
+
+    outcomes = run_concurrently(100, place_order)
+
+    assert outcomes.count("ok") == 3
+    assert all(o in ("ok", "Out of stock: Ham.") for o in outcomes), set(outcomes)
+    assert _stock(db_session) == {"Bread": 4, "Ham": 0, "Cheese": 47}
+    assert db_session.query(Order).count() == 3
@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy import event
+
+from api.cache.availability import AvailabilityMatrix
+from api.models.recipes import Recipe
+from api.models.resources import Resource
+from api.models.sandwiches import Sandwich
+
+
+@pytest.fixture
+def menu(db_session):
+    bread = Resource(item="Bread", amount=10)
+    tuna = Resource(item="Tuna", amount=3)
+    db_session.add_all([bread, tuna])
+    tuna_melt = Sandwich(name="Tuna Melt", price=8.00)
+    toast = Sandwich(name="Toast", price=2.00)
+    soup = Sandwich(name="Soup of the Day", price=4.00)  # no recipe
+    db_session.add_all([tuna_melt, toast, soup])
+    db_session.flush()
+    db_session.add_all([
+        Recipe(sandwich_id=tuna_melt.id, resource_id=bread.id, amount=2),
+        Recipe(sandwich_id=tuna_melt.id, resource_id=tuna.id, amount=1),
+        Recipe(sandwich_id=toast.id, resource_id=bread.id, amount=3),
+    ])
+    db_session.commit()
+    return {"bread": bread, "tuna": tuna, "tuna_melt": tuna_melt, "toast": toast, "soup": soup}
+
+
+def _availability(client, **params):
+    response = client.get("/menu-items/", params=params)
+    assert response.status_code == 200
+    return {item["name"]: item["max_available"] for item in response.json()}
+
+
+def test_menu_reports_max_makeable_units(client, menu):
+    assert _availability(client) == {"Tuna Melt": 3, "Toast": 3, "Soup of the Day": None}
+
+    response = client.get(f"/menu-items/{menu['tuna_melt'].id}")
+    assert response.json()["max_available"] == 3
+
+
+def test_orders_update_availability_and_filter(client, menu):
+    order = {
+        "customer_id": 1,
+        "delivery_address": "1 Harbour Road",
+        "order_items": [{"menu_item_id": menu["tuna_melt"].id, "quantity": 3}],
+    }
+    assert _availability(client)["Tuna Melt"] == 3
+    assert client.post("/orders/", json=order).status_code == 201
+
+    # bread 10 -> 4, tuna 3 -> 0
+    assert _availability(client) == {"Tuna Melt": 0, "Toast": 1, "Soup of the Day": None}
+    assert _availability(client, available_only=True) == {"Toast": 1, "Soup of the Day": None}
+
+
+def test_resource_and_recipe_writes_refresh_only_dirty_rows(client, db_session, test_db, menu):
+    assert _availability(client)["Toast"] == 3
+
+    # Tuna Melt sells out, so the cached listing is rebuilt
+    menu["bread"].amount = 1
+    recipe = db_session.query(Recipe).filter_by(sandwich_id=menu["toast"].id).one()
+    recipe.amount = 1
+    db_session.commit()
+
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_db, "before_cursor_execute", _record)
+    try:
+        counts = _availability(client)
+    finally:
+        event.remove(test_db, "before_cursor_execute", _record)
+
+    assert counts == {"Tuna Melt": 0, "Toast": 1, "Soup of the Day": None}
+    # the menu query plus one IN refresh each for the dirty recipe row and resource
+    assert len(statements) == 3
+    assert sum("FROM recipes" in s for s in statements) == 1
+    assert sum("FROM resources" in s for s in statements) == 1
+
+
+def test_rolled_back_changes_do_not_mark_rows_dirty(client, db_session, menu):
+    assert _availability(client)["Tuna Melt"] == 3
+
+    menu["tuna"].amount = 0
+    db_session.flush()
+    db_session.rollback()
+
+    assert _availability(client)["Tuna Melt"] == 3
+
+
+def test_matrix_recomputes_only_affected_sandwiches():
+    matrix = AvailabilityMatrix()
+    matrix.load([(1, 10, 2), (1, 11, 1), (2, 10, 5)], [(10, 20), (11, 4)])
+    assert (matrix.max_available(1), matrix.max_available(2)) == (4, 4)
+
+    matrix.set_stock(11, 1)
+    assert (matrix.max_available(1), matrix.max_available(2)) == (1, 4)
+
+    matrix.set_recipe(2, {})
+    assert matrix.max_available(2) is None
+
+    matrix.set_stock(10, None)  # resource deleted
+    assert matrix.max_available(1) == 0
+
+
+def test_matrix_reports_only_sell_outs_and_restocks():
+    matrix = AvailabilityMatrix()
+    assert matrix.load([(1, 10, 2)], [(10, 5)]) is False
+    assert matrix.set_stock(10, 3) is False  # 2 -> 1
+    assert matrix.set_stock(10, 1) is True  # sold out
+    assert matrix.set_stock(10, 0) is False
+    assert matrix.set_stock(10, 4) is True  # back
+    assert matrix.set_recipe(1, {}) is False  # no longer limited, still available
+    assert matrix.load([(1, 10, 2)], [(10, 0)]) is True
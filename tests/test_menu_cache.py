@@ -0,0 +1,34 @@
+import pytest
+
+from api.cache import menu as menu_cache
+
+from conftest import order_payload
+
+
+def test_second_order_reads_menu_from_cache(client, sandwich):
+    assert client.post("/orders/", json=order_payload(sandwich.id)).status_code == 201
+    assert client.post("/orders/", json=order_payload(sandwich.id)).status_code == 201
+
+    stats = menu_cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+    assert stats["size"] == 1
+
+
+def test_menu_update_invalidates_cached_price(client, sandwich):
+    first = client.post("/orders/", json=order_payload(sandwich.id))
+    assert first.json()["subtotal"] == pytest.approx(10.00)
+
+    response = client.put(f"/menu-items/{sandwich.id}", json={"price": "12.50"})
+    assert response.status_code == 200
+
+    second = client.post("/orders/", json=order_payload(sandwich.id))
+    assert second.json()["subtotal"] == pytest.approx(12.50)
+
+
+def test_cache_stats_endpoint_requires_staff(client):
+    assert client.get("/menu-items/cache/stats").status_code == 403
+
+    response = client.get("/menu-items/cache/stats", headers={"X-Role": "staff"})
+    assert response.status_code == 200
+    assert set(response.json()) >= {"hits", "misses", "size"}
@@ -0,0 +1,156 @@
+import threading
+import time
+
+import pytest
+
+from api.dependencies.config import conf
+from api.search import menu_index
+from api.search.menu_index import MenuSearchIndex
+
+
+@pytest.fixture
+def menu(client):
+    items = [
+        {"name": "Turkey Club", "price": "9.50", "food_category": "Classics",
+         "ingredients_text": "turkey, bacon, lettuce, tomato"},
+        {"name": "Chicken Pesto Panini", "price": "10.25", "food_category": "Hot",
+         "description": "Grilled chicken with basil pesto"},
+        {"name": "Garden Veggie", "price": "7.00", "food_category": "Vegetarian",
+         "description": "Cucumber, sprouts and a hint of turkey-free hummus", "is_vegetarian": True},
+        {"name": "Retired Reuben", "price": "8.00", "is_active": False,
+         "ingredients_text": "corned beef, sauerkraut"},
+    ]
+    created = []
+    for item in items:
+        response = client.post("/menu-items/", json=item)
+        assert response.status_code == 201
+        created.append(response.json())
+    return {item["name"]: item for item in created}
+
+
+def _search(client, text, **params):
+    response = client.get("/menu-items/", params={"search": text, **params})
+    assert response.status_code == 200
+    return [item["name"] for item in response.json()]
+
+
+def test_search_covers_description_ingredients_and_category(client, menu):
+    assert _search(client, "pesto") == ["Chicken Pesto Panini"]
+    assert _search(client, "bacon") == ["Turkey Club"]
+    assert _search(client, "vegetarian") == ["Garden Veggie"]
+
+
+def test_search_ranks_name_matches_first(client, menu):
+    # "turkey" is in the Turkey Club name and only in the Garden Veggie description
+    assert _search(client, "turkey") == ["Turkey Club", "Garden Veggie"]
+
+
+def test_prefix_and_typo_tolerant_matching(client, menu):
+    assert _search(client, "pan") == ["Chicken Pesto Panini"]
+    assert _search(client, "chiken") == ["Chicken Pesto Panini"]
+    assert _search(client, "turky club") == ["Turkey Club"]
+
+
+def test_search_keeps_sql_filters(client, menu):
+    assert _search(client, "sauerkraut") == []
+    assert _search(client, "sauerkraut", include_inactive=True) == ["Retired Reuben"]
+    assert _search(client, "turkey", is_vegetarian=True) == ["Garden Veggie"]
+
+
+def test_search_filters_before_cutting_to_max_results(client, menu, monkeypatch):
+    # Turkey Club outranks Garden Veggie, but is filtered out
+    monkeypatch.setattr(conf, "menu_search_max_results", 1)
+    assert _search(client, "turkey") == ["Turkey Club"]
+    assert _search(client, "turkey", is_vegetarian=True) == ["Garden Veggie"]
+
+
+class _Rows:
+    info = {}
+
+    def query(self, *columns):
+        return self
+
+    def yield_per(self, count):
+        return []
+
+
+def test_concurrent_searches_rebuild_the_index_once(monkeypatch):
+    loads = []
+    build = MenuSearchIndex.build
+
+    def slow_build(cls, rows):
+        loads.append(threading.get_ident())
+        time.sleep(0.05)
+        return build(rows)
+
+    monkeypatch.setattr(MenuSearchIndex, "build", classmethod(slow_build))
+    threads = [threading.Thread(target=menu_index.search, args=(_Rows(), "club")) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+
+    # once stale, one request rebuilds while the others use the old index
+    menu_index._index.loaded_at = time.monotonic() - conf.menu_search_rebuild_seconds - 1
+    threads = [threading.Thread(target=menu_index.search, args=(_Rows(), "club")) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 2
+
+
+def test_search_during_a_rebuild_uses_the_old_index(monkeypatch):
+    menu_index._index = MenuSearchIndex.build([(1, "Turkey Club", None, None, None)])
+    menu_index._index.loaded_at = time.monotonic() - conf.menu_search_rebuild_seconds - 1
+    building, release = threading.Event(), threading.Event()
+    build = MenuSearchIndex.build
+
+    def slow_build(cls, rows):
+        building.set()
+        release.wait(5)
+        return build([(1, "Turkey Club", None, None, None), (2, "Club Royale", None, None, None)])
+
+    monkeypatch.setattr(MenuSearchIndex, "build", classmethod(slow_build))
+    rebuild = threading.Thread(target=menu_index.search, args=(_Rows(), "club"))
+    rebuild.start()
+    assert building.wait(5)
+    try:
+        started = time.monotonic()
+        assert menu_index.search(_Rows(), "club") == [1]
+        assert time.monotonic() - started < 0.5
+        # a write made during the rebuild survives the swap
+        menu_index.remove_item(1)
+        assert menu_index.search(_Rows(), "club") == []
+    finally:
+        release.set()
+        rebuild.join()
+    assert menu_index.search(_Rows(), "club") == [2]
+
+
+def test_index_follows_menu_writes(client, menu):
+    club = menu["Turkey Club"]
+    assert _search(client, "turkey")  # loads the index
+
+    response = client.put(f"/menu-items/{club['id']}", json={"name": "Ham Club", "ingredients_text": "ham"})
+    assert response.status_code == 200
+    assert _search(client, "club") == ["Ham Club"]
+    assert _search(client, "bacon") == []
+
+    assert client.delete(f"/menu-items/{club['id']}").status_code == 204
+    assert _search(client, "club") == []
+
+    client.post("/menu-items/", json={"name": "Tuna Melt", "price": "8.25"})
+    assert _search(client, "tuna") == ["Tuna Melt"]
+
+
+def test_index_removal_drops_unused_terms():
+    index = MenuSearchIndex()
+    index.add(1, {"name": "Meatball Marinara"})
+    index.add(2, {"name": "Meatball Sub"})
+    index.remove(1)
+
+    assert index.search("marinara") == []
+    assert index.search("meatball") == [2]
+    assert "marinara" not in index._postings
@@ -0,0 +1,93 @@
+import os
+import subprocess
+import sys
+import textwrap
+from datetime import datetime, timedelta
+
+import pytest
+
+from api.models.promotion import Promotion
+
+from conftest import BASE_DIR, order_payload
+
+
+def _samples(text):
+    """{'name{labels}': value} of an exposition, comments left out."""
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines() if line and not line.startswith("#")
+    }
+
+
+@pytest.fixture
+def promotion(db_session):
+    now = datetime.utcnow()
+    db_session.add(Promotion(
+        code="METRIC10", discount_type="percentage", discount_value=10, usage_count=0, is_active=1,
+        start_date=now - timedelta(days=1), expiration_date=now + timedelta(days=1),
+    ))
+    db_session.commit()
+
+
+def test_http_metrics_use_route_templates(client):
+    assert client.get("/orders/424242").status_code == 404
+    assert client.get("/orders/434343").status_code == 404
+    assert client.post("/orders/", json={"customer_id": "x"}).status_code == 422
+    assert client.get("/orders/", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/no/such/path").status_code == 404
+
+    body = client.get("/metrics")
+    assert body.headers["content-type"].startswith("text/plain; version=")
+    samples = _samples(body.text)
+
+    assert samples['http_request_duration_seconds_count{method="GET",route="/orders/{order_id}",status="404"}'] == 2
+    assert samples['http_request_duration_seconds_count{method="GET",route="<unmatched>",status="404"}'] == 1
+    assert samples['validation_failures_total{method="POST",route="/orders/",status="422"}'] == 1
+    assert samples['validation_failures_total{method="GET",route="/orders/",status="400"}'] == 1
+    assert not any("424242" in name for name in samples)
+    # the scrape itself is the only request still in flight
+    assert samples['http_requests_in_flight{method="GET"}'] == 1
+    assert samples['http_requests_in_flight{method="POST"}'] == 0
+
+
+def test_order_counters(client, sandwich, promotion):
+    assert client.post("/orders/", json=order_payload(sandwich.id)).status_code == 201
+    assert client.post("/orders/", json=order_payload(sandwich.id, promotion_code="METRIC10")).status_code == 201
+    assert client.post("/guestorders/", json={
+        "guest_name": "Walk-in", "items": [{"menu_item_id": sandwich.id, "quantity": 1}], "promo_code": "METRIC10",
+    }).status_code == 201
+
+    samples = _samples(client.get("/metrics").text)
+    assert samples["orders_created_total"] == 2
+    assert samples["guest_orders_created_total"] == 1
+    assert samples["promo_redemptions_total"] == 2
+
+
+def test_workers_are_summed_through_the_multiprocess_directory(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+
+    def run(code, *args):
+        result = subprocess.run([sys.executable, "-c", textwrap.dedent(code), *args], cwd=BASE_DIR, env=env,
+                                capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr
+        return result.stdout
+
+    worker = """
+        import sys
+        from api.metrics import app_metrics
+
+        app_metrics.ORDERS_CREATED.inc(int(sys.argv[1]))
+        app_metrics.HTTP_REQUESTS_IN_FLIGHT.labels("POST").inc()
+        if sys.argv[2] == "shutdown":
+            app_metrics.mark_process_dead()
+    """
+    run(worker, "5", "shutdown")  # exited: its counters stay, its gauges go
+    run(worker, "2", "running")  # stands in for a live worker
+
+    samples = _samples(run("""
+        from api.metrics import app_metrics
+
+        print(app_metrics.exposition()[0].decode())
+    """))
+    assert samples["orders_created_total"] == 7
+    assert samples['http_requests_in_flight{method="POST"}'] == 1
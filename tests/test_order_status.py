@@ -0,0 +1,148 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, insert, text
+
+from api.controllers import orders as orders_controller
+from api.events import order_events
+from api.models.orders import Order
+from api.schemas.orders import OrderStatusBulkUpdate
+
+STAFF = {"X-Role": "staff"}
+
+
+@pytest.fixture
+def orders(db_session):
+    statuses = ["PLACED", "PENDING", "PREPARING", "READY", "DELIVERED"]
+    db_session.execute(insert(Order), [
+        {
+            "customer_id": 1,
+            "tracking_number": f"TRK-STATUS-{i}",
+            "order_status": status,
+            "subtotal": 10.0,
+            "tax_amount": 0.7,
+            "total_price": 10.7,
+            "order_date": datetime(2025, 3, 1, 12, i),
+        }
+        for i, status in enumerate(statuses)
+    ])
+    db_session.commit()
+    return {status: order_id for order_id, status in db_session.query(Order.id, Order.order_status)}
+
+
+def _patch(client, order_ids, status, **extra):
+    return client.patch("/orders/staff/status", headers=STAFF,
+                        json={"order_ids": order_ids, "order_status": status, **extra})
+
+
+def test_transition_reports_each_order(client, db_session, orders):
+    response = _patch(client, [orders["PLACED"], orders["PENDING"], orders["READY"], 999, orders["PLACED"]],
+                      "PREPARING")
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["updated"], body["failed"]) == (2, 2)
+
+    results = {result["order_id"]: result for result in body["results"]}
+    assert list(results) == [orders["PLACED"], orders["PENDING"], orders["READY"], 999]
+    assert results[orders["PLACED"]] == {
+        "order_id": orders["PLACED"], "success": True, "previous_status": "PLACED",
+        "order_status": "PREPARING", "error": None,
+    }
+    assert results[orders["PENDING"]]["success"] is True
+    assert results[orders["READY"]]["error"] == "Cannot move order from READY to PREPARING."
+    assert results[orders["READY"]]["order_status"] == "READY"
+    assert results[999]["error"] == "Order not found."
+
+    db_session.expire_all()
+    placed = db_session.get(Order, orders["PLACED"])
+    assert placed.order_status == "PREPARING"
+    assert placed.updated_at is not None
+    assert placed.actual_delivery_time is None
+    assert db_session.get(Order, orders["READY"]).updated_at is None
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_orders_changed_after_the_read_are_not_reported_moved(db_session, test_db, orders, monkeypatch, returning):
+    monkeypatch.setattr(test_db.dialect, "update_returning", returning)
+    changed = []
+
+    def change_first(state):
+        # someone else cancels an order between the unlocked read and the UPDATE
+        if state.is_update and not changed:
+            changed.append(orders["PLACED"])
+            state.session.execute(text("UPDATE orders SET order_status = 'CANCELLED' WHERE id = :id"),
+                                  {"id": orders["PLACED"]})
+
+    event.listen(db_session, "do_orm_execute", change_first)
+    update_in = OrderStatusBulkUpdate(order_ids=[orders["PLACED"], orders["PENDING"]], order_status="PREPARING")
+    body = orders_controller.update_order_statuses(db_session, update_in)
+
+    assert (body.updated, body.failed) == (1, 1)
+    placed, pending = body.results
+    assert (placed.success, placed.previous_status) == (False, "PLACED")
+    assert placed.error == "Order status changed while updating; reload it and retry."
+    assert pending.success is True
+    db_session.expire_all()
+    assert db_session.get(Order, orders["PLACED"]).order_status == "CANCELLED"
+
+
+def test_delivering_stamps_delivery_time(client, db_session, orders):
+    body = _patch(client, [orders["READY"], orders["DELIVERED"]], "DELIVERED").json()
+    assert body["results"][1]["error"] == "Order is already DELIVERED."
+
+    db_session.expire_all()
+    delivered = db_session.get(Order, orders["READY"])
+    assert delivered.order_status == "DELIVERED"
+    assert delivered.actual_delivery_time == delivered.updated_at
+
+    promised = datetime(2025, 3, 1, 13, 0)
+    _patch(client, [orders["PREPARING"]], "READY")
+    _patch(client, [orders["PREPARING"]], "DELIVERED", actual_delivery_time=promised.isoformat())
+    db_session.expire_all()
+    assert db_session.get(Order, orders["PREPARING"]).actual_delivery_time == promised
+
+
+def test_many_orders_move_with_one_update(client, db_session, test_db):
+    db_session.execute(insert(Order), [
+        {"customer_id": 1, "tracking_number": f"TRK-BULK-{i}", "order_status": "READY",
+         "subtotal": 5.0, "tax_amount": 0.35, "total_price": 5.35, "order_date": datetime(2025, 3, 2)}
+        for i in range(50)
+    ])
+    db_session.commit()
+    order_ids = [order_id for (order_id,) in db_session.query(Order.id)]
+
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    event.listen(test_db, "before_cursor_execute", _record)
+    try:
+        body = _patch(client, order_ids, "DELIVERED").json()
+    finally:
+        event.remove(test_db, "before_cursor_execute", _record)
+
+    assert body["updated"] == 50
+    assert statements == ["SELECT", "UPDATE"]
+
+
+def test_status_changes_are_published(client, orders):
+    _patch(client, [orders["PREPARING"], orders["PLACED"]], "READY")
+
+    (event_,) = order_events.hub.recent()
+    assert event_.type == order_events.ORDER_STATUS_CHANGED
+    assert event_.data["id"] == orders["PREPARING"]
+    assert event_.data["previous_status"] == "PREPARING"
+    assert event_.data["order_status"] == "READY"
+    assert event_.data["updated_at"] is not None
+
+
+def test_rejects_invalid_requests(client, orders):
+    assert _patch(client, [orders["READY"]], "PLACED").status_code == 400
+    assert _patch(client, [orders["READY"]], "COOKING").status_code == 422
+    assert _patch(client, [], "READY").status_code == 422
+    response = _patch(client, [orders["PREPARING"]], "READY", actual_delivery_time="2025-03-01T13:00:00")
+    assert response.status_code == 400
+
+    response = client.patch("/orders/staff/status", json={"order_ids": [orders["READY"]], "order_status": "DELIVERED"})
+    assert response.status_code == 403
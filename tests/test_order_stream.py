@@ -0,0 +1,185 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from api.controllers import guest_orders as guest_orders_controller
+from api import ids
+from api.events import order_events
+from api.events.hub import RESYNC, Event, EventHub
+from api.models.orders import Order
+from api.schemas.guest_orders import GuestOrderCreate
+
+from conftest import order_payload
+
+STAFF = {"X-Role": "staff"}
+
+
+def _parse(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines() if not line.startswith(":"))
+    if "data" in fields:
+        fields["data"] = json.loads(fields["data"])
+    return fields
+
+
+async def _read(last_event_id, count, catch_up=None, publish=None):
+    """Open a stream, optionally publish once subscribed, and collect `count` events."""
+    async def no_catch_up(event_id):
+        raise AssertionError("catch-up query not expected")
+
+    body = order_events.stream(last_event_id, catch_up or no_catch_up)
+    events = []
+    try:
+        assert (await body.__anext__()).startswith("retry: ")
+        if publish:
+            thread = threading.Thread(target=publish)
+            thread.start()
+            thread.join()
+        while len(events) < count:
+            chunk = await asyncio.wait_for(body.__anext__(), 5)
+            if not chunk.startswith(":"):
+                events.append(_parse(chunk))
+    finally:
+        await body.aclose()
+    return events
+
+
+def test_created_orders_are_published(client, sandwich):
+    order = client.post("/orders/", json=order_payload(sandwich.id, quantity=2)).json()
+
+    (event,) = order_events.hub.recent()
+    assert event.type == order_events.ORDER_CREATED
+    assert event.data["id"] == order["id"]
+    assert event.data["order_items"][0]["quantity"] == 2
+
+
+def test_guest_and_batch_orders_are_published(client, db_session, sandwich):
+    guest = guest_orders_controller.create(db_session, GuestOrderCreate(
+        guest_name="Table 4", items=[{"menu_item_id": sandwich.id, "quantity": 1}],
+    ))
+    batch = client.post("/orders/batch", json={"orders": [
+        {"customer_id": 1, "delivery_address": "2 Batch Road", "order_items": [{"menu_item_id": sandwich.id, "quantity": 1}]},
+        {"customer_id": 2, "delivery_address": "3 Batch Road", "order_items": [{"menu_item_id": 999, "quantity": 1}]},
+    ]}).json()
+
+    published = [event.data["id"] for event in order_events.hub.recent()]
+    assert published == [guest.id, batch["results"][0]["order"]["id"]]
+
+
+def test_stream_delivers_only_new_events(client, sandwich):
+    client.post("/orders/", json=order_payload(sandwich.id))  # before the screen connects
+
+    events = asyncio.run(_read(None, 1, publish=lambda: client.post("/orders/", json=order_payload(sandwich.id, quantity=3))))
+
+    assert events[0]["event"] == order_events.ORDER_CREATED
+    assert events[0]["data"]["order_items"][0]["quantity"] == 3
+    assert order_events.hub.subscriber_count() == 0
+
+
+def test_reconnect_resumes_after_last_event_id(client, sandwich):
+    for _ in range(3):
+        client.post("/orders/", json=order_payload(sandwich.id))
+    first, second, third = order_events.hub.recent()
+
+    events = asyncio.run(_read(first.id, 2))
+
+    assert [int(event["id"]) for event in events] == [second.id, third.id]
+
+
+def test_reconnect_past_the_buffer_catches_up_from_the_database(client, db_session, sandwich, monkeypatch):
+    monkeypatch.setattr(order_events, "hub", EventHub(buffer_size=2))
+    last_seen = ids.next_id()  # a screen that disconnected before these orders
+    orders = [client.post("/orders/", json=order_payload(sandwich.id)).json() for _ in range(4)]
+
+    async def catch_up(event_id):
+        return order_events.catch_up(db_session, event_id)
+
+    assert order_events.hub.since(last_seen) is None
+    events = asyncio.run(_read(last_seen, 4, catch_up=catch_up))
+
+    # at-least-once: every order comes back, oldest first, with resumable ids
+    assert [event["data"]["id"] for event in events] == [order["id"] for order in orders]
+    event_ids = [int(event["id"]) for event in events]
+    assert event_ids == sorted(event_ids) and event_ids[0] > last_seen
+
+
+def test_resume_against_a_fresh_hub_catches_up_from_the_database(client, db_session, sandwich, monkeypatch):
+    last_seen = ids.next_id()  # a screen connected to a worker that has since restarted
+    order = client.post("/orders/", json=order_payload(sandwich.id)).json()
+    monkeypatch.setattr(order_events, "hub", EventHub())
+
+    async def catch_up(event_id):
+        return order_events.catch_up(db_session, event_id)
+
+    assert order_events.hub.since(last_seen) is None
+    events = asyncio.run(_read(last_seen, 1, catch_up=catch_up))
+
+    assert events[0]["data"]["id"] == order["id"]
+    assert int(events[0]["id"]) > last_seen
+
+
+def test_catch_up_beyond_its_limit_tells_the_screen_to_resync(client, db_session, sandwich, monkeypatch):
+    monkeypatch.setattr(order_events, "hub", EventHub(buffer_size=1))
+    monkeypatch.setattr(order_events.conf, "order_stream_catch_up_limit", 2)
+    last_seen = ids.next_id()
+    for _ in range(3):
+        client.post("/orders/", json=order_payload(sandwich.id))
+
+    async def catch_up(event_id):
+        return order_events.catch_up(db_session, event_id)
+
+    assert order_events.catch_up(db_session, last_seen) is None
+    placed = []
+
+    def publish():
+        placed.append(client.post("/orders/", json=order_payload(sandwich.id)).json()["id"])
+
+    resync, live = asyncio.run(_read(last_seen, 2, catch_up=catch_up, publish=publish))
+
+    # no partial replay: the screen reloads, then the stream carries on
+    assert resync["event"] == order_events.ORDER_RESYNC and resync["data"] == {}
+    assert live["event"] == order_events.ORDER_CREATED and live["data"]["id"] == placed[0]
+    # reconnecting with the resync's id resumes from the buffer, not another catch-up
+    assert int(resync["id"]) > last_seen and order_events.hub.since(int(resync["id"])) is not None
+
+
+def test_catch_up_reports_status_changes(db_session, sandwich, client):
+    order = client.post("/orders/", json=order_payload(sandwich.id)).json()
+    event_id = order_events.hub.recent()[0].id
+    row = db_session.get(Order, order["id"])
+    row.order_status = "PREPARING"
+    row.updated_at = row.order_date.replace(year=row.order_date.year + 1)
+    db_session.commit()
+
+    events = order_events.catch_up(db_session, event_id)
+
+    assert [(event.type, event.data["id"]) for event in events] == [
+        (order_events.ORDER_CREATED, order["id"]),
+        (order_events.ORDER_STATUS_CHANGED, order["id"]),
+    ]
+    assert events[1].data["order_status"] == "PREPARING"
+
+
+def test_slow_subscriber_is_told_to_resync():
+    hub = EventHub(queue_size=2)
+
+    async def scenario():
+        subscription = hub.subscribe()
+        for event_id in range(1, 5):
+            hub.publish(Event(event_id, "test"))
+        await asyncio.sleep(0)
+        received = [await subscription.get(timeout=1) for _ in range(4)]
+        subscription.close()
+        return received
+
+    first, second, resync, nothing = asyncio.run(scenario())
+    assert (first.id, second.id) == (1, 2)
+    assert resync is RESYNC
+    assert nothing is None
+
+
+def test_stream_requires_staff_and_a_valid_last_event_id(client):
+    assert client.get("/orders/staff/stream").status_code == 403
+    response = client.get("/orders/staff/stream", headers={**STAFF, "Last-Event-ID": "yesterday"})
+    assert response.status_code == 400
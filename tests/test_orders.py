@@ -0,0 +1,140 @@
+import pytest
+from sqlalchemy import event
+
+from api.models.orders import Order
+from api.models.order_details import OrderDetail
+from api.models.sandwiches import Sandwich
+
+
+@pytest.fixture
+def sandwiches(db_session):
+    items = [
+        Sandwich(name="Turkey Club", price=9.50),
+        Sandwich(name="Veggie Delight", price=6.25),
+    ]
+    db_session.add_all(items)
+    db_session.commit()
+    for item in items:
+        db_session.refresh(item)
+    return items
+
+
+def _order_payload(customer_id, items):
+    return {
+        "customer_id": customer_id,
+        "delivery_address": "123 Main Street",
+        "order_items": items,
+    }
+
+
+def test_create_orders_batch_success(client, db_session, sandwiches):
+    turkey, veggie = sandwiches
+    payload = {
+        "orders": [
+            _order_payload(1, [{"menu_item_id": turkey.id, "quantity": 2}]),
+            _order_payload(2, [
+                {"menu_item_id": turkey.id, "quantity": 1},
+                {"menu_item_id": veggie.id, "quantity": 3},
+            ]),
+        ]
+    }
+
+    response = client.post("/orders/batch", json=payload)
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["created"] == 2
+    assert data["failed"] == 0
+    assert [r["index"] for r in data["results"]] == [0, 1]
+
+    second = data["results"][1]["order"]
+    assert second["customer_id"] == 2
+    assert second["subtotal"] == pytest.approx(9.50 + 3 * 6.25)
+    assert second["tracking_number"] != data["results"][0]["order"]["tracking_number"]
+
+    assert db_session.query(Order).count() == 2
+    assert db_session.query(OrderDetail).count() == 3
+
+
+def test_create_orders_batch_reports_per_order_errors(client, db_session, sandwiches):
+    turkey, _ = sandwiches
+    payload = {
+        "orders": [
+            _order_payload(1, [{"menu_item_id": turkey.id, "quantity": 1}]),
+            _order_payload(2, [{"menu_item_id": 9999, "quantity": 1}]),
+            _order_payload(3, []),
+            {"customer_id": 4, "order_items": []},
+        ]
+    }
+
+    response = client.post("/orders/batch", json=payload)
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["created"] == 1
+    assert data["failed"] == 3
+
+    results = data["results"]
+    assert results[0]["success"] is True
+    assert results[1]["success"] is False
+    assert "Menu items not found" in results[1]["error"]
+    assert results[2]["error"] == "Order must contain at least one item."
+    assert "delivery_address" in results[3]["error"]
+
+    assert db_session.query(Order).count() == 1
+
+
+def test_get_order_returns_line_items(client, sandwiches):
+    turkey, veggie = sandwiches
+    created = client.post("/orders/", json=_order_payload(1, [
+        {"menu_item_id": turkey.id, "quantity": 2, "special_requests": "No mayo"},
+        {"menu_item_id": veggie.id, "quantity": 1},
+    ]))
+    assert created.status_code == 201
+    assert len(created.json()["order_items"]) == 2
+
+    response = client.get(f"/orders/{created.json()['id']}")
+    assert response.status_code == 200
+
+    items = sorted(response.json()["order_items"], key=lambda i: i["menu_item_id"])
+    assert [i["menu_item_id"] for i in items] == [turkey.id, veggie.id]
+    assert items[0]["quantity"] == 2
+    assert items[0]["unit_price"] == pytest.approx(9.50)
+    assert items[0]["subtotal"] == pytest.approx(19.00)
+    assert items[0]["special_requests"] == "No mayo"
+
+
+@pytest.fixture
+def statement_counter(test_db):
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_db, "before_cursor_execute", _count)
+    yield statements
+    event.remove(test_db, "before_cursor_execute", _count)
+
+
+def test_staff_order_list_statement_count_is_constant(client, sandwiches, statement_counter):
+    turkey, veggie = sandwiches
+    payload = {"orders": [
+        _order_payload(i, [
+            {"menu_item_id": turkey.id, "quantity": 1},
+            {"menu_item_id": veggie.id, "quantity": 2},
+        ])
+        for i in range(60)
+    ]}
+    assert client.post("/orders/batch", json=payload).json()["created"] == 60
+
+    counts = {}
+    for limit in (5, 60):
+        statement_counter.clear()
+        response = client.get("/orders/staff", params={"limit": limit}, headers={"X-Role": "staff"})
+        assert response.status_code == 200
+        assert len(response.json()) == limit
+        assert all(len(order["order_items"]) == 2 for order in response.json())
+        counts[limit] = len(statement_counter)
+
+    # one SELECT for the page of orders and one for all of their line items
+    assert counts[5] == counts[60] == 2
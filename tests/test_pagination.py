@@ -0,0 +1,156 @@
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+
+from api.controllers import orders as orders_controller
+from api.dependencies.pagination import encode_cursor, keyset_page
+from api.models.orders import Order
+from api.models.review import Review
+
+
+def _seed_orders(db_session, count, start=datetime(2025, 1, 1), same_time_every=1):
+    rows = [
+        {
+            "customer_id": 1,
+            "delivery_address": "1 Pagination Road",
+            "tracking_number": f"TRK-SEED-{i}",
+            "order_status": "PLACED",
+            "subtotal": 10.0,
+            "tax_amount": 0.7,
+            "discount_amount": 0.0,
+            "total_price": 10.7,
+            # several orders share a timestamp so the id tie-breaker matters
+            "order_date": start + timedelta(seconds=i // same_time_every),
+        }
+        for i in range(count)
+    ]
+    db_session.execute(insert(Order), rows)
+    db_session.commit()
+
+
+def _walk(client, url, limit, headers=None):
+    seen = []
+    cursor = ""  # an empty cursor starts the walk at the newest row
+    while True:
+        response = client.get(url, params={"limit": limit, "cursor": cursor}, headers=headers)
+        assert response.status_code == 200
+        seen.extend(item["id"] for item in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return seen
+
+
+def test_orders_cursor_walk_returns_every_row_once(client, db_session):
+    _seed_orders(db_session, 250, same_time_every=7)
+
+    ids = _walk(client, "/orders/", limit=40)
+
+    assert len(ids) == 250
+    assert len(set(ids)) == 250
+    # newest first; within one timestamp the higher id comes first
+    assert ids == sorted(ids, reverse=True)
+
+
+def test_staff_orders_cursor_requires_staff_and_walks(client, db_session):
+    _seed_orders(db_session, 30)
+
+    ids = _walk(client, "/orders/staff", limit=8, headers={"X-Role": "staff"})
+    assert len(ids) == 30
+
+
+def test_reviews_for_item_cursor_walk(client, db_session):
+    created = datetime(2025, 3, 1)
+    db_session.add_all(
+        Review(
+            customer_id=1,
+            menu_item_id=1 + i % 2,
+            rating=4,
+            created_at=created + timedelta(minutes=i // 3),
+        )
+        for i in range(60)
+    )
+    db_session.commit()
+
+    ids = _walk(client, "/reviews/item/1", limit=7)
+    assert len(ids) == 30
+    assert len(set(ids)) == 30
+
+
+def test_offset_mode_keeps_the_listing_order(client, db_session):
+    _seed_orders(db_session, 10, same_time_every=10)
+
+    first = client.get("/orders/", params={"limit": 5})
+    second = client.get("/orders/", params={"limit": 5, "skip": 5})
+    # orders keep their primary key order without a cursor, and get no next cursor
+    assert [o["id"] for o in first.json() + second.json()] == list(range(1, 11))
+    assert "X-Next-Cursor" not in first.headers
+
+
+def test_offset_mode_lists_reviews_newest_first(client, db_session):
+    created = datetime(2025, 3, 1)
+    db_session.add_all(
+        Review(customer_id=1, menu_item_id=1, rating=4, created_at=created - timedelta(minutes=i))
+        for i in range(5)
+    )
+    db_session.commit()
+
+    assert [r["id"] for r in client.get("/reviews/item/1").json()] == [1, 2, 3, 4, 5]
+
+
+def test_invalid_cursor_and_skip_with_cursor_are_rejected(client, db_session):
+    assert client.get("/orders/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+    cursor = encode_cursor(datetime(2025, 1, 1), 10)
+    response = client.get("/orders/", params={"cursor": cursor, "skip": 5})
+    assert response.status_code == 400
+
+
+def test_deep_cursor_page_is_a_keyset_range_scan(db_session, test_db):
+    _seed_orders(db_session, 50)
+    cursor = encode_cursor(datetime(2025, 1, 1) + timedelta(seconds=9), 10)
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(test_db, "before_cursor_execute", _record)
+    try:
+        page = orders_controller.list_orders(db_session, limit=5, cursor=cursor)
+    finally:
+        event.remove(test_db, "before_cursor_execute", _record)
+
+    assert [order.id for order in page] == [9, 8, 7, 6, 5]
+    statement, parameters = statements[0]
+    # SQLite always renders LIMIT ? OFFSET ?; nothing is skipped
+    assert statement.endswith("LIMIT ? OFFSET ?") and tuple(parameters[-2:]) == (5, 0)
+    assert "orders.order_date <= ?" in statement
+    assert "ORDER BY orders.order_date DESC, orders.id DESC" in statement
+
+    # a range search on the keyset index, not a scan from the top
+    plan = db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    details = " ".join(row[-1] for row in plan)
+    assert details.startswith("SEARCH") and "USING INDEX ix_orders_order_date_id (order_date<?)" in details
+
+
+def _best_of(fn, repeat=7):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def test_deep_cursor_page_is_as_fast_as_the_first(db_session):
+    count = 30_000
+    _seed_orders(db_session, count)
+    # 200 rows from the oldest order; scanning the index down to it costs
+    # well over ten times the first page at this size
+    cursor = encode_cursor(datetime(2025, 1, 1) + timedelta(seconds=199), 200)
+    ids = db_session.query(Order.id)
+
+    first = _best_of(lambda: keyset_page(ids, orders_controller.ORDER_KEYSET, limit=50, cursor="").all())
+    deep = _best_of(lambda: keyset_page(ids, orders_controller.ORDER_KEYSET, limit=50, cursor=cursor).all())
+
+    assert deep < first * 3 + 0.001
@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from api.dependencies import pool_stats
+
+
+@pytest.fixture
+def small_pool_engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=pool_stats.InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.2,
+        connect_args={"check_same_thread": False},
+    )
+    pool_stats.instrument("test-small-pool", engine)
+    yield engine
+    engine.dispose()
+
+
+def test_pool_stats_count_checkouts_and_waits(small_pool_engine):
+    holder = small_pool_engine.connect()
+    holder.execute(text("SELECT 1"))
+
+    status = pool_stats.pool_status("test-small-pool")
+    assert status["checked_out"] == 1
+    assert status["connects"] == 1
+    assert status["waits"] == 0
+
+    def release_later():
+        time.sleep(0.1)
+        holder.close()
+
+    releaser = threading.Thread(target=release_later)
+    releaser.start()
+    with small_pool_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    releaser.join()
+
+    status = pool_stats.pool_status("test-small-pool")
+    assert status["checkouts"] == 2
+    assert status["checkins"] == 2
+    assert status["waits"] == 1
+    assert status["wait_seconds_max"] >= 0.05
+    assert status["checked_out"] == 0
+
+
+def test_pool_stats_count_timeouts(small_pool_engine):
+    holder = small_pool_engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        small_pool_engine.connect()
+    holder.close()
+
+    status = pool_stats.pool_status("test-small-pool")
+    assert status["timeouts"] == 1
+    assert status["waits"] == 1
+
+
+def test_db_pool_endpoint_is_staff_only(client):
+    assert client.get("/diagnostics/db-pool").status_code == 403
+
+    response = client.get("/diagnostics/db-pool", headers={"X-Role": "admin"})
+    assert response.status_code == 200
+    primary = response.json()["primary"]
+    assert {"pool_size", "checked_out", "overflow", "waits", "wait_seconds_total"} <= set(primary)
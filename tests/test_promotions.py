@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from api.controllers import guest_orders as guest_orders_controller
+from api.models.orders import Order
+from api.models.promotion import Promotion
+from api.schemas.guest_orders import GuestOrderCreate
+
+from conftest import order_payload, run_concurrently
+
+
+def _add_promotion(db_session, code, usage_limit=None, **overrides):
+    now = datetime.utcnow()
+    values = dict(
+        code=code,
+        discount_type="percentage",
+        discount_value=10,
+        usage_limit=usage_limit,
+        usage_count=0,
+        is_active=1,
+        start_date=now - timedelta(days=1),
+        expiration_date=now + timedelta(days=1),
+    )
+    values.update(overrides)
+    promo = Promotion(**values)
+    db_session.add(promo)
+    db_session.commit()
+    return promo
+
+
+def test_order_with_promotion_applies_discount_and_counts_use(client, db_session, sandwich):
+    _add_promotion(db_session, "TENOFF")
+
+    response = client.post("/orders/", json=order_payload(sandwich.id, promotion_code="TENOFF"))
+    assert response.status_code == 201
+    assert response.json()["discount_amount"] == pytest.approx(1.00)
+
+    db_session.expire_all()
+    promo = db_session.query(Promotion).filter_by(code="TENOFF").one()
+    assert promo.usage_count == 1
+
+
+def test_exhausted_promotion_rejects_order_without_writing_it(client, db_session, sandwich):
+    _add_promotion(db_session, "ONCE", usage_limit=1)
+
+    assert client.post("/orders/", json=order_payload(sandwich.id, promotion_code="ONCE")).status_code == 201
+
+    response = client.post("/orders/", json=order_payload(sandwich.id, promotion_code="ONCE"))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Promotion usage limit has been reached."
+    assert db_session.query(Order).count() == 1
+
+
+def test_expired_promotion_is_rejected(client, db_session, sandwich):
+    _add_promotion(db_session, "OLD", expiration_date=datetime.utcnow() - timedelta(hours=1))
+
+    response = client.post("/orders/", json=order_payload(sandwich.id, promotion_code="OLD"))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Promotion has expired."
+
+
+def test_promotion_changed_after_lookup_reports_why_it_failed(client, db_session, sandwich):
+    promo = _add_promotion(db_session, "STALE")
+    assert client.post("/orders/", json=order_payload(sandwich.id, promotion_code="STALE")).status_code == 201
+
+    # written behind the cache's back: the cached snapshot still looks redeemable
+    promo.expiration_date = datetime.utcnow() - timedelta(minutes=1)
+    db_session.commit()
+
+    response = client.post("/orders/", json=order_payload(sandwich.id, promotion_code="STALE"))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Promotion has expired."
+    assert db_session.query(Order).count() == 1
+
+
+def test_parallel_redemptions_never_exceed_usage_limit(session_factory, db_session, sandwich):
+    limit = 5
+    _add_promotion(db_session, "RUSH", usage_limit=limit)
+
+    def place_order(i):
+        request = GuestOrderCreate(
+            guest_name=f"Guest {i}",
+            items=[{"menu_item_id": sandwich.id, "quantity": 1}],
+            promo_code="RUSH",
+        )
+        db = session_factory()
+        try:
+            guest_orders_controller.create(db, request)
+            return "ok"
+        except HTTPException as exc:
+            return exc.detail
+        finally:
+            db.close()
+
+    outcomes = run_concurrently(40, place_order)
+
+    assert outcomes.count("ok") == limit
+    assert all(o in ("ok", "Promotion usage limit has been reached.") for o in outcomes)
+
+    db_session.expire_all()
+    assert db_session.query(Promotion).filter_by(code="RUSH").one().usage_count == limit
+    assert db_session.query(Order).filter(Order.promotion_code == "RUSH").count() == limit
+
+
+def _promotion_selects(statements):
+    return [s for s in statements if s.lstrip().upper().startswith("SELECT") and "FROM promotions" in s]
+
+
+def test_unknown_codes_are_negatively_cached_until_created(client, test_db, sandwich):
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_db, "before_cursor_execute", _record)
+    try:
+        for _ in range(3):
+            response = client.post("/orders/", json=order_payload(sandwich.id, promotion_code="BOGUS"))
+            assert response.status_code == 404
+        assert len(_promotion_selects(statements)) == 1
+    finally:
+        event.remove(test_db, "before_cursor_execute", _record)
+
+    created = client.post("/promotions/", headers={"X-Role": "staff"}, json={
+        "code": "BOGUS",
+        "discount_type": "fixed_amount",
+        "discount_value": 1,
+        "start_date": (datetime.utcnow() - timedelta(days=1)).isoformat(),
+        "expiration_date": (datetime.utcnow() + timedelta(days=1)).isoformat(),
+    })
+    assert created.status_code == 201
+
+    response = client.post("/orders/", json=order_payload(sandwich.id, promotion_code="BOGUS"))
+    assert response.status_code == 201
+    assert response.json()["discount_amount"] == pytest.approx(1.00)
+
+
+def test_promotion_update_invalidates_cached_snapshot(client, db_session, sandwich):
+    promo = _add_promotion(db_session, "FLASH")
+
+    assert client.post("/orders/", json=order_payload(sandwich.id, promotion_code="FLASH")).status_code == 201
+
+    response = client.patch(f"/promotions/{promo.id}", headers={"X-Role": "staff"}, json={"is_active": 0})
+    assert response.status_code == 200
+
+    response = client.post("/orders/", json=order_payload(sandwich.id, promotion_code="FLASH"))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Promotion is inactive."
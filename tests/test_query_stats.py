@@ -0,0 +1,102 @@
+import logging
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from api.dependencies import query_stats
+from api.dependencies.config import conf
+from api.dependencies.database import get_db
+from api.models.sandwiches import Sandwich
+
+from conftest import override_get_db
+
+ADMIN = {"X-Role": "admin"}
+
+
+@pytest.fixture
+def instrumented():
+    query_stats.enable()
+    yield
+    query_stats.disable()
+    query_stats.clear()
+
+
+@pytest.fixture
+def loop_app(test_db):
+    app = FastAPI()
+    app.add_middleware(query_stats.QueryStatsMiddleware)
+
+    @app.get("/items/{count}")
+    def one_query_per_item(count: int, db=Depends(get_db)):
+        return [db.execute(text("SELECT :n + 1"), {"n": n}).scalar() for n in range(count)]
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def test_statement_shapes_collapse_literals_and_in_lists():
+    assert query_stats.statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?)\n AND name = 'x'") == \
+        query_stats.statement_shape("SELECT * FROM t WHERE id IN (?) AND name = 'y'")
+    assert query_stats.statement_shape("SELECT stars_1 FROM t LIMIT 10") == "SELECT stars_1 FROM t LIMIT ?"
+
+
+def test_disabled_adds_no_listeners_or_header(client):
+    assert not event.contains(Engine, "before_cursor_execute", query_stats._before_cursor_execute)
+    assert "server-timing" not in client.get("/menu-items/").headers
+
+
+def test_server_timing_counts_the_request_statements(client, db_session, instrumented):
+    db_session.add(Sandwich(name="Reuben", price=9.50))
+    db_session.commit()
+
+    timing = client.get("/menu-items/").headers["server-timing"]
+    db, app = timing.split(", ")
+    assert db.startswith("db;dur=") and db.endswith(' queries"')
+    assert int(db.split('desc="')[1].split()[0]) > 0
+    assert app.startswith("app;dur=")
+
+    # a 304 from memory runs no statement
+    etag = client.get("/menu-items/").headers["etag"]
+    revalidated = client.get("/menu-items/", headers={"If-None-Match": etag})
+    assert 'desc="0 queries"' in revalidated.headers["server-timing"]
+
+
+def test_repeated_statements_are_flagged(loop_app, instrumented, caplog, monkeypatch):
+    monkeypatch.setattr(conf, "sql_n_plus_one_threshold", 5)
+    with caplog.at_level(logging.WARNING, logger="api.dependencies.query_stats"):
+        assert loop_app.get("/items/4").json() == [1, 2, 3, 4]
+        assert "Possible N+1" not in caplog.text
+        loop_app.get("/items/6")
+    assert "Possible N+1 in GET /items/{count}: statement ran 6 times" in caplog.text
+
+    stats = query_stats.stats()
+    assert stats["routes"]["GET /items/{count}"]["requests"] == 2
+    assert stats["routes"]["GET /items/{count}"]["max_queries"] == 6
+    assert stats["recent_n_plus_one"][0]["path"] == "/items/6"
+
+
+def test_requests_over_the_thresholds_are_logged(loop_app, instrumented, caplog, monkeypatch):
+    monkeypatch.setattr(conf, "sql_log_query_count", 2)
+    with caplog.at_level(logging.WARNING, logger="api.dependencies.query_stats"):
+        loop_app.get("/items/2")
+        assert "Slow request" not in caplog.text
+        loop_app.get("/items/3")
+    assert "Slow request GET /items/3: 3 queries" in caplog.text
+
+
+def test_toggle_at_runtime(client):
+    assert client.put("/diagnostics/sql", params={"enabled": True}, headers={"X-Role": "staff"}).status_code == 403
+    try:
+        assert client.put("/diagnostics/sql", params={"enabled": True}, headers=ADMIN).json() == {"enabled": True}
+        assert "server-timing" in client.get("/menu-items/1").headers
+        routes = client.get("/diagnostics/sql", headers=ADMIN).json()["routes"]
+        assert routes["GET /menu-items/{item_id}"]["requests"] == 1
+
+        assert client.put("/diagnostics/sql", params={"enabled": False}, headers=ADMIN).json() == {"enabled": False}
+        assert "server-timing" not in client.get("/menu-items/1").headers
+    finally:
+        query_stats.disable()
+        query_stats.clear()
@@ -0,0 +1,150 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.cache import availability
+from api.dependencies import database, replicas
+from api.models import model_loader
+from api.models.orders import Order
+from api.models.recipes import Recipe
+from api.models.resources import Resource
+from api.models.sandwiches import Sandwich
+from api.search import menu_index
+from api.routers import index as indexRoute
+
+STAFF = {"X-Role": "staff"}
+
+
+def _order(**values):
+    return Order(customer_id=1, delivery_address="9 Replica Row", order_status="PLACED",
+                 subtotal=10.0, tax_amount=0.7, discount_amount=0.0, total_price=10.7, **values)
+
+
+@pytest.fixture
+def databases(tmp_path, monkeypatch):
+    """A primary and a replica SQLite file holding different orders."""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}", connect_args={"check_same_thread": False})
+    PrimarySession = sessionmaker(autocommit=False, autoflush=False, bind=primary)
+    replica_set = replicas.ReplicaSet.from_urls([f"sqlite:///{tmp_path / 'replica.db'}"], retry_seconds=30)
+
+    for engine, tracking in ((primary, "TRK-PRIMARY"), (replica_set.replicas[0].engine, "TRK-REPLICA")):
+        model_loader.index(engine)
+        with sessionmaker(bind=engine)() as db:
+            db.add_all([Sandwich(name="Hoagie", price=8.00), _order(tracking_number=tracking)])
+            db.commit()
+
+    monkeypatch.setattr(database, "SessionLocal", PrimarySession)
+    monkeypatch.setattr(database, "replicas", replica_set)
+    yield replica_set
+    primary.dispose()
+    for replica in replica_set.replicas:
+        replica.engine.dispose()
+
+
+@pytest.fixture
+def app(databases):
+    app = FastAPI()
+    app.add_middleware(replicas.ReadYourWritesMiddleware)
+    indexRoute.load_routes(app, async_db=False)
+    return app
+
+
+def _tracking_numbers(client):
+    return sorted(order["tracking_number"] for order in client.get("/orders/staff", headers=STAFF).json())
+
+
+def test_reads_use_the_replica_and_writes_the_primary(app):
+    client = TestClient(app)
+    assert _tracking_numbers(client) == ["TRK-REPLICA"]
+
+    created = client.post("/orders/", json={
+        "customer_id": 1, "delivery_address": "9 Replica Row", "order_items": [{"menu_item_id": 1, "quantity": 1}],
+    })
+    assert created.status_code == 201
+    assert replicas.STICKY_COOKIE in created.cookies
+
+    # the writer reads its own write from the primary; other clients still use the replica
+    assert _tracking_numbers(client) == sorted(["TRK-PRIMARY", created.json()["tracking_number"]])
+    assert _tracking_numbers(TestClient(app)) == ["TRK-REPLICA"]
+
+
+def test_write_returning_its_own_response_sets_the_cookie(app):
+    client = TestClient(app)
+    order = {"customer_id": 1, "delivery_address": "9 Replica Row", "order_items": [{"menu_item_id": 1, "quantity": 1}]}
+
+    # idempotent creates return a JSONResponse built by the route
+    created = client.post("/orders/", json=order, headers={"Idempotency-Key": "replica-1"})
+    assert created.status_code == 201
+    assert replicas.STICKY_COOKIE in created.cookies
+    assert created.json()["tracking_number"] in _tracking_numbers(client)
+
+    assert replicas.STICKY_COOKIE not in TestClient(app).get("/orders/staff", headers=STAFF).cookies
+
+
+def test_cache_refreshes_read_the_primary(databases):
+    with database.SessionLocal() as db:
+        panini = Sandwich(name="Primary Panini", price=9.00)
+        bread = Resource(item="Bread", amount=6)
+        db.add_all([panini, bread])
+        db.flush()
+        db.add(Recipe(sandwich_id=panini.id, resource_id=bread.id, amount=2))
+        db.commit()
+        panini_id = panini.id
+
+    request = Request({"type": "http", "method": "GET", "headers": []})
+    db = replicas.open_session(request, database.SessionLocal, databases)
+    try:
+        assert menu_index.search(db, "panini") == [panini_id]
+        assert availability.max_available(db, [panini_id]) == {panini_id: 3}
+        assert db.query(Order.tracking_number).scalar() == "TRK-REPLICA"
+        assert db.info[replicas.REPLICA_INFO_KEY] == "replica-1"
+    finally:
+        db.close()
+
+
+def test_replica_connection_is_checked_out_on_first_use(databases):
+    pool = databases.replicas[0].engine.pool
+    request = Request({"type": "http", "method": "GET", "headers": []})
+    db = replicas.open_session(request, database.SessionLocal, databases)
+    try:
+        assert pool.checkedout() == 0
+        assert db.query(Order.tracking_number).scalar() == "TRK-REPLICA"
+        db.commit()
+        assert db.query(Order.tracking_number).scalar() == "TRK-REPLICA"
+        assert pool.checkedout() == 1
+    finally:
+        db.close()
+    assert pool.checkedout() == 0
+
+
+def test_stickiness_expires(app):
+    client = TestClient(app)
+    client.cookies.set(replicas.STICKY_COOKIE, "1")  # long past
+    assert _tracking_numbers(client) == ["TRK-REPLICA"]
+    client.cookies.set(replicas.STICKY_COOKIE, "not-a-time")
+    assert _tracking_numbers(client) == ["TRK-REPLICA"]
+
+
+def test_unreachable_replica_is_skipped(app, databases):
+    dead = replicas.ReplicaSet.from_urls(["sqlite:////nonexistent-dir/replica.db"], retry_seconds=30).replicas[0]
+    databases.replicas.insert(0, dead)
+    client = TestClient(app)
+
+    for _ in range(4):
+        assert _tracking_numbers(client) == ["TRK-REPLICA"]
+    assert dead.failures == 1  # not retried within retry_seconds
+
+    status = client.get("/diagnostics/db-replicas", headers=STAFF).json()
+    assert [(r["healthy"], r["failures"]) for r in status] == [(False, 1), (True, 0)]
+
+    databases.replicas.remove(databases.replicas[1])  # only the dead one left
+    assert _tracking_numbers(client) == ["TRK-PRIMARY"]
+
+
+def test_round_robin():
+    replica_set = replicas.ReplicaSet([replicas.Replica(name, None) for name in "abc"], retry_seconds=30)
+    assert [replica_set.candidates()[0].name for _ in range(4)] == ["a", "b", "c", "a"]
+    replica_set.mark_down(replica_set.replicas[1])
+    assert [[r.name for r in replica_set.candidates()] for _ in range(3)] == [["c", "a"], ["c", "a"], ["a", "c"]]
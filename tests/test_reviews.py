@@ -0,0 +1,111 @@
+import pytest
+from sqlalchemy import event, insert
+
+from api.controllers import review as reviews_controller
+from api.models.menu_item_rating import MenuItemRating
+from api.models.review import Review
+from api.models.sandwiches import Sandwich
+
+@pytest.fixture
+def sandwiches(db_session):
+    items = [Sandwich(name="BLT", price=6.50), Sandwich(name="Cubano", price=9.25)]
+    db_session.add_all(items)
+    db_session.commit()
+    for item in items:
+        db_session.refresh(item)
+    return items
+
+
+def _review(db_session, menu_item_id, rating):
+    review = Review(customer_id=1, menu_item_id=menu_item_id, rating=rating, review_text="Tasty")
+    db_session.add(review)
+    db_session.commit()
+    return review
+
+
+def test_rating_summary_follows_review_writes(client, db_session, sandwiches):
+    blt, _ = sandwiches
+    first = _review(db_session, blt.id, 5)
+    _review(db_session, blt.id, 3)
+    _review(db_session, blt.id, 4)
+
+    summary = client.get(f"/reviews/item/{blt.id}/rating").json()
+    assert summary["review_count"] == 3
+    assert summary["average_rating"] == pytest.approx(4.0)
+    assert summary["histogram"] == {"0": 0, "1": 0, "2": 0, "3": 1, "4": 1, "5": 1}
+
+    first.rating = 2
+    db_session.commit()
+    summary = client.get(f"/reviews/item/{blt.id}/rating").json()
+    assert summary["average_rating"] == pytest.approx(3.0)
+    assert summary["histogram"]["5"] == 0
+    assert summary["histogram"]["2"] == 1
+
+    db_session.delete(first)
+    db_session.commit()
+    summary = client.get(f"/reviews/item/{blt.id}/rating").json()
+    assert summary["review_count"] == 2
+    assert summary["average_rating"] == pytest.approx(3.5)
+
+
+def test_rating_summary_for_unknown_item_is_404(client, sandwiches):
+    assert client.get("/reviews/item/999/rating").status_code == 404
+
+
+def test_batch_rating_summaries_use_one_query(client, db_session, test_db, sandwiches):
+    blt, cubano = sandwiches
+    _review(db_session, blt.id, 4)
+    _review(db_session, cubano.id, 2)
+    _review(db_session, cubano.id, 5)
+    blt_id, cubano_id = blt.id, cubano.id
+
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_db, "before_cursor_execute", _record)
+    try:
+        response = client.get("/reviews/ratings", params={"ids": f"{cubano_id},{blt_id},999"})
+    finally:
+        event.remove(test_db, "before_cursor_execute", _record)
+
+    assert response.status_code == 200
+    assert len(statements) == 1
+    data = response.json()
+    assert [s["menu_item_id"] for s in data] == [cubano_id, blt_id]
+    assert data[0]["average_rating"] == pytest.approx(3.5)
+    assert data[1]["review_count"] == 1
+
+    assert client.get("/reviews/ratings", params={"ids": "1,x"}).status_code == 400
+
+
+def test_rebuild_matches_reviews_written_without_the_orm(db_session, sandwiches):
+    blt, cubano = sandwiches
+    db_session.execute(insert(Review), [
+        {"customer_id": 1, "menu_item_id": blt.id, "rating": 4.5},
+        {"customer_id": 1, "menu_item_id": blt.id, "rating": 1},
+        {"customer_id": 1, "menu_item_id": cubano.id, "rating": 3},
+    ])
+    db_session.commit()
+    assert db_session.query(MenuItemRating).count() == 0
+
+    assert reviews_controller.rebuild_rating_aggregates(db_session) == 2
+
+    summary = reviews_controller.get_rating_summary_for_item(db_session, blt.id)
+    assert summary.review_count == 2
+    assert summary.average_rating == pytest.approx(2.75)
+    assert summary.histogram[5] == 1
+    assert summary.histogram[1] == 1
+
+
+def test_rebuild_buckets_like_incremental_maintenance(db_session, sandwiches):
+    blt, _ = sandwiches
+    # out-of-range ratings written around the API
+    db_session.add_all([Review(customer_id=1, menu_item_id=blt.id, rating=rating) for rating in (-1, 0.4, 4.5, 7)])
+    db_session.commit()
+    incremental = db_session.get(MenuItemRating, blt.id).histogram()
+
+    reviews_controller.rebuild_rating_aggregates(db_session)
+    db_session.expire_all()
+    assert db_session.get(MenuItemRating, blt.id).histogram() == incremental == {0: 2, 1: 0, 2: 0, 3: 0, 4: 0, 5: 2}
@@ -0,0 +1,155 @@
+import logging
+import subprocess
+import sys
+import textwrap
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+
+from api import lifespan
+from api.cache import menu as menu_cache
+from api.cache import promotions as promotion_cache
+from api.dependencies.config import conf
+from api.models import model_loader
+from api.models.promotion import Promotion
+from api.models.sandwiches import Sandwich
+from api.models.schema_version import SCHEMA_VERSION
+
+from conftest import BASE_DIR, TestingSessionLocal, override_get_db
+
+
+def _run(code):
+    return subprocess.run(
+        [sys.executable, "-c", textwrap.dedent(code)],
+        cwd=BASE_DIR, capture_output=True, text=True, timeout=120,
+    )
+
+
+def test_importing_the_app_does_not_touch_the_database():
+    result = _run("""
+        import pymysql
+
+        def refuse(*args, **kwargs):
+            raise AssertionError("connected at import time")
+
+        pymysql.connect = refuse
+        import api.main
+        from fastapi.testclient import TestClient
+        from sqlalchemy.orm import configure_mappers
+
+        configure_mappers()
+        paths = TestClient(api.main.app).get("/openapi.json").json()["paths"]
+        print("/orders/staff/stream" in paths)
+    """)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "True"
+
+
+def test_routers_are_imported_on_first_use():
+    result = _run("""
+        import sys
+        import api.main
+        from fastapi.testclient import TestClient
+
+        def routers():
+            return sorted(m for m in sys.modules if m.startswith("api.routers."))
+
+        print(routers())
+        with TestClient(api.main.app):  # lifespan startup mounts them
+            print(len(routers()))
+    """)
+    assert result.returncode == 0, result.stderr
+    before, after = result.stdout.strip().splitlines()
+    assert before == "['api.routers.index']"
+    assert int(after) > 1
+
+
+def test_schema_check_before_and_after_init_db(tmp_path, caplog):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+
+    assert lifespan.schema_version(engine) is None
+    with pytest.raises(RuntimeError, match="init-db"):
+        lifespan.check_schema(engine, "strict")
+    with caplog.at_level(logging.WARNING, logger="api.lifespan"):
+        lifespan.check_schema(engine, "warn")
+    assert "init-db" in caplog.text
+
+    model_loader.index(engine)
+    model_loader.index(engine)  # idempotent
+
+    assert lifespan.schema_version(engine) == SCHEMA_VERSION
+    lifespan.check_schema(engine, "strict")
+
+
+def test_init_db_adds_indexes_missing_from_existing_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    model_loader.index(engine)
+    with engine.begin() as conn:  # a database created before these indexes existed
+        conn.execute(text("DROP INDEX ix_orders_updated_at"))
+        conn.execute(text("DROP INDEX ix_orders_order_date_id"))
+
+    model_loader.index(engine)
+
+    names = {index["name"] for index in inspect(engine).get_indexes("orders")}
+    assert {"ix_orders_updated_at", "ix_orders_order_date_id"} <= names
+
+
+def test_init_db_adds_columns_missing_from_existing_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    model_loader.index(engine)
+    with engine.begin() as conn:  # an orders table from before the guest columns
+        conn.execute(text("ALTER TABLE orders DROP COLUMN notes"))
+        conn.execute(text("ALTER TABLE orders DROP COLUMN table_number"))
+
+    model_loader.index(engine)
+
+    columns = {column["name"] for column in inspect(engine).get_columns("orders")}
+    assert {"notes", "table_number"} <= columns
+
+
+def test_unreachable_database_only_warns(caplog):
+    engine = create_engine("sqlite:////nonexistent-dir/app.db")
+    with caplog.at_level(logging.WARNING, logger="api.lifespan"):
+        lifespan.check_schema(engine, "warn")
+    assert "Could not check the database schema" in caplog.text
+    lifespan.check_schema(engine, "off")
+
+
+def test_prewarm_fills_menu_and_promotion_caches(db_session):
+    now = datetime.utcnow()
+    db_session.add_all([
+        Sandwich(name="Club", price=8.00),
+        Sandwich(name="Retired Wrap", price=6.00, is_active=False),
+        Promotion(code="WARM10", discount_type="percentage", discount_value=10, is_active=1, usage_count=0,
+                  start_date=now - timedelta(days=1), expiration_date=now + timedelta(days=1)),
+    ])
+    db_session.commit()
+
+    lifespan.prewarm_caches(TestingSessionLocal)
+
+    assert menu_cache.stats()["size"] == 1
+    assert promotion_cache.stats()["size"] == 1
+    assert promotion_cache.get_by_code(db_session, "WARM10").discount_value == 10
+    assert promotion_cache.stats()["hits"] == 1
+
+
+def test_lifespan_runs_on_startup(test_db, monkeypatch):
+    from api.dependencies import database
+    from api.dependencies.database import get_db
+    from api.main import app
+
+    monkeypatch.setattr(database, "engine", test_db)
+    monkeypatch.setattr(database, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(conf, "schema_check", "strict")
+    monkeypatch.setattr(conf, "prewarm_caches", True)
+    monkeypatch.setitem(app.dependency_overrides, get_db, override_get_db)
+
+    with pytest.raises(RuntimeError, match="init-db"):
+        with TestClient(app):
+            pass
+
+    model_loader.index(test_db)
+    with TestClient(app) as client:
+        assert client.get("/menu-items/").status_code == 200